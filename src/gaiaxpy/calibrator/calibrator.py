@@ -7,34 +7,37 @@ Module for the calibrator functionality.
 from configparser import ConfigParser
 from os.path import join
 from pathlib import Path
-from sys import stdout
-from typing import Union
+from typing import Iterator, Union
 
 import numpy as np
 import pandas as pd
-from tqdm import tqdm
 
 from gaiaxpy.config.paths import config_path, config_ini_file
 from gaiaxpy.core.config import load_xpmerge_from_xml, load_xpsampling_from_xml
-from gaiaxpy.core.generic_functions import cast_output, validate_wl_sampling, parse_band, format_sampled_output
-from gaiaxpy.core.generic_variables import pbar_colour, pbar_units, pbar_message
+from gaiaxpy.core.design_matrix_cache import get_cache_key, load_cached_arrays, save_cached_arrays
+from gaiaxpy.core.generic_functions import validate_wl_sampling, parse_band
 from gaiaxpy.core.satellite import BANDS, BP_WL, RP_WL
 from gaiaxpy.input_reader.input_reader import InputReader
 from gaiaxpy.output.sampled_spectra_data import SampledSpectraData
+from gaiaxpy.output.spectra_batch import SpectraBatch
 from gaiaxpy.spectrum.sampled_basis_functions import SampledBasisFunctions
-from gaiaxpy.spectrum.utils import get_covariance_matrix
-from gaiaxpy.spectrum.xp_continuous_spectrum import XpContinuousSpectrum
-from .external_instrument_model import ExternalInstrumentModel
-from ..core.input_validator import validate_save_arguments
+from gaiaxpy.spectrum.utils import _factorise_covariance
+from .external_instrument_model import load_external_instrument_model
+from ..core.input_validator import (validate_save_arguments, validate_output_type, validate_with_correlation,
+                                    validate_parallel_arguments, validate_dtype)
+from ..core.parallel import create_progress_bar, process_in_chunks
+from ..spectrum.absolute_sampled_spectrum import AbsoluteSampledSpectrum
 from ..spectrum.calibration_absolute_sampled_spectrum import CalibrationAbsoluteSampledSpectrum
 
 __FUNCTION_KEY = 'calibrator'
+OUTPUT_TYPES = ['dataframe', 'batch']
 
 
 def calibrate(input_object: Union[list, Path, pd.DataFrame, str], sampling: np.ndarray = None, truncation: bool = False,
               output_path: Union[Path, str] = '.', output_file: str = 'output_spectra', output_format: str = None,
-              save_file: bool = True, with_correlation: bool = False, username: str = None, password: str = None) -> \
-        (pd.DataFrame, np.ndarray):
+              save_file: bool = True, with_correlation: bool = False, username: str = None, password: str = None,
+              output_type: str = 'dataframe', n_workers: int = 1, chunk_size: int = None, dtype: type = np.float64,
+              compute_dtype: type = None) -> (pd.DataFrame, np.ndarray):
     """
     Calibration utility: calibrates the input internally-calibrated continuously-represented mean spectra to the
     absolute system. An absolute spectrum sampled on a user-defined or default wavelength grid is created for each set
@@ -52,24 +55,113 @@ def calibrate(input_object: Union[list, Path, pd.DataFrame, str], sampling: np.n
         output_format (str): Desired output format. If no format is given, the output file format will be the same as
             the input file (e.g. 'csv').
         save_file (bool): Whether to save the output in a file. If false, output_format and output_file will be ignored.
-        with_correlation (bool): Whether correlation information should be generated.
+        with_correlation (bool/str): Whether correlation information should be generated. If 'factor', the covariance
+            is kept in a low-rank form (a factor of the covariance of the continuous spectra plus the design matrices)
+            from which the correlation can be rebuilt on demand. Only useful with output_type='batch', see
+            SpectraBatch.get_covariance and SpectraBatch.get_correlation.
         username (str): Cosmos username, only suggested when input_object is a list or ADQL query.
         password (str): Cosmos password, only suggested when input_object is a list or ADQL query.
+        output_type (str): Type of the returned spectra, either 'dataframe' (one row per source) or 'batch' (a
+            SpectraBatch holding the fluxes and errors of all sources in 2D arrays).
+        n_workers (int): Number of processes used to compute the spectra. The input is split into chunks which are
+            processed in parallel, and the results are concatenated in the order of the input.
+        chunk_size (int): Maximum number of sources per chunk. By default, the input is split evenly among the workers.
+        dtype (type): Floating-point type of the output spectra and of the computations, either np.float64 (default) or
+            np.float32. Single precision halves the memory used and the size of the output files.
+        compute_dtype (type): Floating-point type of the computations. By default, the same as dtype. Use np.float64
+            with dtype=np.float32 to compute in double precision and only round the output.
 
     Returns:
         (tuple): tuple containing:
 
-            DataFrame: The values for all sampled absolute spectra.
+            DataFrame/SpectraBatch: The values for all sampled absolute spectra.
             ndarray: The sampling used to calibrate the input spectra (user-provided or default).
     """
     return _calibrate(input_object, sampling, truncation, output_path, output_file, output_format, save_file,
-                      with_correlation=with_correlation, username=username, password=password)
+                      with_correlation=with_correlation, username=username, password=password,
+                      output_type=output_type, n_workers=n_workers, chunk_size=chunk_size, dtype=dtype,
+                      compute_dtype=compute_dtype)
+
+
+def calibrate_iter(input_object: Union[list, Path, pd.DataFrame, str], sampling: np.ndarray = None,
+                   truncation: bool = False, with_correlation: bool = False, username: str = None,
+                   password: str = None, output_type: str = 'dataframe', chunk_size: int = 10000,
+                   dtype: type = np.float64, compute_dtype: type = None) -> Iterator:
+    """
+    Streaming version of the calibration utility: the input is read and calibrated in chunks of sources, which are
+    returned one at a time. The memory used depends on the chunk size and not on the size of the input. Concatenating
+    the DataFrames returned gives the same result as a single call to "calibrate".
+
+    Args:
+        input_object (list/Path/pd.DataFrame/str): Path to the file containing the mean spectra as downloaded from the
+            Archive in their continuous representation, a list of sources ids (string or long), or a pandas DataFrame.
+            CSV, ECSV and AVRO files are read incrementally, other inputs are read at once and then calibrated in
+            chunks.
+        sampling (ndarray): 1D array containing the desired sampling in absolute wavelengths [nm].
+        truncation (bool): Toggle truncation of the set of bases. The level of truncation to be applied is defined by
+            the recommended value in the input files.
+        with_correlation (bool/str): Whether correlation information should be generated. See "calibrate".
+        username (str): Cosmos username, only suggested when input_object is a list or ADQL query.
+        password (str): Cosmos password, only suggested when input_object is a list or ADQL query.
+        output_type (str): Type of the returned spectra, either 'dataframe' (one row per source) or 'batch' (a
+            SpectraBatch holding the fluxes and errors of all sources in the chunk in 2D arrays).
+        chunk_size (int): Maximum number of sources per chunk.
+        dtype (type): Floating-point type of the output spectra and of the computations. See "calibrate".
+        compute_dtype (type): Floating-point type of the computations. See "calibrate".
+
+    Returns:
+        iterator: Tuples containing the spectra of a chunk of sources (DataFrame/SpectraBatch) and the sampling used to
+            calibrate them (ndarray). The index of the DataFrames continues from one chunk to the next.
+    """
+    validate_wl_sampling(sampling)
+    validate_output_type(output_type, OUTPUT_TYPES)
+    validate_with_correlation(with_correlation)
+    validate_parallel_arguments(1, chunk_size)
+    validate_dtype(dtype, compute_dtype)
+    return _calibrate_iter(input_object, sampling, truncation, with_correlation=with_correlation, username=username,
+                           password=password, output_type=output_type, chunk_size=chunk_size, dtype=dtype,
+                           compute_dtype=compute_dtype)
+
+
+def _calibrate_iter(input_object: Union[list, Path, pd.DataFrame, str], sampling: np.ndarray = None,
+                    truncation: bool = False, with_correlation: bool = False, username: str = None,
+                    password: str = None, bp_model: str = 'v375wi', rp_model: str = 'v142r',
+                    disable_info: bool = False, output_type: str = 'dataframe', correlation_dtype: type = None,
+                    chunk_size: int = 10000, dtype: type = np.float64, compute_dtype: type = None) -> Iterator:
+    """
+    Internal function of the streaming calibration utility. Refer to "calibrate_iter".
+
+    Args:
+        bp_model (str): The bp model.
+        rp_model (str): The rp model.
+        correlation_dtype (type): Data type of the correlation output (e.g. np.float32). Default is dtype.
+
+    Yields:
+        tuple: A tuple containing:
+            DataFrame/SpectraBatch: The sampled absolute spectra of a chunk of sources.
+            ndarray: The sampling used to calibrate the spectra.
+    """
+    input_reader = InputReader(input_object, _calibrate, truncation=truncation, disable_info=disable_info,
+                               user=username, password=password)
+    xp_design_matrices, xp_merge = __generate_xp_matrices_and_merge(__FUNCTION_KEY, sampling, bp_model, rp_model)
+    n_sources = 0
+    for parsed_input_data, _ in input_reader.read_in_chunks(chunk_size):
+        spectra, positions = _create_spectra_batch(parsed_input_data, xp_design_matrices, xp_merge, truncation,
+                                                   with_correlation, correlation_dtype or dtype, dtype=dtype,
+                                                   compute_dtype=compute_dtype)
+        if output_type == 'dataframe':
+            spectra = spectra.to_pandas()
+            spectra.index += n_sources
+        n_sources += len(parsed_input_data)
+        yield spectra, positions
 
 
 def _calibrate(input_object: Union[list, Path, str], sampling: np.ndarray = None, truncation: bool = False,
                output_path: Union[Path, str] = '.', output_file: str = 'output_spectra', output_format: str = None,
                save_file: bool = True, with_correlation: bool = False, username: str = None, password: str = None,
-               bp_model: str = 'v375wi', rp_model: str = 'v142r', disable_info: bool = False) -> \
+               bp_model: str = 'v375wi', rp_model: str = 'v142r', disable_info: bool = False,
+               output_type: str = 'dataframe', correlation_dtype: type = None, n_workers: int = 1,
+               chunk_size: int = None, dtype: type = np.float64, compute_dtype: type = None) -> \
         (pd.DataFrame, np.ndarray):
     """
     Internal function of the calibration utility. Refer to "calibrate".
@@ -77,9 +169,10 @@ def _calibrate(input_object: Union[list, Path, str], sampling: np.ndarray = None
     Args:
         bp_model (str): The bp model.
         rp_model (str): The rp model.
+        correlation_dtype (type): Data type of the correlation output (e.g. np.float32). Default is dtype.
 
     Returns:
-        DataFrame: A list of all sampled absolute spectra.
+        DataFrame/SpectraBatch: All sampled absolute spectra.
         ndarray: The sampling used to calibrate the spectra.
 
     Raises:
@@ -88,15 +181,26 @@ def _calibrate(input_object: Union[list, Path, str], sampling: np.ndarray = None
     validate_wl_sampling(sampling)
     validate_save_arguments(_calibrate.__defaults__[3], output_file, _calibrate.__defaults__[4], output_format,
                             save_file)
+    validate_output_type(output_type, OUTPUT_TYPES)
+    validate_with_correlation(with_correlation)
+    validate_parallel_arguments(n_workers, chunk_size)
+    validate_dtype(dtype, compute_dtype)
     parsed_input_data, extension = InputReader(input_object, _calibrate, truncation=truncation,
                                                disable_info=disable_info, user=username, password=password).read()
     xp_design_matrices, xp_merge = __generate_xp_matrices_and_merge(__FUNCTION_KEY, sampling, bp_model, rp_model)
-    spectra_df, positions = __create_spectra(parsed_input_data, truncation, xp_design_matrices, xp_merge,
-                                             with_correlation=with_correlation, disable_info=disable_info)
-    spectra_df = cast_output(spectra_df)
+    shared_data = {'design_matrices': xp_design_matrices, 'merge': xp_merge, 'truncation': truncation,
+                   'with_correlation': with_correlation, 'correlation_dtype': correlation_dtype or dtype,
+                   'dtype': dtype, 'compute_dtype': compute_dtype}
+    with create_progress_bar(__FUNCTION_KEY, len(parsed_input_data), disable=disable_info) as progress_bar:
+        chunk_results = process_in_chunks(_create_spectra_batch, parsed_input_data, shared_data, n_workers=n_workers,
+                                          chunk_size=chunk_size, progress_bar=progress_bar)
+    spectra, positions = SpectraBatch.concatenate([spectra for spectra, _ in chunk_results]), chunk_results[0][1]
+    if output_type == 'batch' and not save_file:
+        return spectra, positions
+    spectra_df = spectra.to_pandas()
     output_data = SampledSpectraData(spectra_df, positions)
     output_data.save(save_file, output_path, output_file, output_format, extension)
-    return spectra_df, positions
+    return (spectra if output_type == 'batch' else spectra_df), positions
 
 
 def __create_merge(xp: str, sampling: np.ndarray) -> np.ndarray:
@@ -163,64 +267,73 @@ def __generate_xp_matrices_and_merge(label: str, sampling: np.ndarray, bp_model:
         xp_design_matrices = {xp: SampledBasisFunctions.from_design_matrix(xp_sampling_grid, xp_design_matrices[xp])
                               for xp in BANDS}
     else:
+        model_files = {xp: [__get_file_for_xp(xp, key) for key in ('dispersion', 'response', 'bases')] for xp in BANDS}
+        # Computing the design matrices on a new sampling is slow, reuse the ones computed in previous calls if possible
+        cache_key = get_cache_key(sampling, [label, bp_model, rp_model],
+                                  [file for xp in BANDS for file in model_files[xp]])
+        cached = load_cached_arrays(cache_key)
+        # Entries missing any of the arrays are computed and stored again
+        cached_names = [f'{xp}_{name}' for xp in BANDS for name in ('merge', 'design_matrix')]
+        if cached is not None and all(name in cached for name in cached_names):
+            xp_merge = {xp: cached[f'{xp}_merge'] for xp in BANDS}
+            xp_design_matrices = {xp: SampledBasisFunctions.from_design_matrix(sampling, cached[f'{xp}_design_matrix'])
+                                  for xp in BANDS}
+            return xp_design_matrices, xp_merge
         xp_merge = {xp: __create_merge(xp, sampling) for xp in BANDS}
         xp_design_matrices = {xp: SampledBasisFunctions.from_external_instrument_model(
-            sampling, xp_merge[xp], ExternalInstrumentModel.from_config_csv(
-                __get_file_for_xp(xp, 'dispersion'), __get_file_for_xp(xp, 'response'),
-                __get_file_for_xp(xp, 'bases'))) for xp in BANDS}
+            sampling, xp_merge[xp], load_external_instrument_model(*model_files[xp])) for xp in BANDS}
+        cached = {f'{xp}_merge': xp_merge[xp] for xp in BANDS}
+        cached.update({f'{xp}_design_matrix': xp_design_matrices[xp].get_design_matrix() for xp in BANDS})
+        save_cached_arrays(cache_key, cached)
     return xp_design_matrices, xp_merge
 
 
-def __create_spectra(parsed_input_data: pd.DataFrame, truncation: bool, design_matrices: dict,
-                     merge: dict, with_correlation: bool = False, disable_info: bool = False):
-    """
-     Create a DataFrame of absolute sampled spectra for each source in the parsed mean spectra file.
-
-     Args:
-         parsed_input_data (DataFrame): DataFrame containing information for each source in the mean spectra file.
-             This includes columns for both bands (although one band could be missing).
-         truncation (bool): If True, the set of bases is truncated.
-         design_matrices (dict): Dictionary containing 2D arrays of basis functions sampled on the pseudo-wavelength
-             grid (either user-defined or default) for both bands.
-         merge (dict): Dictionary containing arrays of weights for both bands. These define the contributions from each
-             band to the joined absolute spectrum.
-         with_correlation (bool, optional): If True, the covariance information is included in the resulting
-             AbsoluteSampledSpectrum objects. Defaults to False.
-
-     Returns:
-         tuple:
-             spectra_df (DataFrame): DataFrame of absolute sampled spectra, each represented as a dictionary with
-                 attributes 'data_type' indicating the type of spectra and 'positions' indicating the sample positions.
-             positions (ndarray): 1D array of the sample positions.
-     """
-    parsed_spectrum_file_dict = parsed_input_data.to_dict('records')
-    spectra_series = pd.Series([_create_spectrum(row, truncation, design_matrices, merge,
-                                                 with_correlation=with_correlation) for row in tqdm(
-        parsed_spectrum_file_dict, desc=pbar_message[__FUNCTION_KEY], unit=pbar_units[__FUNCTION_KEY], leave=False,
-        colour=pbar_colour, disable=disable_info, file=stdout)])
-    return format_sampled_output(spectra_series, with_correlation=with_correlation)
-
-
-def _create_spectrum(row, truncation, design_matrix, merge, with_correlation=False):
+def _create_spectra_batch(parsed_input_data: pd.DataFrame, design_matrices: dict, merge: dict,
+                          truncation: bool = False, with_correlation: bool = False,
+                          correlation_dtype: type = None, dtype: type = None,
+                          compute_dtype: type = None) -> (SpectraBatch, np.ndarray):
     """
-    Create a single sampled absolute spectrum from the input continuously-represented mean spectrum and design matrix.
+    Create a batch of absolute sampled spectra computing all the sources in the input at once. The coefficients of
+        each band are stacked into a 2D array, so that a single matrix product per band yields the fluxes of all
+        sources. The output is the same as the one obtained by creating one spectrum per source.
 
     Args:
-        row (DataFrame): Single row in a DataFrame containing the entry for one source in the mean spectra file. This
-            will include columns for both bands (although one could be missing).
-        truncation (bool): Toggle truncation of the set of bases.
-        design_matrix (ndarray): 2D array containing the basis functions sampled on the pseudo-wavelength grid (either
-            user-defined or default).
-        merge (dict): Dictionary containing an array of weights per BP and one for RP. These have one value per sample
-            and define the contributions from BP and RP to the joined absolute spectrum.
+        parsed_input_data (DataFrame): DataFrame containing information for each source in the mean spectra file.
+        design_matrices (dict): Dictionary containing the basis functions sampled on the wavelength grid for both bands.
+        merge (dict): Dictionary containing arrays of weights for both bands.
+        truncation (bool): If True, the set of bases of each source is truncated to its number of relevant bases.
+        with_correlation (bool/str): If True, the correlation information is included in the output. If 'factor', the
+            covariance factors are included instead.
+        correlation_dtype (type): Data type of the correlation output (e.g. np.float32). Default is float64.
+        dtype (type): Data type of the flux and flux error output (e.g. np.float32). Default is float64.
+        compute_dtype (type): Data type used in the computations. Default is dtype.
 
     Returns:
-        CalibrationAbsoluteSampledSpectrum: The absolute sampled spectrum with calibration behaviour.
+        tuple:
+            spectra (SpectraBatch): Batch of absolute sampled spectra.
+            positions (ndarray): 1D array of the sample positions.
     """
-    source_id = row['source_id']
-    continuous_dict = {band: XpContinuousSpectrum(source_id, band, row[f'{band}_coefficients'],
-                                                  get_covariance_matrix(row, band), row[f'{band}_standard_deviation'])
-                       for band in BANDS}
-    recommended_truncation = {band: row[f'{band}_n_relevant_bases'] for band in BANDS} if truncation else dict()
-    return CalibrationAbsoluteSampledSpectrum(source_id, continuous_dict, design_matrix, merge,
-                                              truncation=recommended_truncation, with_correlation=with_correlation)
+    positions = design_matrices[BANDS.bp].get_sampling_grid()
+    split_spectra = AbsoluteSampledSpectrum.generate_spectra_batch(parsed_input_data, design_matrices,
+                                                                   with_correlation=with_correlation,
+                                                                   truncation=truncation,
+                                                                   dtype=compute_dtype or dtype)
+    compute_merge = {band: merge[band].astype(compute_dtype or dtype or np.float64, copy=False) for band in BANDS}
+    flux, error = CalibrationAbsoluteSampledSpectrum.merge_output_batch(split_spectra, compute_merge, positions,
+                                                                        dtype=dtype)
+    correlation, covariance_factor, factor_design_matrices = None, None, None
+    if with_correlation == 'factor':
+        factor_design_matrices = {band: design_matrices[band].get_design_matrix() for band in BANDS}
+        covariance_factor = dict()
+        for band in BANDS:
+            n_bases = factor_design_matrices[band].shape[0]
+            covariance_factor[band] = np.full((len(flux), n_bases, n_bases), np.nan)
+            covariance_factor[band][split_spectra[band]['available']] = _factorise_covariance(
+                split_spectra[band]['coefficient_covariance'])
+    elif with_correlation:
+        correlation = CalibrationAbsoluteSampledSpectrum.merge_correlation_batch(split_spectra, design_matrices, merge,
+                                                                                 positions, dtype=correlation_dtype)
+    spectra = SpectraBatch(parsed_input_data['source_id'].to_numpy(), flux, error, positions,
+                           CalibrationAbsoluteSampledSpectrum, correlation=correlation,
+                           covariance_factor=covariance_factor, design_matrices=factor_design_matrices, merge=merge)
+    return spectra, positions
@@ -5,6 +5,9 @@ Module for handling the various components of the external calibration instrumen
 These are dispersion function, instrument response and set of inverse bases.
 """
 
+from functools import lru_cache
+from typing import Union
+
 import numpy as np
 import pandas as pd
 from scipy import interpolate
@@ -32,6 +35,10 @@ class ExternalInstrumentModel(object):
         self.dispersion = dispersion
         self.response = response
         self.bases = bases
+        # The spline representations only depend on the tables, so they are computed once
+        self._response_tck = interpolate.splrep(response.get('wavelength'), response.get('response'), s=0)
+        self._dispersion_tck = interpolate.splrep(dispersion.get('wavelength'), dispersion.get('pseudo-wavelength'),
+                                                  s=0)
 
     @classmethod
     def from_config_csv(cls, dispersion_path: str, response_path: str, bases_path: str):
@@ -62,28 +69,44 @@ class ExternalInstrumentModel(object):
                                                                               bases['nTransformedBases'])
         return cls(dispersion, response, bases)
 
-    def get_response(self, wavelength: float) -> np.ndarray:
+    def get_response(self, wavelength: Union[float, np.ndarray]) -> np.ndarray:
         """
         Get the response of the mean instrument at a certain wavelength.
 
         Args:
-            wavelength (float): The absolute wavelength.
+            wavelength (float or ndarray): The absolute wavelength, or an array of wavelengths.
 
         Returns:
-            ndarray: The response of the mean instrument at the input wavelength.
+            ndarray: The response of the mean instrument at the input wavelength(s).
         """
-        tck = interpolate.splrep(self.response.get("wavelength"), self.response.get("response"), s=0)
-        return interpolate.splev(wavelength, tck, der=0)
+        return interpolate.splev(wavelength, self._response_tck, der=0)
 
-    def wl_to_pwl(self, wavelength: float) -> np.ndarray:
+    def wl_to_pwl(self, wavelength: Union[float, np.ndarray]) -> np.ndarray:
         """
         Convert the input absolute wavelength to a pseudo-wavelength.
 
         Args:
-            wavelength (float): Absolute wavelength.
+            wavelength (float or ndarray): Absolute wavelength, or an array of wavelengths.
 
         Returns:
-            ndarray: The corresponding pseudo-wavelength value.
+            ndarray: The corresponding pseudo-wavelength value(s).
         """
-        tck = interpolate.splrep(self.dispersion.get("wavelength"), self.dispersion.get("pseudo-wavelength"), s=0)
-        return interpolate.splev(wavelength, tck, der=0)
+        return interpolate.splev(wavelength, self._dispersion_tck, der=0)
+
+
+@lru_cache(maxsize=8)
+def load_external_instrument_model(dispersion_path: str, response_path: str, bases_path: str) -> \
+        ExternalInstrumentModel:
+    """
+    Load an external calibration instrument model from its configuration files, reusing the model if it has already
+        been loaded in this session. The returned model is shared and must not be modified.
+
+    Args:
+        dispersion_path (str): Path to the configuration file containing the dispersion.
+        response_path (str): Path to the configuration file containing the response.
+        bases_path (str): Path to the configuration file containing the inverse bases.
+
+    Returns:
+        ExternalInstrumentModel: An external calibration instrument model object.
+    """
+    return ExternalInstrumentModel.from_config_csv(dispersion_path, response_path, bases_path)
@@ -4,9 +4,9 @@ xp_filter_system_colour_equation.py
 Module that implements the colour equation functionality.
 """
 
-import math
 from ast import literal_eval
 from configparser import ConfigParser
+from functools import lru_cache
 from os import listdir
 from pathlib import Path
 from sys import stdout
@@ -14,7 +14,6 @@ from typing import Union, Optional
 
 import numpy as np
 import pandas as pd
-from numpy import poly1d
 from tqdm import tqdm
 
 from gaiaxpy.config.paths import filters_path
@@ -46,14 +45,42 @@ def __compute_mag_error(data, band, system_label):
     Compute magnitude error based on flux error.
 
     Args:
-        data (dict): A dictionary containing the input data.
+        data (DataFrame): The input data.
         band (str): The band to use.
         system_label (str): The system being used.
 
     Returns:
-        float: The magnitude error.
+        ndarray: The magnitude errors.
     """
-    return 2.5 * data[f'{system_label}_flux_error_{band}'] / (data[f'{system_label}_flux_{band}'] * math.log(10))
+    flux = data[f'{system_label}_flux_{band}'].to_numpy(dtype=float)
+    flux_error = data[f'{system_label}_flux_error_{band}'].to_numpy(dtype=float)
+    return 2.5 * flux_error / (flux * np.log(10))
+
+
+@lru_cache(maxsize=None)
+def _load_colour_equation(label):
+    """
+    Load the colour equation of a photometric system. The result is cached, so each configuration file is only parsed
+        once.
+
+    Args:
+        label (str): Label of the photometric system.
+
+    Returns:
+        dict: A dictionary containing the filter to be corrected, the colour index, the coefficients of the colour
+            equation and of its derivative (highest degree first) and the colour range of the correction.
+    """
+    config_parser = ConfigParser()
+    config_parser.read(Path(colour_eq_dir, f'{label}_colour_eq.ini'))
+    # Reverse, coefficients were originally defined for the Java polyfunction
+    coefficients = np.array(literal_eval(config_parser.get(label, 'POLY_COEFFICIENTS'))[::-1], dtype=float)
+    coefficients.flags.writeable = False
+    derivative = np.polyder(coefficients)
+    derivative.flags.writeable = False
+    return {'filter': config_parser.get(label, 'FILTER'),  # The filter to be corrected (string)
+            'colour_index': config_parser.get(label, 'COLOUR_INDEX'),  # The colour index (string)
+            'coefficients': coefficients, 'derivative': derivative,
+            'colour_range': tuple(literal_eval(config_parser.get(label, 'COLOUR_RANGE')))}
 
 
 def __fill_systems_details(systems_to_correct):
@@ -69,79 +96,59 @@ def __fill_systems_details(systems_to_correct):
     systems_details = dict()
     for system in systems_to_correct:
         label = system.get_system_label()
-        systems_details[label] = dict()
+        systems_details[label] = dict(_load_colour_equation(label))
         # Get bands and zero points
         systems_details[label]['bands_zp'] = dict(zip(system.get_bands(), system.get_zero_points()))
-        # Load ini file
-        config_parser = ConfigParser()
-        config_parser.read(Path(colour_eq_dir, f'{label}_colour_eq.ini'))
-        systems_details[label]['filter'] = config_parser.get(label, 'FILTER')  # The filter to be corrected (string)
-        systems_details[label]['colour_index'] = config_parser.get(label, 'COLOUR_INDEX')  # The colour index (string)
-        # The colour equation (PolynomialFunction)
-        # Reverse, coefficients were originally defined for the Java polyfunction
-        coefficients = list(literal_eval(config_parser.get(label, 'POLY_COEFFICIENTS')))[::-1]
-        polyfunc = poly1d(coefficients)
-        systems_details[label]['polyfunc'] = polyfunc
-        systems_details[label]['derivative'] = polyfunc.deriv()  # Colour equation derivative (UnivariateFunction)
-        colour_range = config_parser.get(label, 'COLOUR_RANGE')  # Colour range for the correction (double[])
-        systems_details[label]['colour_range'] = literal_eval(colour_range)
     return systems_details
 
 
-def __create_rows(single_system_df, system, colour_band_0, colour_band_1, systems_details):
-    """
-    Create output rows for a systems.
-    """
-    new_system_rows = [__generate_output_row(row, system, colour_band_0, colour_band_1, systems_details) for row in
-                       single_system_df.to_dict('records')]
-    return pd.DataFrame(new_system_rows)
-
-
 def _generate_output_df(input_synthetic_photometry, systems_details, disable_info=False):
     __FUNCTION_KEY = 'colour_eq'
     synth_phot_df = input_synthetic_photometry.copy()
-    column_names = synth_phot_df.columns
-    # Extract columns corresponding to one system
+    # Correct the columns of one system at a time
     system_keys = systems_details.keys()
     for label in tqdm(system_keys, desc=pbar_message[__FUNCTION_KEY], total=len(system_keys),
                       unit=pbar_units[__FUNCTION_KEY], colour=pbar_colour, leave=False, disable=disable_info,
                       file=stdout):
-        filter_to_correct = systems_details[label]['filter']
-        colour_band_0, colour_band_1 = _get_colour_bands(systems_details[label]['colour_index'])
-        system_columns_with_colour = [column for column in column_names if column.startswith(f'{label}_') and
-                                      column.endswith((f'_{filter_to_correct}', f'_{colour_band_0}',
-                                                       f'_{colour_band_1}'))]
-        single_system_df = synth_phot_df[system_columns_with_colour]
-        corrected_system_df = __create_rows(single_system_df, label, colour_band_0, colour_band_1, systems_details)
-        columns_to_correct = corrected_system_df.columns
-        synth_phot_df[columns_to_correct] = corrected_system_df[columns_to_correct]
+        corrected_columns = __correct_system(synth_phot_df, label, systems_details[label])
+        for column, values in corrected_columns.items():
+            synth_phot_df[column] = values
     return synth_phot_df
 
 
-def __generate_output_row(row, system_label, colour_band_0, colour_band_1, systems_details):
-    filter_to_correct = systems_details[system_label]['filter']
-    mag = row[f'{system_label}_mag_{filter_to_correct}']
-    mag_err = __compute_mag_error(row, filter_to_correct, system_label)
-    mag_colour_0 = row[f'{system_label}_mag_{colour_band_0}']
-    mag_colour_1 = row[f'{system_label}_mag_{colour_band_1}']
-    colour = mag_colour_0 - mag_colour_1
+def __correct_system(synth_phot_df, system_label, system_details):
+    """
+    Apply the colour equation of a system to all the sources at once.
+
+    Args:
+        synth_phot_df (DataFrame): The synthetic photometry.
+        system_label (str): The label of the system.
+        system_details (dict): The details of the system, see __fill_systems_details.
+
+    Returns:
+        dict: A dictionary containing the corrected magnitude, flux and flux error columns of the filter.
+    """
+    filter_to_correct = system_details['filter']
+    colour_band_0, colour_band_1 = _get_colour_bands(system_details['colour_index'])
+    mag = synth_phot_df[f'{system_label}_mag_{filter_to_correct}'].to_numpy(dtype=float)
+    mag_err = __compute_mag_error(synth_phot_df, filter_to_correct, system_label)
+    colour = (synth_phot_df[f'{system_label}_mag_{colour_band_0}'].to_numpy(dtype=float) -
+              synth_phot_df[f'{system_label}_mag_{colour_band_1}'].to_numpy(dtype=float))
     # Output corrected magnitude
-    corrected_magnitude = mag + _get_correction(systems_details, colour, system_label)
+    corrected_magnitude = mag + _get_correction(system_details, colour)
     # Propagated colour error
-    mag_err_1 = __compute_mag_error(row, colour_band_0, system_label)
-    mag_err_2 = __compute_mag_error(row, colour_band_1, system_label)
-    colour_err = math.sqrt(mag_err_1 ** 2 + mag_err_2 ** 2)
-    correction_err = colour_err * abs(systems_details[system_label]['derivative'](colour))
+    mag_err_1 = __compute_mag_error(synth_phot_df, colour_band_0, system_label)
+    mag_err_2 = __compute_mag_error(synth_phot_df, colour_band_1, system_label)
+    colour_err = np.sqrt(mag_err_1 ** 2 + mag_err_2 ** 2)
+    correction_err = colour_err * np.abs(np.polyval(system_details['derivative'], colour))
     # Total error on corrected magnitude
-    out_err = math.sqrt(mag_err ** 2 + correction_err ** 2)
-    new_row = dict()
-    new_row[f'{system_label}_mag_{filter_to_correct}'] = corrected_magnitude
-    zp = systems_details[system_label]['bands_zp'][filter_to_correct]
+    out_err = np.sqrt(mag_err ** 2 + correction_err ** 2)
+    zp = system_details['bands_zp'][filter_to_correct]
     out_flux = 10 ** (-0.4 * (corrected_magnitude - zp))
-    out_flux_err = out_err * out_flux * math.log(10) / 2.5
-    new_row[f'{system_label}_flux_{filter_to_correct}'] = out_flux
-    new_row[f'{system_label}_flux_error_{filter_to_correct}'] = out_flux_err
-    return new_row
+    out_flux_err = out_err * out_flux * np.log(10) / 2.5
+    return {f'{system_label}_mag_{filter_to_correct}': corrected_magnitude,
+            f'{system_label}_flux_{filter_to_correct}': out_flux,
+            f'{system_label}_flux_error_{filter_to_correct}': out_flux_err}
 
 
 def _get_colour_bands(colour_index):
@@ -158,56 +165,22 @@ def _get_colour_bands(colour_index):
     return colour_band_0, colour_band_1
 
 
-def _set_colour_limit(colour, colour_range):
+def _get_correction(system_details: dict, colour: np.ndarray) -> np.ndarray:
     """
-    Set the colour limit to either the minimum or maximum value in the given colour range.
+    Evaluate the colour equation. Outside the colour range of the equation, the correction is extrapolated linearly from
+        the closest limit of the range.
 
     Args:
-        colour (float): The colour value.
-        colour_range (list): A list of two values representing the minimum and maximum allowed values for the colour.
+        system_details (dict): The details of the system, see __fill_systems_details.
+        colour (ndarray): The colours of the sources.
 
     Returns:
-        float: The minimum or maximum value in the colour range, whichever is closest to the input `colour` value.
-
-    Raises:
-        ValueError: If the input `colour` value is not within the specified `colour_range`.
+        ndarray: The corrections of the magnitudes, NaN where the colour is NaN.
     """
-    if colour < min(colour_range):
-        colour_limit = min(colour_range)
-    elif colour > max(colour_range):
-        colour_limit = max(colour_range)
-    else:
-        raise ValueError(
-            'The condition for one of the previous statements must be True. Error in colour or colour_range.')
-    return colour_limit
-
-
-def _generate_polynomial(colour, colour_limit, system_polyfunc):
-    v = system_polyfunc(colour_limit)
-    m = system_polyfunc.deriv()(colour_limit)
-    return v + m * (colour - colour_limit)
-
-
-# Replaces Java 'contains'
-def _is_in_range(colour: float, colour_range: list):
-    return min(colour_range) <= colour <= max(colour_range)
-
-
-def _get_correction(systems_details: dict, colour: float, system_label: str):
-    colour_range = systems_details[system_label]['colour_range']
-    polyfunc = systems_details[system_label]['polyfunc']
-    # Check whether colour is nan
-    if math.isnan(colour):
-        return np.nan
-    # Check if in range after being sure that colour is not nan
-    in_range = _is_in_range(colour, colour_range)
-    if in_range:
-        return polyfunc(colour)
-    elif not in_range:
-        colour_limit = _set_colour_limit(colour, colour_range)
-        return _generate_polynomial(colour, colour_limit, polyfunc)
-    else:
-        raise ValueError('At least one variable does not comply with any of the previous statements.')
+    colour_limit = np.clip(colour, min(system_details['colour_range']), max(system_details['colour_range']))
+    # Inside the colour range the limit is the colour itself and the linear term vanishes
+    return (np.polyval(system_details['coefficients'], colour_limit) +
+            np.polyval(system_details['derivative'], colour_limit) * (colour - colour_limit))
 
 
 def __get_systems_to_correct(systems: Union[list, PhotometricSystem]) -> list:
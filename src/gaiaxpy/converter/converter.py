@@ -6,33 +6,39 @@ Module for the converter functionality.
 
 from numbers import Number
 from pathlib import Path
-from sys import stdout
 from typing import Union, Optional
 
 import numpy as np
 import pandas as pd
-from tqdm import tqdm
 
-from gaiaxpy.core.generic_functions import cast_output, validate_pwl_sampling, format_sampled_output
-from gaiaxpy.core.generic_variables import pbar_colour, pbar_units, pbar_message
+from gaiaxpy.core.generic_functions import validate_pwl_sampling
 from gaiaxpy.core.satellite import BANDS
 from gaiaxpy.input_reader.input_reader import InputReader
 from gaiaxpy.output.sampled_spectra_data import SampledSpectraData
+from gaiaxpy.output.sampled_spectra_writer import SampledSpectraWriter
+from gaiaxpy.output.spectra_batch import SpectraBatch
 from gaiaxpy.spectrum.sampled_basis_functions import SampledBasisFunctions
-from gaiaxpy.spectrum.xp_continuous_spectrum import XpContinuousSpectrum
+from gaiaxpy.spectrum.utils import _factorise_covariance
 from gaiaxpy.spectrum.xp_sampled_spectrum import XpSampledSpectrum
 from .config import parse_config, get_bands_config
 from ..config.paths import hermite_bases_file
-from ..core.input_validator import validate_save_arguments
+from ..core.input_validator import (validate_save_arguments, validate_output_type, validate_with_correlation,
+                                    validate_parallel_arguments, validate_dtype)
+from ..core.parallel import create_progress_bar, create_worker_pool, process_in_chunks
 
 __FUNCTION_KEY = 'converter'
+OUTPUT_TYPES = ['dataframe', 'batch']
+# Number of sources read and written at a time in streaming mode
+STREAMING_CHUNK_SIZE = 10000
 
 
 def convert(input_object: Union[list, Path, pd.DataFrame, str],
             sampling: Optional[np.ndarray] = np.linspace(0, 60, 600),
             truncation: bool = False, with_correlation: bool = False, output_path: Union[Path, str] = '.',
             output_file: str = 'output_spectra', output_format: str = None, save_file: bool = True,
-            username: str = None, password: str = None) -> (pd.DataFrame, np.ndarray):
+            username: str = None, password: str = None, output_type: str = 'dataframe', n_workers: int = 1,
+            chunk_size: int = None, streaming: bool = False, dtype: type = np.float64,
+            compute_dtype: type = None) -> (pd.DataFrame, np.ndarray):
     """
     Conversion utility: converts the input internally calibrated mean spectra from the continuous representation to a
         sampled form. The sampling grid can be defined by the user, alternatively a default will be adopted. Optionally,
@@ -45,7 +51,10 @@ def convert(input_object: Union[list, Path, pd.DataFrame, str],
         sampling (ndarray): 1D array containing the desired sampling in pseudo-wavelengths.
         truncation (bool): Toggle truncation of the set of bases. The level of truncation to be applied is defined by
             the recommended value in the input files.
-        with_correlation (bool): Whether correlation information should be generated.
+        with_correlation (bool/str): Whether correlation information should be generated. If 'factor', the covariance
+            is kept in a low-rank form (a factor of the covariance of the continuous spectra plus the design matrices)
+            from which the correlation can be rebuilt on demand. Only useful with output_type='batch', see
+            SpectraBatch.get_covariance and SpectraBatch.get_correlation.
         output_path (Path/str): Path where to save the output data.
         output_file (str): Name of the output file without extension (e.g. 'my_file').
         output_format (str): Desired output format. If no format is given, the output file format will be the same as
@@ -53,10 +62,24 @@ def convert(input_object: Union[list, Path, pd.DataFrame, str],
         save_file (bool): Whether to save the output in a file. If false, output_format and output_file will be ignored.
         username (str): Cosmos username, only suggested when input_object is a list or ADQL query.
         password (str): Cosmos password, only suggested when input_object is a list or ADQL query.
+        output_type (str): Type of the returned spectra. 'dataframe' returns a DataFrame with one row per source and
+            band. 'batch' returns a SpectraBatch where all BP spectra are followed by all RP spectra, with the 1D
+            source_id and xp arrays identifying the rows of the 2D flux and flux_error arrays.
+        n_workers (int): Number of processes used to compute the spectra. The input is split into chunks which are
+            processed in parallel, and the results are concatenated in the order of the input.
+        chunk_size (int): Maximum number of sources per chunk. By default, the input is split evenly among the workers.
+            In streaming mode, it is the number of sources read and written at a time (10000 by default).
+        streaming (bool): Whether to read, convert and save the input one chunk at a time, so that the memory used does
+            not depend on the size of the input. The spectra are appended to the output file as they are computed and
+            are not returned. Requires save_file=True.
+        dtype (type): Floating-point type of the output spectra and of the computations, either np.float64 (default) or
+            np.float32. Single precision halves the memory used and the size of the output files.
+        compute_dtype (type): Floating-point type of the computations. By default, the same as dtype. Use np.float64
+            with dtype=np.float32 to compute in double precision and only round the output.
 
     Returns:
         (tuple): tuple containing:
-            DataFrame: The values for all sampled spectra.
+            DataFrame/SpectraBatch: The values for all sampled spectra (None in streaming mode).
             ndarray: The sampling used to convert the input spectra (user-provided or default).
 
     Raises:
@@ -64,19 +87,24 @@ def convert(input_object: Union[list, Path, pd.DataFrame, str],
     """
     return _convert(input_object=input_object, sampling=sampling, truncation=truncation,
                     with_correlation=with_correlation, output_path=output_path, output_file=output_file,
-                    output_format=output_format, save_file=save_file, username=username, password=password)
+                    output_format=output_format, save_file=save_file, username=username, password=password,
+                    output_type=output_type, n_workers=n_workers, chunk_size=chunk_size, streaming=streaming,
+                    dtype=dtype, compute_dtype=compute_dtype)
 
 
 def _convert(input_object: Union[list, Path, str], sampling: np.ndarray = np.linspace(0, 60, 600),
              truncation: bool = False, with_correlation: bool = False, output_path: Union[Path, str] = '.',
              output_file: str = 'output_spectra', output_format: str = None, save_file: bool = True,
-             username: str = None, password: str = None, disable_info: bool = False, config_file=hermite_bases_file) \
-        -> (pd.DataFrame, np.ndarray):
+             username: str = None, password: str = None, disable_info: bool = False, config_file=hermite_bases_file,
+             output_type: str = 'dataframe', correlation_dtype: type = None, n_workers: int = 1,
+             chunk_size: int = None, streaming: bool = False, dtype: type = np.float64,
+             compute_dtype: type = None) -> (pd.DataFrame, np.ndarray):
     """
     Internal method of the calibration utility. Refer to "convert".
 
     Args:
         disable_info (bool): Whether to disable the progress tracker.
+        correlation_dtype (type): Data type of the correlation output (e.g. np.float32). Default is dtype.
 
     Returns:
         DataFrame: A list of all sampled absolute spectra.
@@ -88,86 +116,142 @@ def _convert(input_object: Union[list, Path, str], sampling: np.ndarray = np.lin
     function = convert
     validate_pwl_sampling(sampling)
     validate_save_arguments(function.__defaults__[4], output_file, function.__defaults__[5], output_format, save_file)
-    parsed_input_data, extension = InputReader(input_object, convert, truncation=truncation, disable_info=disable_info,
-                                               user=username, password=password).read()
+    validate_output_type(output_type, OUTPUT_TYPES)
+    validate_with_correlation(with_correlation)
+    validate_parallel_arguments(n_workers, chunk_size)
+    validate_dtype(dtype, compute_dtype)
+    if streaming and not save_file:
+        raise ValueError('The streaming mode only saves the output to a file, it requires save_file=True.')
+    input_reader = InputReader(input_object, convert, truncation=truncation, disable_info=disable_info,
+                               user=username, password=password)
     bases_config = parse_config(config_file)
     design_matrices = get_design_matrices(sampling, bases_config)
-    spectra_df, positions = _create_spectra(parsed_input_data, truncation, design_matrices,
-                                            with_correlation=with_correlation, disable_info=disable_info)
+    shared_data = {'truncation': truncation, 'design_matrices': design_matrices, 'with_correlation': with_correlation,
+                   'correlation_dtype': correlation_dtype or dtype, 'dtype': dtype, 'compute_dtype': compute_dtype}
+    if streaming:
+        return None, _convert_in_chunks(input_reader, shared_data, sampling, output_path, output_file, output_format,
+                                        n_workers=n_workers, chunk_size=chunk_size or STREAMING_CHUNK_SIZE,
+                                        disable_info=disable_info)
+    parsed_input_data, extension = input_reader.read()
+    with create_progress_bar(__FUNCTION_KEY, len(parsed_input_data), disable=disable_info) as progress_bar:
+        chunk_results = process_in_chunks(_create_spectra_batch, parsed_input_data, shared_data, n_workers=n_workers,
+                                          chunk_size=chunk_size, progress_bar=progress_bar)
+    spectra, positions = SpectraBatch.concatenate([spectra for spectra, _ in chunk_results]), chunk_results[0][1]
+    if output_type == 'batch' and not save_file:
+        return spectra, positions
     # Save output section
-    output_data = SampledSpectraData(spectra_df, positions)
-    output_data.data = cast_output(output_data)
+    output_data = SampledSpectraData(spectra.to_pandas(), positions)
     output_data.save(save_file, output_path, output_file, output_format, extension)
-    return output_data.data, positions
+    return (spectra if output_type == 'batch' else output_data.data), positions
 
 
-def _create_spectrum(row: pd.Series, truncation: bool, design_matrices: dict, band: str,
-                     with_correlation: bool = False) -> XpSampledSpectrum:
+def _convert_in_chunks(input_reader: InputReader, shared_data: dict, sampling: np.ndarray,
+                       output_path: Union[Path, str], output_file: str, output_format: str, n_workers: int = 1,
+                       chunk_size: int = STREAMING_CHUNK_SIZE, disable_info: bool = False) -> np.ndarray:
     """
-    Create a single sampled spectrum from the input continuously-represented mean spectrum and design matrix.
+    Read, convert and save the input one chunk at a time.
 
     Args:
-        row (pd.Series): Single row in a DataFrame containing the entry for one source in the mean spectra file.
-            This will include columns for both bands (although one could be missing).
-        truncation (bool): Toggle truncation of the set of bases. The level of truncation to be applied is defined by
-            the recommended value in the input files.
-        design_matrices (dict): 2D array containing the basis functions sampled on the pseudo-wavelength grid (either
-            user-defined or default).
-        band (str): bp/rp band.
-        with_correlation (bool): Whether correlation information should be generated.
+        input_reader (InputReader): Reader of the input data.
+        shared_data (dict): Keyword arguments passed to _create_spectra_batch on every chunk.
+        sampling (ndarray): 1D array containing the desired sampling in pseudo-wavelengths.
+        output_path (Path/str): Path where to save the output data.
+        output_file (str): Name of the output file without extension.
+        output_format (str): Desired output format. By default, the format of the input file.
+        n_workers (int): Number of processes used to convert each chunk.
+        chunk_size (int): Maximum number of sources per chunk.
+        disable_info (bool): Whether to disable the progress tracker.
 
     Returns:
-        XpSampledSpectrum: The sampled spectrum.
+        ndarray: The sampling used to convert the input spectra.
     """
-    recommended_truncation = row[f'{band}_n_relevant_bases'] if truncation else -1
-    continuous_spectrum = XpContinuousSpectrum(row['source_id'], band, row[f'{band}_coefficients'],
-                                               row[f'{band}_covariance_matrix'], row[f'{band}_standard_deviation'])
-    return XpSampledSpectrum.from_continuous(continuous_spectrum, design_matrices.get(band),
-                                             truncation=recommended_truncation, with_correlation=with_correlation)
-
-
-def _create_spectra(parsed_input_data: pd.DataFrame, truncation: bool, design_matrices: dict,
-                    with_correlation: bool = False, disable_info=False) -> tuple:
+    positions = sampling
+    spectra_writer = None
+    # The same pool of processes is used for all the chunks
+    executor = create_worker_pool(shared_data, n_workers) if n_workers > 1 else None
+    # The number of sources is unknown until the whole input is read
+    progress_bar = create_progress_bar(__FUNCTION_KEY, disable=disable_info)
+    try:
+        for parsed_input_data, extension in input_reader.read_in_chunks(chunk_size):
+            chunk_results = process_in_chunks(_create_spectra_batch, parsed_input_data, shared_data,
+                                              n_workers=n_workers, executor=executor, progress_bar=progress_bar)
+            spectra, positions = SpectraBatch.concatenate([spectra for spectra, _ in chunk_results]), \
+                chunk_results[0][1]
+            if spectra_writer is None:
+                spectra_writer = SampledSpectraWriter(output_path, output_file, output_format or extension, positions)
+            spectra_writer.write(spectra.to_pandas())
+    except BaseException:
+        # Do not leave an incomplete file that looks valid
+        if spectra_writer is not None:
+            spectra_writer.abort()
+        raise
+    finally:
+        progress_bar.close()
+        if executor is not None:
+            executor.shutdown()
+    if spectra_writer is not None:
+        spectra_writer.close()
+    return positions
+
+
+def _create_spectra_batch(parsed_input_data: pd.DataFrame, truncation: bool, design_matrices: dict,
+                          with_correlation: bool = False, correlation_dtype: type = None, dtype: type = None,
+                          compute_dtype: type = None) -> tuple:
     """
-    Creates a spectra dataframe from parsed input data and given parameters.
+    Sample the spectra of all the sources in the input at once, with a single matrix product per band. The output is
+        made of contiguous blocks: first the BP spectra of all sources and then the RP spectra of all sources.
 
     Args:
         parsed_input_data (pd.DataFrame): The parsed input data to create the spectra from.
         truncation (bool): Toggle truncation of the set of bases. The level of truncation to be applied is defined by
             the recommended value in the input files.
         design_matrices (dict): The design matrices for the input list of bases.
-        with_correlation (bool): Whether to include the covariance matrix in the spectra. Default is False.
+        with_correlation (bool/str): Whether to include the correlation information in the spectra. If 'factor', the
+            covariance factors are stored instead of the correlation. Default is False.
+        correlation_dtype (type): Data type of the correlation output (e.g. np.float32). Default is float64.
+        dtype (type): Data type of the flux, flux error and standard deviation output (e.g. np.float32). Default is
+            float64.
+        compute_dtype (type): Data type used in the computations. Default is dtype.
 
     Returns:
         (tuple): tuple containing:
-            DataFrame: The output spectra.
+            SpectraBatch: The sampled spectra. The rows of missing bands are filled with NaN.
             ndarray: The sampling used to convert the input spectra (user-provided or default).
     """
-
-    def create_xp_spectra(row, _truncation, _design_matrices, _with_correlation=False):
-        """
-        Creates bp and rp spectra for a single row of parsed input data.
-
-        Args:
-            row (pandas Series): A single row of parsed input data.
-            _truncation (bool): Toggle truncation of the set of bases. The level of truncation to be applied is defined
-                by the recommended value in the input files.
-            _design_matrices (dict): The design matrices for the input list of bases.
-            _with_correlation (bool): Whether to include the covariance matrix in the spectra. Default is False.
-
-        Returns:
-            list: A list of spectra for the given row of parsed input data containing one element per band available.
-        """
-        return [_create_spectrum(row, _truncation, _design_matrices, band, with_correlation=_with_correlation)
-                for band in BANDS]
-
-    parsed_input_data_dict = parsed_input_data.to_dict('records')
-    spectra_series = pd.Series([create_xp_spectra(row, truncation, design_matrices, with_correlation)
-                                for row in tqdm(parsed_input_data_dict, desc=pbar_message[__FUNCTION_KEY],
-                                                unit=pbar_units[__FUNCTION_KEY], leave=False, colour=pbar_colour,
-                                                disable=disable_info, file=stdout)])
-    spectra_series = spectra_series.explode()
-    return format_sampled_output(spectra_series, with_correlation=with_correlation)
+    positions = design_matrices[BANDS.bp].get_sampling_grid()
+    n_sources, n_samples = len(parsed_input_data), len(positions)
+    n_spectra = len(BANDS) * n_sources
+    flux = np.full((n_spectra, n_samples), np.nan, dtype=dtype)
+    flux_error = np.full((n_spectra, n_samples), np.nan, dtype=dtype)
+    correlation, standard_deviation, covariance_factor, factor_design_matrices = None, None, None, None
+    if with_correlation:
+        standard_deviation = np.full(n_spectra, np.nan, dtype=dtype)
+    if with_correlation == 'factor':
+        factor_design_matrices = {band: design_matrices[band].get_design_matrix() for band in BANDS}
+        covariance_factor = {band: np.full((n_spectra,) + factor_design_matrices[band].shape[:1] * 2, np.nan)
+                             for band in BANDS}
+    elif with_correlation:
+        correlation = np.full((n_spectra, n_samples * (n_samples - 1) // 2), np.nan, dtype=correlation_dtype)
+    for band_index, band in enumerate(BANDS):
+        band_spectra = XpSampledSpectrum._sample_band_batch(parsed_input_data, band, design_matrices[band],
+                                                            with_correlation=with_correlation, truncation=truncation,
+                                                            dtype=compute_dtype or dtype)
+        rows = band_index * n_sources + np.flatnonzero(band_spectra['available'])
+        flux[rows] = band_spectra['flux']
+        flux_error[rows] = band_spectra['error']
+        if with_correlation:
+            standard_deviation[rows] = band_spectra['stdev']
+        if with_correlation == 'factor':
+            covariance_factor[band][rows] = _factorise_covariance(band_spectra['coefficient_covariance'])
+        elif with_correlation:
+            correlation[rows] = XpSampledSpectrum._sample_correlation_batch(band_spectra['coefficient_covariance'],
+                                                                            design_matrices[band].get_design_matrix(),
+                                                                            dtype=correlation_dtype)
+    spectra = SpectraBatch(np.tile(parsed_input_data['source_id'].to_numpy(), len(BANDS)), flux, flux_error,
+                           positions, XpSampledSpectrum, xp=np.repeat([band.upper() for band in BANDS], n_sources),
+                           correlation=correlation, standard_deviation=standard_deviation,
+                           covariance_factor=covariance_factor, design_matrices=factor_design_matrices)
+    return spectra, positions
 
 
 def get_unique_basis_ids(parsed_input_data: pd.DataFrame) -> set:
@@ -0,0 +1,149 @@
+"""
+design_matrix_cache.py
+====================================
+Module for the persistent cache of design matrices computed on user-defined sampling grids.
+
+The cache is disabled by default. It is enabled by setting the environment variable GAIAXPY_CACHE_DIR to the directory
+where it should be stored. Its maximum size in bytes is given by GAIAXPY_CACHE_MAX_BYTES, setting it to 0 disables the
+cache. When the cache is full, the least recently used entries are removed.
+"""
+
+import hashlib
+import zipfile
+from contextlib import suppress
+from os import environ, listdir, remove, replace, utime
+from os.path import getmtime, getsize, isdir, join
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+
+import numpy as np
+
+# Increase if the content of the cached arrays changes
+_CACHE_VERSION = '1'
+_CACHE_EXTENSION = '.npz'
+DEFAULT_CACHE_MAX_BYTES = 256 * 1024 ** 2
+
+
+def get_cache_dir():
+    """
+    Get the directory where the cache is stored.
+
+    Returns:
+        str: Path to the cache directory, or None if the cache is not enabled.
+    """
+    return environ.get('GAIAXPY_CACHE_DIR') or None
+
+
+def get_cache_max_bytes():
+    """
+    Get the maximum size of the cache.
+
+    Returns:
+        int: Maximum size in bytes. The default size is used if the value in the environment is not a valid integer.
+    """
+    try:
+        return int(environ.get('GAIAXPY_CACHE_MAX_BYTES', DEFAULT_CACHE_MAX_BYTES))
+    except ValueError:
+        return DEFAULT_CACHE_MAX_BYTES
+
+
+def get_cache_key(sampling, labels, files):
+    """
+    Compute the key identifying a cache entry.
+
+    Args:
+        sampling (ndarray): 1D array containing the sampling grid.
+        labels (list): Strings identifying the computation (e.g. the instrument models).
+        files (list): Paths to the configuration files the computation depends on. Their content is part of the key.
+
+    Returns:
+        str: The key of the entry.
+    """
+    key = hashlib.sha256(_CACHE_VERSION.encode())
+    key.update(np.ascontiguousarray(sampling, dtype=np.float64).tobytes())
+    for label in labels:
+        key.update(str(label).encode() + b'\0')
+    for file in files:
+        key.update(Path(file).read_bytes())
+    return key.hexdigest()
+
+
+def load_cached_arrays(key):
+    """
+    Load the arrays stored in a cache entry and mark the entry as recently used.
+
+    Args:
+        key (str): The key of the entry.
+
+    Returns:
+        dict: Dictionary containing the arrays of the entry, or None if the entry does not exist or cannot be read.
+    """
+    cache_dir = get_cache_dir()
+    if cache_dir is None or get_cache_max_bytes() <= 0:
+        return None
+    path = join(cache_dir, key + _CACHE_EXTENSION)
+    try:
+        with np.load(path) as entry:
+            arrays = {name: entry[name] for name in entry.files}
+        utime(path)
+    except (OSError, ValueError, EOFError, zipfile.BadZipFile):
+        return None
+    return arrays
+
+
+def save_cached_arrays(key, arrays):
+    """
+    Store arrays in a cache entry, removing the least recently used entries if the cache exceeds its maximum size.
+        Errors writing to the cache are ignored, as the cache is only an optimisation.
+
+    Args:
+        key (str): The key of the entry.
+        arrays (dict): Dictionary of arrays to store.
+    """
+    cache_dir, max_bytes = get_cache_dir(), get_cache_max_bytes()
+    if cache_dir is None or max_bytes <= 0:
+        return
+    temporary_path = None
+    try:
+        Path(cache_dir).mkdir(parents=True, exist_ok=True)
+        # Write to a temporary file first so that concurrent readers never see a partial entry
+        with NamedTemporaryFile(dir=cache_dir, suffix='.tmp', delete=False) as temporary_file:
+            temporary_path = temporary_file.name
+            np.savez(temporary_file, **arrays)
+        replace(temporary_path, join(cache_dir, key + _CACHE_EXTENSION))
+        temporary_path = None
+        _evict(cache_dir, max_bytes)
+    except OSError:
+        if temporary_path is not None:
+            with suppress(OSError):
+                remove(temporary_path)
+
+
+def clear_cache():
+    """
+    Remove all the entries in the cache.
+    """
+    cache_dir = get_cache_dir()
+    if cache_dir is not None and isdir(cache_dir):
+        for path in _list_entries(cache_dir):
+            remove(path)
+
+
+def _list_entries(cache_dir):
+    return [join(cache_dir, name) for name in listdir(cache_dir) if name.endswith(_CACHE_EXTENSION)]
+
+
+def _evict(cache_dir, max_bytes):
+    """
+    Remove the least recently used entries until the cache fits in its maximum size.
+
+    Args:
+        cache_dir (str): Path to the cache directory.
+        max_bytes (int): Maximum size in bytes.
+    """
+    entries = sorted(_list_entries(cache_dir), key=getmtime, reverse=True)
+    total_bytes = 0
+    for path in entries:
+        total_bytes += getsize(path)
+        if total_bytes > max_bytes:
+            remove(path)
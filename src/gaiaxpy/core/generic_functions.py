@@ -88,6 +88,45 @@ def str_to_array(str_array):
         raise ValueError('Unhandled type.')
 
 
+def str_column_to_arrays(str_column):
+    """
+    Convert a column of strings of the form (1,2,3) or [1,2,3] to arrays. The strings of the whole column are parsed
+        in a single call, and the arrays returned are views of one contiguous buffer (the rows of a 2D array when all
+        of them have the same length). Missing values are kept as NaN. Columns containing values of other types or
+        matrices are converted element by element with str_to_array.
+
+    Args:
+        str_column (Series): Column containing the arrays as strings.
+
+    Returns:
+        Series: Column containing the arrays, with the same index as the input.
+
+    Raises:
+        ValueError: If any of the strings cannot be converted to an array.
+    """
+    is_missing = str_column.isna().to_numpy()
+    strings = str_column[~is_missing]
+    if strings.empty or not all(isinstance(value, str) for value in strings) or \
+            strings.str.startswith(('((', '[[')).any():
+        return str_column.map(str_to_array)
+    # Remove the enclosing brackets
+    contents = strings.str.slice(1, -1)
+    lengths = np.where(contents.str.strip().str.len() > 0, contents.str.count(',') + 1, 0)
+    try:
+        values = np.fromstring(','.join(content for content, length in zip(contents, lengths) if length), sep=',')
+    except ValueError:
+        raise ValueError('Input cannot be converted to array.')
+    if len(values) != lengths.sum():
+        raise ValueError('Input cannot be converted to array.')
+    if (lengths == lengths[0]).all():
+        arrays = list(values.reshape(len(lengths), lengths[0]))
+    else:
+        arrays = np.split(values, np.cumsum(lengths)[:-1])
+    output = np.full(len(str_column), np.nan, dtype=object)
+    output[np.flatnonzero(~is_missing)] = arrays
+    return pd.Series(output, index=str_column.index, name=str_column.name)
+
+
 def validate_pwl_sampling(sampling):
     # Receives a NumPy array. Validates sampling in pwl.
     min_sampling_value = -10
@@ -207,6 +246,66 @@ def array_to_symmetric_matrix(array, array_size):
     raise TypeError('Wrong argument types. Must be np.ndarray and integer or float.')
 
 
+def arrays_to_symmetric_matrices(arrays, array_sizes):
+    """
+    Convert a column of 1D arrays into full symmetric matrices, as array_to_symmetric_matrix does for a single array.
+        The arrays with the same length and matrix size are stacked and their matrices are filled at once. Missing
+        values (e.g. those of a missing band) are kept, and any other values are converted one at a time.
+
+    Args:
+        arrays (Series): Column of 1D arrays.
+        array_sizes (Series): Column with the number of rows/columns of each output matrix.
+
+    Returns:
+        Series: Column of 2D matrices with the same index as the input.
+    """
+    matrices, sizes = list(arrays), list(array_sizes)
+    groups = dict()
+    for position, (array, array_size) in enumerate(zip(matrices, sizes)):
+        if isinstance(array, np.ndarray) and array.ndim == 1 and array.size > 0 and \
+                isinstance(array_size, (int, float, np.integer, np.floating)) and not pd.isna(array_size) and \
+                float(array_size).is_integer() and array_size > 0:
+            groups.setdefault((int(array_size), len(array)), list()).append(position)
+        else:
+            matrices[position] = array_to_symmetric_matrix(array, array_size)
+    for (array_size, length), positions in groups.items():
+        if length == array_size * (array_size - 1) // 2:
+            k = -1
+        elif length == array_size * (array_size + 1) // 2:
+            k = 0
+        else:
+            for position in positions:
+                matrices[position] = array_to_symmetric_matrix(matrices[position], sizes[position])
+            continue
+        stacked_matrices = _stacked_arrays_to_symmetric_matrices(np.stack([matrices[position] for position in
+                                                                           positions]), array_size, k)
+        for position, matrix in zip(positions, stacked_matrices):
+            matrices[position] = matrix
+    return pd.Series(matrices, index=arrays.index, dtype=object)
+
+
+def _stacked_arrays_to_symmetric_matrices(arrays, array_size, k):
+    """
+    Fill the symmetric matrices of a stack of arrays. The indices of the lower triangle are computed only once.
+
+    Args:
+        arrays (ndarray): 2D array containing the unique elements of one matrix per row, in the order given by
+            np.tril_indices.
+        array_size (int): Number of rows/columns of the matrices.
+        k (int): Diagonal offset, 0 if the arrays contain the diagonal and -1 otherwise.
+
+    Returns:
+        ndarray: 3D array containing one matrix per row of the input.
+    """
+    matrices = np.zeros((len(arrays), array_size, array_size))
+    diagonal = np.arange(array_size)
+    matrices[:, diagonal, diagonal] = 1.0
+    rows, columns = np.tril_indices(array_size, k=k)
+    matrices[:, rows, columns] = arrays
+    matrices[:, columns, rows] = arrays
+    return matrices
+
+
 def _extract_systems_from_data(data_columns, photometric_system=None):
     if isinstance(photometric_system, list):
         return [system.get_system_label() for system in photometric_system]
@@ -234,6 +333,33 @@ def correlation_from_covariance(covariance):
     return correlation
 
 
+def packed_correlation_from_covariance(covariance, dtype=None, lower_triangle=None):
+    """
+    Compute the lower triangle (excluding the diagonal) of the correlation matrices of a stack of covariance matrices,
+        without building the full correlation matrices.
+
+    Args:
+        covariance (ndarray): 3D array containing one covariance matrix per element of the stack.
+        dtype (type): Data type of the output. Default is the data type of the covariance.
+        lower_triangle (tuple): Indices of the lower triangle as returned by np.tril_indices(n, k=-1), to avoid
+            computing them again when the function is called once per block of a larger stack.
+
+    Returns:
+        ndarray: 2D array containing one packed correlation matrix per row, in the order given by np.tril_indices.
+    """
+    rows, columns = np.tril_indices(covariance.shape[-1], k=-1) if lower_triangle is None else lower_triangle
+    v = np.sqrt(np.diagonal(covariance, axis1=-2, axis2=-1))
+    # Operate in place, so that at most three packed arrays (about half a matrix each) are alive at once
+    correlation = covariance[:, rows, columns]
+    denominator = v[:, rows]
+    np.multiply(denominator, v[:, columns], out=denominator)
+    uncorrelated = correlation == 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        np.divide(correlation, denominator, out=correlation)
+    correlation[uncorrelated] = 0
+    return correlation if dtype is None else correlation.astype(dtype, copy=False)
+
+
 def correlation_to_covariance(correlation: np.ndarray, error: np.ndarray, stdev: float) -> np.ndarray:
     """
     Compute the covariance matrix from the correlation values.
@@ -3,6 +3,8 @@ input_validator.py
 ====================================
 Module to validate the input data columns, etc.
 """
+import numpy as np
+
 from gaiaxpy.core.generic_functions import _warning
 
 
@@ -56,6 +58,75 @@ def validate_save_arguments(default_output_file, given_output_file, default_outp
                  "to store the output of the function.")
 
 
+def validate_with_correlation(with_correlation):
+    """
+    Validate the correlation mode requested by the user.
+
+    Args:
+        with_correlation (bool/str): Correlation mode provided by the user.
+
+    Raises:
+        ValueError: If the correlation mode is neither a boolean nor 'factor'.
+    """
+    if not (isinstance(with_correlation, (bool, np.bool_)) or with_correlation == 'factor'):
+        raise ValueError("Parameter 'with_correlation' must be True, False or 'factor'.")
+
+
+def validate_parallel_arguments(n_workers, chunk_size):
+    """
+    Validate the arguments controlling the processing of the input in chunks.
+
+    Args:
+        n_workers (int): Number of worker processes.
+        chunk_size (int): Maximum number of sources per chunk, or None.
+
+    Raises:
+        ValueError: If the number of workers or the chunk size is not a positive integer.
+    """
+    if not isinstance(n_workers, (int, np.integer)) or isinstance(n_workers, bool) or n_workers < 1:
+        raise ValueError("Parameter 'n_workers' must be a positive integer.")
+    if chunk_size is not None and (not isinstance(chunk_size, (int, np.integer)) or isinstance(chunk_size, bool) or
+                                   chunk_size < 1):
+        raise ValueError("Parameter 'chunk_size' must be a positive integer or None.")
+
+
+def validate_output_type(output_type, valid_output_types):
+    """
+    Validate the type of output requested by the user.
+
+    Args:
+        output_type (str): Output type provided by the user.
+        valid_output_types (list): List of the output types accepted by the function.
+
+    Raises:
+        ValueError: If the output type is not one of the valid ones.
+    """
+    if output_type not in valid_output_types:
+        raise ValueError(f"Parameter 'output_type' must be one of: {', '.join(valid_output_types)}.")
+
+
+def validate_dtype(dtype, compute_dtype=None):
+    """
+    Validate the floating-point precision requested by the user.
+
+    Args:
+        dtype (type): Data type of the output provided by the user.
+        compute_dtype (type): Data type of the computations provided by the user, or None.
+
+    Raises:
+        ValueError: If any of the data types is neither float32 nor float64.
+    """
+    for name, value in [('dtype', dtype), ('compute_dtype', compute_dtype)]:
+        if value is None and name == 'compute_dtype':
+            continue
+        try:
+            valid = np.dtype(value) in (np.float32, np.float64)
+        except TypeError:
+            valid = False
+        if not valid:
+            raise ValueError(f"Parameter '{name}' must be either np.float32 or np.float64.")
+
+
 def check_column_overwrite(additional_columns, required_columns):
     common_names = []
     for key, value in additional_columns.items():
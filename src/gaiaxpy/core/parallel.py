@@ -0,0 +1,147 @@
+"""
+parallel.py
+====================================
+Module to process the parsed input data in chunks, optionally in parallel.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from math import ceil
+from sys import stdout
+
+from tqdm import tqdm
+
+from gaiaxpy.core.generic_variables import pbar_colour, pbar_message, pbar_units
+
+# Data shared by all the tasks run by a worker process, set once by the pool initializer
+_worker_data = dict()
+
+
+def _initialise_worker(shared_data, initialise=None):
+    """
+    Store the data shared by all tasks in the worker process.
+
+    Args:
+        shared_data (dict): Keyword arguments passed to the function on every chunk.
+        initialise (function): Module-level function that builds the keyword arguments from the shared data.
+    """
+    _worker_data.clear()
+    _worker_data.update(initialise(shared_data) if initialise else shared_data)
+
+
+def _run_chunk(function, chunk):
+    """
+    Apply the function to a chunk using the data stored by the pool initializer.
+
+    Args:
+        function (function): Module-level function to apply.
+        chunk (DataFrame): Chunk of the parsed input data.
+
+    Returns:
+        object: The output of the function.
+    """
+    return function(chunk, **_worker_data)
+
+
+def create_progress_bar(function_key, total=None, disable=False):
+    """
+    Create the progress bar of a computation run with process_in_chunks, which is updated every time a chunk is done.
+
+    Args:
+        function_key (str): Key of the function in the progress bar messages (e.g. 'calibrator').
+        total (int): Number of rows to process, if known.
+        disable (bool): Whether to disable the progress bar.
+
+    Returns:
+        tqdm: The progress bar.
+    """
+    return tqdm(total=total, desc=pbar_message[function_key], unit=pbar_units[function_key], leave=False,
+                colour=pbar_colour, disable=disable, file=stdout)
+
+
+def split_in_chunks(parsed_input_data, chunk_size):
+    """
+    Split the parsed input data into consecutive chunks of rows.
+
+    Args:
+        parsed_input_data (DataFrame): Parsed input data.
+        chunk_size (int): Maximum number of rows per chunk.
+
+    Returns:
+        list: List of DataFrames, at least one (possibly empty).
+    """
+    n_rows = len(parsed_input_data)
+    return [parsed_input_data.iloc[start:start + chunk_size] for start in range(0, n_rows, chunk_size)] or \
+        [parsed_input_data]
+
+
+def create_worker_pool(shared_data, n_workers, initialise=None):
+    """
+    Create a pool of processes that can be reused by several calls to process_in_chunks with the same shared data.
+
+    Args:
+        shared_data (dict): Keyword arguments passed to the function on every chunk.
+        n_workers (int): Number of worker processes.
+        initialise (function): Module-level function that builds the keyword arguments from the shared data, run once
+            in every worker process.
+
+    Returns:
+        ProcessPoolExecutor: The pool of processes. It must be shut down by the caller.
+    """
+    return ProcessPoolExecutor(max_workers=n_workers, initializer=_initialise_worker,
+                               initargs=(shared_data, initialise))
+
+
+def process_in_chunks(function, parsed_input_data, shared_data, n_workers=1, chunk_size=None, executor=None,
+                      initialise=None, progress_bar=None):
+    """
+    Apply a function to chunks of the parsed input data, in a pool of processes if more than one worker is requested.
+        The data shared by all chunks (e.g. design matrices) is sent to each worker only once. Worker processes may be
+        started with spawn, so the shared data must be picklable; objects that are not can be rebuilt in every worker
+        by the initialise function.
+
+    Args:
+        function (function): Module-level function with signature function(chunk, **shared_data).
+        parsed_input_data (DataFrame): Parsed input data.
+        shared_data (dict): Keyword arguments passed to the function on every chunk.
+        n_workers (int): Number of worker processes. If 1, the chunks are processed in the current process.
+        chunk_size (int): Maximum number of rows per chunk. By default, the input is split evenly among the workers.
+        executor (ProcessPoolExecutor): Pool created by create_worker_pool with the same shared data. By default, a
+            new pool is created and shut down when all the chunks are processed.
+        initialise (function): Module-level function with signature initialise(shared_data) that returns the keyword
+            arguments passed to the function. It is run once per process.
+        progress_bar (tqdm): Progress bar advanced by the number of rows of every chunk processed.
+
+    Returns:
+        list: The output of the function for each chunk, in the order of the input.
+    """
+    if chunk_size is None:
+        chunk_size = max(1, ceil(len(parsed_input_data) / n_workers))
+    chunks = split_in_chunks(parsed_input_data, chunk_size)
+    if n_workers == 1 or len(chunks) == 1:
+        function_data = initialise(shared_data) if initialise else shared_data
+        return _track_progress((function(chunk, **function_data) for chunk in chunks), chunks, progress_bar)
+    if executor is not None:
+        return _track_progress(executor.map(_run_chunk, repeat(function), chunks), chunks, progress_bar)
+    with create_worker_pool(shared_data, min(n_workers, len(chunks)), initialise) as executor:
+        return _track_progress(executor.map(_run_chunk, repeat(function), chunks), chunks, progress_bar)
+
+
+def _track_progress(results, chunks, progress_bar):
+    """
+    Collect the results of the chunks in order, advancing the progress bar as each one is done.
+
+    Args:
+        results (iterator): The output of the function for each chunk.
+        chunks (list): The chunks of the parsed input data.
+        progress_bar (tqdm): Progress bar, or None.
+
+    Returns:
+        list: The output of the function for each chunk.
+    """
+    output = list()
+    for result, chunk in zip(results, chunks):
+        output.append(result)
+        if progress_bar is not None:
+            progress_bar.update(len(chunk))
+    return output
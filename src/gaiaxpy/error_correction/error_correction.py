@@ -11,7 +11,6 @@ from sys import stdout
 
 import numpy as np
 import pandas as pd
-from scipy.interpolate import interp1d
 from tqdm import tqdm
 
 from gaiaxpy.config.paths import correction_tables_path
@@ -37,50 +36,83 @@ def _read_system_table(system):
     raise FileNotFoundError(f'No correction table found for system {system}.')
 
 
-def _get_correction_array(_mag_G_values, system):
+@lru_cache(maxsize=None)
+def _load_correction_table(system):
+    """
+    Load the correction table of a system into arrays. The result is cached, so each table is only read once.
+
+    Args:
+        system (str): Label of the photometric system.
+
+    Returns:
+        dict: A dictionary containing the 1D arrays of lower edges ('min_Gmag_bin'), upper edges ('max_Gmag_bin') and
+            centres ('bin_centre') of the G magnitude bins, and the 2D array of correction factors ('factors'), one row
+            per bin and one column per band.
+    """
     correction_table = _read_system_table(system)
-    min_value, max_value = correction_table['min_Gmag_bin'].iloc[0], correction_table['max_Gmag_bin'].iloc[-1]
-    floor_mag_dict = correction_table.set_index('min_Gmag_bin').T.to_dict()
     factor_columns = [col for col in correction_table.columns if 'factor_' in col]
-    _mag_G_values = _mag_G_values.to_frame(name='mag_G')
-    _mag_G_values['row'] = _mag_G_values['mag_G'].map(lambda x: floor_mag_dict.get(float(np.floor(x))))
-    return _mag_G_values.apply(_get_correction_factor, args=(correction_table, factor_columns,
-                                                             min_value, max_value,), axis=1)
-
-
-def _get_correction_factor(mag_row, correction_table, factor_columns, min_value, max_value):
-    mag = mag_row['mag_G']
-    row = mag_row['row']
-    if (mag > max_value) or pd.isna(mag):
-        return correction_table[factor_columns].iloc[-1].values
-    elif mag < min_value:
-        return correction_table[factor_columns].iloc[0].values
-    bin_centre = row['bin_centre']
-    factors = np.array([row[factor] for factor in factor_columns])
-    if mag <= bin_centre:
-        return factors
-    range_row_max_Gmag_bin = row['max_Gmag_bin']
-    if bin_centre < mag < range_row_max_Gmag_bin:
-        try:
-            next_range_row = correction_table[correction_table['min_Gmag_bin'] == range_row_max_Gmag_bin].iloc[0]
-            next_factors = next_range_row[factor_columns]
-        except IndexError:
-            return factors
-        return interp1d(np.array([bin_centre, range_row_max_Gmag_bin]), np.vstack([factors, next_factors]), axis=0)(mag)
-    # Raise an exception if none of the conditions match
-    raise ValueError('Check the variables being used. The program should never fall in this case.')
+    arrays = {column: correction_table[column].to_numpy(dtype=float) for column in
+              ['min_Gmag_bin', 'max_Gmag_bin', 'bin_centre']}
+    arrays['factors'] = correction_table[factor_columns].to_numpy(dtype=float)
+    for array in arrays.values():
+        array.flags.writeable = False
+    return arrays
+
+
+def _get_correction_array(_mag_G_values, system):
+    """
+    Compute the correction factors of all the sources at once.
+
+    Sources are assigned to the bin containing their G magnitude. Above the bin centre, the factors are interpolated
+        linearly towards the factors of the next bin, which are reached at the upper edge of the bin. Sources brighter
+        than the first bin get the factors of the first bin, while sources fainter than the last bin or without G
+        magnitude get the factors of the last bin.
+
+    Args:
+        _mag_G_values (Series): G magnitudes of the sources.
+        system (str): Label of the photometric system.
+
+    Returns:
+        ndarray: 2D array containing the correction factors, one row per source and one column per band.
+    """
+    table = _load_correction_table(system)
+    min_bins, max_bins, bin_centres, factors = (table['min_Gmag_bin'], table['max_Gmag_bin'], table['bin_centre'],
+                                                table['factors'])
+    mag = np.asarray(_mag_G_values, dtype=float)
+    last_bin = len(min_bins) - 1
+    bin_index = np.clip(np.searchsorted(min_bins, mag, side='right') - 1, 0, last_bin)
+    correction = factors[bin_index]
+    # Only bins followed by a contiguous one can be interpolated
+    has_next_bin = np.append(min_bins[1:] == max_bins[:-1], False)
+    centre, upper_edge = bin_centres[bin_index], max_bins[bin_index]
+    to_interpolate = (mag > centre) & (mag < upper_edge) & has_next_bin[bin_index]
+    if to_interpolate.any():
+        lower_factors = correction[to_interpolate]
+        upper_factors = factors[bin_index[to_interpolate] + 1]
+        slope = (upper_factors - lower_factors) / (upper_edge - centre)[to_interpolate, np.newaxis]
+        correction[to_interpolate] = slope * (mag - centre)[to_interpolate, np.newaxis] + lower_factors
+    correction[(mag > max_bins[last_bin]) | np.isnan(mag)] = factors[last_bin]
+    correction[mag < min_bins[0]] = factors[0]
+    return correction
 
 
 def _correct_system(system_df, correction_array):
-    # Extract error columns
-    error_df = system_df[[column for column in system_df.columns if '_error' in column]]
-    error_df_columns = error_df.columns
-    if len(error_df_columns) != len(correction_array[0]):
+    """
+    Multiply the error columns of a system by their correction factors.
+
+    Args:
+        system_df (DataFrame): Photometry of the system.
+        correction_array (ndarray): 2D array containing the correction factors, one row per source and one column per
+            band.
+
+    Returns:
+        DataFrame: The corrected errors.
+    """
+    error_df_columns = [column for column in system_df.columns if '_error' in column]
+    if len(error_df_columns) != correction_array.shape[1]:
         raise ValueError('DataFrames should have the same number of columns.')
-    error_df = np.array(error_df)
-    correction_array = np.array([x for x in correction_array])
-    product_array = error_df * correction_array
-    return pd.DataFrame(product_array, columns=error_df_columns)
+    product_array = system_df[error_df_columns].to_numpy(dtype=float) * correction_array
+    return pd.DataFrame(product_array, columns=error_df_columns, index=system_df.index)
 
 
 # The correction can only be applied for the systems present in the config files
@@ -144,7 +176,7 @@ def _apply_error_correction(input_multi_photometry, photometric_system=None, out
         # Correct error magnitudes
         corrected_system = _correct_system(system_df, correction_array)
         # Apply correction to the original input_multi_photometry
-        input_multi_photometry.update(corrected_system)
+        input_multi_photometry[corrected_system.columns] = corrected_system
     output_data = PhotometryData(input_multi_photometry)
     output_data.data = cast_output(output_data)
     output_data.save(save_file, output_path, output_file, output_format, extension)
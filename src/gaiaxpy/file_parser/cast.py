@@ -4,6 +4,7 @@ cast.py
 Module to cast the data after parsing.
 """
 import numpy as np
+import pandas as pd
 from numpy.ma import MaskError, getdata
 from pandas.errors import IntCastingNaNError
 
@@ -43,6 +44,38 @@ def __replace_masked_constant(value):
     return value
 
 
+def __replace_in_column(column, function, replaced_types):
+    """
+    Apply a replacement function only to the values of a column that are instances of the given types. The types of
+        the values are found in a single pass, so columns without any of them are returned unchanged.
+
+    Args:
+        column (Series): Column of the parsed data.
+        function (function): Function returning the replacement of a value.
+        replaced_types (tuple): Types of the values to replace.
+
+    Returns:
+        Series: The column with the values replaced.
+    """
+    values = column.to_numpy()
+    if values.dtype != object:
+        # Numeric columns can only contain floats, which are only replaced if some of them are zero
+        if not (issubclass(values.dtype.type, replaced_types) and (values == 0.0).any()):
+            return column
+        values = values.astype(object)
+    value_types = list(map(type, values))
+    types_to_replace = {value_type for value_type in set(value_types) if issubclass(value_type, replaced_types)}
+    if not types_to_replace:
+        return column
+    values = values.copy()
+    for position in np.flatnonzero([value_type in types_to_replace for value_type in value_types]):
+        value = function(values[position])
+        # As with Series.apply, zero-dimensional arrays are replaced by their scalar value
+        values[position] = value.item() if isinstance(value, np.ndarray) and value.ndim == 0 else value
+    # Columns left with scalar values only get their type inferred
+    return pd.Series(values, index=column.index, name=column.name).infer_objects()
+
+
 def _cast(df):
     """
     Cast types to the defined ones to standardise the different input formats.
@@ -53,11 +86,11 @@ def _cast(df):
     # flake8: noqa
     for column in ['bp_n_parameters', 'bp_basis_function_id']:
         if column in df.columns:
-            df[column] = df[column].apply(lambda row: __replace_masked_constant(row))
+            df[column] = __replace_in_column(df[column], __replace_masked_constant, (np.ma.core.MaskedConstant,))
     for column, type_value in __type_map.items():
         try:
             if type_value == 'O':
-                df[column] = df[column].apply(lambda x: __replace_masked_array(x))
+                df[column] = __replace_in_column(df[column], __replace_masked_array, (np.ma.core.MaskedArray, float))
             else:
                 df[column] = df[column].astype(type_value)
         except (TypeError, IntCastingNaNError):
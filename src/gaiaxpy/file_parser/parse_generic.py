@@ -3,13 +3,15 @@ parse_generic.py
 ====================================
 Module to parse input files containing spectra.
 """
+from io import StringIO
+from itertools import islice
 from os.path import splitext
 
 import pandas as pd
 from astropy.io.votable import parse_single_table
 from astropy.table import Table
 
-from gaiaxpy.core.generic_functions import array_to_symmetric_matrix, str_to_array
+from gaiaxpy.core.generic_functions import arrays_to_symmetric_matrices, str_column_to_arrays
 from .cast import _cast
 
 valid_extensions = ['avro', 'csv', 'ecsv', 'fits', 'xml']
@@ -83,9 +85,52 @@ class GenericParser(object):
             self.print_info_msg(done=True)
         return parsed_data, extension
 
+    def parse_file_in_chunks(self, file_path, chunk_size, disable_info=False):
+        """
+        Parse the input file in chunks of consecutive rows, so that only one chunk needs to be held in memory at a
+            time. CSV and AVRO files are read incrementally, while FITS and XML files are read at once and then split.
+
+        Args:
+            file_path (str): Path to a file.
+            chunk_size (int): Maximum number of rows per chunk.
+            disable_info (bool): Whether to disable the progress tracker or not.
+
+        Yields:
+            tuple: A tuple containing:
+                DataFrame: Pandas DataFrame representing a chunk of the file.
+                str: File extension ('.csv', '.fits', or '.xml').
+        """
+        if not disable_info:
+            self.print_info_msg()
+        extension = _get_file_extension(file_path)
+        parser = self.get_parser(extension)
+        if extension in ['csv', 'ecsv']:
+            chunks = (parser(csv_chunk) for csv_chunk in _split_csv(file_path, chunk_size))
+        elif extension == 'avro':
+            chunks = self._parse_avro_in_chunks(file_path, chunk_size)
+        else:
+            chunks = _split_rows(parser(file_path), chunk_size)
+        for chunk in chunks:
+            yield _cast(chunk), extension
+        if not disable_info:
+            self.print_info_msg(done=True)
+
     def _parse_avro(self, avro_file):
         raise NotImplementedError('Method not implemented for base class.')
 
+    def _parse_avro_in_chunks(self, avro_file, chunk_size):
+        """
+        Parse the input AVRO file in chunks of consecutive rows. By default, the file is read at once and then split.
+
+        Args:
+            avro_file (str): Path to an AVRO file.
+            chunk_size (int): Maximum number of rows per chunk.
+
+        Returns:
+            iterator: Pandas DataFrames representing consecutive chunks of the file.
+        """
+        return _split_rows(self._parse_avro(avro_file), chunk_size)
+
     def _parse_csv(self, csv_file, _array_columns=None, _matrix_columns=None, _usecols=None):
         """
         Parse the input CSV file and store the result in a pandas DataFrame.
@@ -101,14 +146,14 @@ class GenericParser(object):
             DataFrame: A pandas DataFrame representing the CSV file.
         """
         df = pd.read_csv(csv_file, comment='#', float_precision='round_trip', usecols=_usecols)
-        if _array_columns:  # Pandas converters seemed slower
+        if _array_columns:  # Pandas converters seemed slower, each column is parsed at once
             for column in _array_columns:
                 if column in df.columns:
-                    df[column] = df[column].apply(lambda x: str_to_array(x))
+                    df[column] = str_column_to_arrays(df[column])
         if _matrix_columns:
             for size_column, values_column in _matrix_columns:
-                df[values_column] = df.apply(lambda row: array_to_symmetric_matrix(str_to_array(row[values_column]),
-                                                                                   row[size_column]), axis=1)
+                df[values_column] = arrays_to_symmetric_matrices(str_column_to_arrays(df[values_column]),
+                                                                 df[size_column])
         return df
 
     def _parse_fits(self, fits_file, _array_columns=None, _matrix_columns=None, _usecols=None):
@@ -129,8 +174,7 @@ class GenericParser(object):
         df = table.to_pandas()[_usecols] if _usecols else table.to_pandas()
         if _matrix_columns:
             for size_column, values_column in _matrix_columns:
-                df[values_column] = df.apply(lambda row: array_to_symmetric_matrix(row[values_column],
-                                                                                   row[size_column]), axis=1)
+                df[values_column] = arrays_to_symmetric_matrices(df[values_column], df[size_column])
         return df
 
     def _parse_xml(self, xml_file, _array_columns=None, _matrix_columns=None, _usecols=None):
@@ -153,8 +197,7 @@ class GenericParser(object):
         df = table.to_pandas()[_usecols] if _usecols else table.to_pandas()
         if _matrix_columns:
             for size_column, values_column in _matrix_columns:
-                df[values_column] = df.apply(lambda row: array_to_symmetric_matrix(row[values_column],
-                                                                                   row[size_column]), axis=1)
+                df[values_column] = arrays_to_symmetric_matrices(df[values_column], df[size_column])
         return df
 
     def print_info_msg(self, done=False):
@@ -176,3 +219,67 @@ def _get_file_extension(file_path):
     """
     _, file_extension = splitext(file_path)
     return file_extension[1:]
+
+
+def _split_csv(csv_file, chunk_size):
+    """
+    Split a CSV file into in-memory CSV files containing the same header and up to chunk_size rows each.
+
+    Args:
+        csv_file (str): Path to a CSV file.
+        chunk_size (int): Maximum number of rows per chunk.
+
+    Yields:
+        StringIO: In-memory CSV file containing a chunk of the input file.
+    """
+    with open(csv_file, 'r') as f:
+        records = _split_csv_records(f)
+        # Comments (e.g. the ECSV metadata) and column names are repeated in every chunk
+        header = []
+        for record in records:
+            header.append(record)
+            if not record.startswith('#'):
+                break
+        rows = (record for record in records if record.strip())
+        while True:
+            chunk_rows = list(islice(rows, chunk_size))
+            if not chunk_rows:
+                break
+            yield StringIO(''.join(header + chunk_rows))
+
+
+def _split_csv_records(lines):
+    """
+    Group the lines of a CSV file into records. Quoted values may contain line breaks, so a record continues until all
+        its quotes are closed (escaped quotes are doubled, so they do not change the parity of the count).
+
+    Args:
+        lines (iterable): Lines of a CSV file.
+
+    Yields:
+        str: A complete record, including its line breaks.
+    """
+    record, n_quotes = [], 0
+    for line in lines:
+        record.append(line)
+        n_quotes += line.count('"')
+        if n_quotes % 2 == 0:
+            yield ''.join(record)
+            record, n_quotes = [], 0
+    if record:  # Unbalanced quotes, the error is left to the CSV parser
+        yield ''.join(record)
+
+
+def _split_rows(df, chunk_size):
+    """
+    Split a DataFrame into chunks of consecutive rows.
+
+    Args:
+        df (DataFrame): Input DataFrame.
+        chunk_size (int): Maximum number of rows per chunk.
+
+    Yields:
+        DataFrame: Chunk of the input DataFrame.
+    """
+    for start in range(0, len(df), chunk_size):
+        yield df.iloc[start:start + chunk_size]
@@ -4,7 +4,8 @@ parse_internal_continuous.py
 Module to parse input files containing internally calibrated continuous spectra.
 """
 
-import numpy as np
+from itertools import islice
+
 import pandas as pd
 from fastavro import __version__ as fa_version
 from hdfs import InsecureClient
@@ -12,13 +13,13 @@ from hdfs.ext.avro import AvroReader
 from packaging import version
 from requests.exceptions import ConnectionError
 
-from gaiaxpy.core.generic_functions import array_to_symmetric_matrix, rename_with_required
+from gaiaxpy.core.generic_functions import arrays_to_symmetric_matrices, rename_with_required
 from .cast import _cast
 from .parse_generic import GenericParser
-from .utils import _csv_to_avro_map, _get_from_dict
+from .utils import _append_avro_record, _avro_values_to_column, _build_avro_fields_tree, _csv_to_avro_map
 from ..core.custom_errors import SelectorNotImplementedError
 from ..core.satellite import BANDS
-from ..spectrum.utils import get_covariance_matrix
+from ..spectrum.utils import get_covariance_column
 
 # Columns that contain arrays (as strings)
 array_columns = ['bp_coefficients', 'bp_coefficient_errors', 'rp_coefficients', 'rp_coefficient_errors']
@@ -66,7 +67,7 @@ class InternalContinuousParser(GenericParser):
         df = super()._parse_csv(csv_file, _array_columns=_array_columns, _matrix_columns=_matrix_columns,
                                 _usecols=_usecols)
         for band in BANDS:
-            df[f'{band}_covariance_matrix'] = df.apply(get_covariance_matrix, axis=1, args=(band,))
+            df[f'{band}_covariance_matrix'] = get_covariance_column(df, band)
         df = rename_with_required(df, self.additional_columns)
         return df
 
@@ -95,7 +96,7 @@ class InternalContinuousParser(GenericParser):
         df = super()._parse_fits(fits_file, _array_columns=_array_columns, _matrix_columns=_matrix_columns,
                                  _usecols=_usecols)
         for band in BANDS:
-            df[f'{band}_covariance_matrix'] = df.apply(get_covariance_matrix, axis=1, args=(band,))
+            df[f'{band}_covariance_matrix'] = get_covariance_column(df, band)
         df = rename_with_required(df, self.additional_columns)
         return df
 
@@ -123,12 +124,12 @@ class InternalContinuousParser(GenericParser):
         df = super()._parse_xml(xml_file, _array_columns=_array_columns, _matrix_columns=_matrix_columns,
                                 _usecols=_usecols)
         for band in BANDS:
-            df[f'{band}_covariance_matrix'] = df.apply(get_covariance_matrix, axis=1, args=(band,))
+            df[f'{band}_covariance_matrix'] = get_covariance_column(df, band)
         df = rename_with_required(df, self.additional_columns)
         return df
 
     @staticmethod
-    def __process_avro_record(record, additional_columns=None):
+    def __get_avro_keys_map(additional_columns=None):
         _avro_keys_map = _csv_to_avro_map.copy()
         intersection_keys = [key for key in _avro_keys_map.keys() if key in additional_columns.keys()]
         if intersection_keys:
@@ -136,12 +137,29 @@ class InternalContinuousParser(GenericParser):
                              f' Keys are: {",".join(intersection_keys)}')
         if additional_columns is not None:
             _avro_keys_map.update(additional_columns)
-        return {key: np.array(_get_from_dict(record, _avro_keys_map[key])) if isinstance(
-            _get_from_dict(record, _avro_keys_map[key]), list) else _get_from_dict(
-            record, _avro_keys_map[key]) for key in _avro_keys_map.keys()}
+        return _avro_keys_map
 
     @staticmethod
-    def __get_records_up_to_1_4_7(avro_file, additional_columns, selector, **kwargs):
+    def __decode_records(records, avro_keys_map):
+        """
+        Decode AVRO records into a DataFrame column by column. The paths of the fields are resolved once, the values
+            are appended to one list per column, and the arrays of each column are converted at once.
+
+        Args:
+            records (iterable): AVRO records.
+            avro_keys_map (dict): Mapping from the column names to the paths of the AVRO fields containing their values.
+
+        Returns:
+            DataFrame: Pandas DataFrame containing one row per record.
+        """
+        fields_tree = _build_avro_fields_tree(avro_keys_map)
+        columns = {column: list() for column in avro_keys_map}
+        for record in records:
+            _append_avro_record(record, fields_tree, columns)
+        return pd.DataFrame({column: _avro_values_to_column(values) for column, values in columns.items()})
+
+    @staticmethod
+    def __get_records_up_to_1_4_7(avro_file, selector, **kwargs):
         address = kwargs.get('address', None)
         if address:
             raise ValueError('HDFS access not implemented for fastavro versions older than 1.4.7.')
@@ -151,11 +169,7 @@ class InternalContinuousParser(GenericParser):
         avro_reader = avro_reader if selector is None else filter(selector, avro_reader)
         record = avro_reader.next()
         while record:
-            try:
-                current_record = InternalContinuousParser.__process_avro_record(record, additional_columns)
-                yield current_record
-            except KeyError:
-                raise KeyError("Keys in the input file don't match the expected ones.")
+            yield record
             try:
                 record = avro_reader.next()
             except StopIteration:
@@ -163,7 +177,7 @@ class InternalContinuousParser(GenericParser):
                 break
 
     @staticmethod
-    def __get_records_later_than_1_4_7(avro_file, additional_columns, selector, **kwargs):
+    def __get_records_later_than_1_4_7(avro_file, selector, **kwargs):
         def __yield_local_records(_avro_file):
             from fastavro import block_reader
             with open(_avro_file, 'rb') as fo:
@@ -180,9 +194,25 @@ class InternalContinuousParser(GenericParser):
         address = kwargs.get('address', None)
         port = kwargs.get('port', None)
         records = __yield_remote_records(avro_file) if address else __yield_local_records(avro_file)
-        records = records if selector is None else filter(selector, records)
-        for record in records:
-            yield InternalContinuousParser.__process_avro_record(record, additional_columns)
+        yield from records if selector is None else filter(selector, records)
+
+    @staticmethod
+    def __get_records_function():
+        if version.parse(fa_version) <= version.parse('1.4.7'):
+            return InternalContinuousParser.__get_records_up_to_1_4_7
+        elif version.parse(fa_version) > version.parse('1.4.7'):
+            return InternalContinuousParser.__get_records_later_than_1_4_7
+        raise ValueError(f'Fastavro version {fa_version} may not have been parsed properly.')
+
+    def __get_records_arguments(self, avro_file):
+        records_arguments = {
+            'avro_file': avro_file,
+            'selector': self.selector
+        }
+        if hasattr(self, 'address') and hasattr(self, 'port'):
+            records_arguments['address'] = self.address
+            records_arguments['port'] = self.port
+        return records_arguments
 
     def _parse_avro(self, avro_file):
         """
@@ -199,7 +229,8 @@ class InternalContinuousParser(GenericParser):
             retries = 0
             while retries < max_conn_retries:
                 try:
-                    _df = pd.DataFrame(__get_records(**_records_arguments))
+                    _df = InternalContinuousParser.__decode_records(__get_records(**_records_arguments),
+                                                                    avro_keys_map)
                     break
                 except ConnectionError:
                     retries += 1
@@ -208,27 +239,38 @@ class InternalContinuousParser(GenericParser):
                     f'Failed to connect to HDFS after {max_conn_retries} attempts for file {avro_file}.')
             return _df
 
-        if version.parse(fa_version) <= version.parse('1.4.7'):
-            __get_records = InternalContinuousParser.__get_records_up_to_1_4_7
-        elif version.parse(fa_version) > version.parse('1.4.7'):
-            __get_records = InternalContinuousParser.__get_records_later_than_1_4_7
-        else:
-            raise ValueError(f'Fastavro version {fa_version} may not have been parsed properly.')
-        records_arguments = {
-            'avro_file': avro_file,
-            'additional_columns': self.additional_columns,
-            'selector': self.selector
-        }
-        if hasattr(self, 'address') and hasattr(self, 'port'):
-            records_arguments['address'] = self.address
-            records_arguments['port'] = self.port
-        df = __records_to_df(**records_arguments)
+        __get_records = InternalContinuousParser.__get_records_function()
+        avro_keys_map = InternalContinuousParser.__get_avro_keys_map(self.additional_columns)
+        df = __records_to_df(**self.__get_records_arguments(avro_file))
+        return InternalContinuousParser.__process_avro_df(df)
+
+    def _parse_avro_in_chunks(self, avro_file, chunk_size):
+        """
+        Parse the input AVRO file in chunks of consecutive records. Only the records of one chunk are held in memory at
+            a time.
+
+        Args:
+            avro_file (str): Path to an AVRO file.
+            chunk_size (int): Maximum number of records per chunk.
+
+        Yields:
+            DataFrame: Pandas DataFrame representing a chunk of the AVRO file.
+        """
+        avro_keys_map = InternalContinuousParser.__get_avro_keys_map(self.additional_columns)
+        records = InternalContinuousParser.__get_records_function()(**self.__get_records_arguments(avro_file))
+        while True:
+            df = InternalContinuousParser.__decode_records(islice(records, chunk_size), avro_keys_map)
+            if df.empty:
+                break
+            yield InternalContinuousParser.__process_avro_df(df)
+
+    @staticmethod
+    def __process_avro_df(df):
         # Pairs of the form (matrix_size (N), values_to_put_in_matrix)
         to_matrix_columns = [('bp_n_parameters', 'bp_coefficient_covariances'),
                              ('rp_n_parameters', 'rp_coefficient_covariances')]
         for size_column, values_column in to_matrix_columns:
-            df[values_column] = df.apply(lambda row: array_to_symmetric_matrix(row[values_column], row[size_column]),
-                                         axis=1)
+            df[values_column] = arrays_to_symmetric_matrices(df[values_column], df[size_column])
         for band in BANDS:
-            df[f'{band}_covariance_matrix'] = df.apply(get_covariance_matrix, axis=1, args=(band,))
+            df[f'{band}_covariance_matrix'] = get_covariance_column(df, band)
         return _cast(df)
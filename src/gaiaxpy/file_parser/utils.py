@@ -4,17 +4,7 @@ utils.py
 Module containing auxiliary functions of the parsers.
 """
 
-import operator
-from functools import reduce
-
-
-def _get_from_dict(dictionary, _map):
-    try:
-        return reduce(operator.getitem, _map, dictionary)
-    except TypeError:
-        return float('NaN')
-    except KeyError:
-        raise KeyError(f'Element {_map} not found in AVRO dictionary. Is it an actual field in the input file?')
+import numpy as np
 
 
 # This dictionary contains the mapping from the usual CSV fields to the AVRO fields.
@@ -46,3 +36,81 @@ _csv_to_avro_map = {'source_id': ['sourceId'],
                     'rp_coefficients': ['rpSpec', 'solution', 'parameters'],
                     'bp_coefficient_covariances': ['bpSpec', 'solution', 'covariance'],
                     'bp_coefficients': ['bpSpec', 'solution', 'parameters']}
+
+
+def _build_avro_fields_tree(keys_map):
+    """
+    Build the tree of nested AVRO fields needed to fill the columns, so that the path of each column is resolved once
+        per file and every nested record is looked up only once per record.
+
+    Args:
+        keys_map (dict): Mapping from the column names to the paths of the AVRO fields containing their values.
+
+    Returns:
+        dict: Root node of the tree. Each node contains the path to it, the columns read from its fields, its nested
+            fields and all the columns found below it.
+    """
+    tree = {'path': [], 'columns': list(), 'fields': dict(), 'all_columns': list()}
+    for column, path in keys_map.items():
+        node = tree
+        for field in path[:-1]:
+            node['all_columns'].append(column)
+            node = node['fields'].setdefault(field, {'path': node['path'] + [field], 'columns': list(),
+                                                     'fields': dict(), 'all_columns': list()})
+        node['all_columns'].append(column)
+        node['columns'].append((path[-1], column))
+    return tree
+
+
+def _append_avro_record(record, node, columns):
+    """
+    Append the values of an AVRO record to the lists of values of the columns. The columns inside a nested record that
+        is missing (e.g. the spectrum of a missing band) get NaN values.
+
+    Args:
+        record (dict): AVRO record, or nested record of the given node.
+        node (dict): Node of the tree of AVRO fields.
+        columns (dict): Lists of values of each column.
+    """
+    fields = node['fields']
+    try:
+        for field, column in node['columns']:
+            columns[column].append(record[field])
+        nested_records = [record[field] for field in fields]
+    except KeyError as err:
+        raise KeyError(f'Element {node["path"] + [err.args[0]]} not found in AVRO dictionary. Is it an actual field in '
+                       f'the input file?')
+    for nested_record, child in zip(nested_records, fields.values()):
+        if isinstance(nested_record, dict):
+            _append_avro_record(nested_record, child, columns)
+        else:
+            for column in child['all_columns']:
+                columns[column].append(float('NaN'))
+
+
+def _avro_values_to_column(values):
+    """
+    Convert the values of a column decoded from AVRO records. Lists are converted to arrays. If all of them have the
+        same length, they are converted at once and the arrays are the rows of a single 2D array.
+
+    Args:
+        values (list): Values of the column.
+
+    Returns:
+        list or ndarray: The values of the column, in an array of objects if it contains arrays.
+    """
+    positions = [position for position, value in enumerate(values) if isinstance(value, list)]
+    if not positions:
+        return values
+    column = np.empty(len(values), dtype=object)
+    for position, value in enumerate(values):
+        column[position] = value
+    lists = [values[position] for position in positions]
+    stacked = np.array(lists) if len({len(value) for value in lists}) == 1 else None
+    if stacked is not None and stacked.ndim == 2:
+        for position, array in zip(positions, stacked):
+            column[position] = array
+    else:
+        for position, value in zip(positions, lists):
+            column[position] = np.array(value)
+    return column
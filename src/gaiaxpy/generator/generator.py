@@ -1,6 +1,7 @@
 from pathlib import Path
 from typing import Union, Optional
 
+import numpy as np
 import pandas as pd
 
 from gaiaxpy.colour_equation.xp_filter_system_colour_equation import _apply_colour_equation
@@ -9,8 +10,9 @@ from gaiaxpy.error_correction.error_correction import _apply_error_correction
 from gaiaxpy.input_reader.input_reader import InputReader
 from gaiaxpy.output.photometry_data import PhotometryData
 from .multi_synthetic_photometry_generator import MultiSyntheticPhotometryGenerator
-from .photometric_system import PhotometricSystem
-from ..core.input_validator import validate_save_arguments
+from .photometric_system import PhotometricSystem, _get_systems_by_name
+from ..core.input_validator import validate_save_arguments, validate_parallel_arguments, validate_dtype
+from ..core.parallel import create_progress_bar, process_in_chunks
 from ..file_parser.cast import _cast
 
 
@@ -18,8 +20,8 @@ def generate(input_object: Union[list, Path, pd.DataFrame, str], photometric_sys
              truncation: bool = False, output_path: Union[Path, str] = '.',
              output_file: str = 'output_synthetic_photometry',
              output_format: str = None, save_file: bool = True, error_correction: bool = False,
-             additional_columns: Optional[Union[dict, list, str]] = None, username: str = None, password: str = None) \
-        -> pd.DataFrame:
+             additional_columns: Optional[Union[dict, list, str]] = None, username: str = None, password: str = None,
+             n_workers: int = 1, chunk_size: int = None, dtype: type = np.float64) -> pd.DataFrame:
     """
     Synthetic photometry utility: generates synthetic photometry in a set of available systems from the input
     internally-calibrated continuously-represented mean spectra.
@@ -45,6 +47,11 @@ def generate(input_object: Union[list, Path, pd.DataFrame, str], photometric_sys
             columns must be available in the input (files, DataFrames) or in the Archive response (lists, queries).
         username (str): Cosmos username, only suggested when input_object is a list or ADQL query.
         password (str): Cosmos password, only suggested when input_object is a list or ADQL query.
+        n_workers (int): Number of processes used to compute the photometry. The input is split into chunks which are
+            processed in parallel, and the results are concatenated in the order of the input.
+        chunk_size (int): Maximum number of sources per chunk. By default, the input is split evenly among the workers.
+        dtype (type): Floating-point type of the photometry in the output, either np.float64 (default) or np.float32.
+            The photometry is computed in double precision and rounded, additional columns keep their type.
 
     Returns:
         DataFrame: A DataFrame of all synthetic photometry results.
@@ -52,7 +59,7 @@ def generate(input_object: Union[list, Path, pd.DataFrame, str], photometric_sys
     return _generate(input_object=input_object, photometric_system=photometric_system, truncation=truncation,
                      output_path=output_path, output_file=output_file, output_format=output_format,
                      save_file=save_file, error_correction=error_correction, additional_columns=additional_columns,
-                     username=username, password=password)
+                     username=username, password=password, n_workers=n_workers, chunk_size=chunk_size, dtype=dtype)
 
 
 def _generate(input_object: Union[list, Path, pd.DataFrame, str], *, photometric_system: Union[list, PhotometricSystem],
@@ -60,7 +67,8 @@ def _generate(input_object: Union[list, Path, pd.DataFrame, str], *, photometric
               output_file: str = 'output_synthetic_photometry', output_format: str = None, save_file: bool = True,
               error_correction: bool = False, additional_columns: Optional[Union[dict, list, str]] = None,
               selector=None, username: str = None, password: str = None, bp_model: str = 'v375wi',
-              rp_model: str = 'v142r') -> pd.DataFrame:
+              rp_model: str = 'v142r', n_workers: int = 1, chunk_size: int = None,
+              dtype: type = np.float64) -> pd.DataFrame:
     """
     Internal function of the calibration utility. Refer to "generate".
 
@@ -91,6 +99,8 @@ def _generate(input_object: Union[list, Path, pd.DataFrame, str], *, photometric
 
     validate_photometric_system(photometric_system)
     validate_save_arguments(generate.__defaults__[2], output_file, generate.__defaults__[3], output_format, save_file)
+    validate_parallel_arguments(n_workers, chunk_size)
+    validate_dtype(dtype)
     # Prepare systems, keep track of original systems (especially required for error_correction)
     internal_phot_system = photometric_system.copy() if isinstance(photometric_system, list) else (
         [photometric_system].copy())
@@ -106,17 +116,19 @@ def _generate(input_object: Union[list, Path, pd.DataFrame, str], *, photometric
     additional_data = parsed_input_data[list(additional_columns.keys())]
     # Generate photometry
     phot_generator = MultiSyntheticPhotometryGenerator(internal_phot_system, bp_model=bp_model, rp_model=rp_model)
-    photometry_df = phot_generator.generate(parsed_input_data, extension, output_file=None, output_format=None,
-                                            save_file=False, truncation=truncation)
-    photometry_df = _apply_colour_equation(photometry_df, photometric_system=internal_phot_system, save_file=False,
-                                           disable_info=True)
-    if error_correction:
-        photometry_df = _apply_error_correction(photometry_df, photometric_system=photometric_system, save_file=False,
-                                                disable_info=True)
-        if not is_gaia_in_input:  # Remove Gaia_DR3_Vega system from the final result
-            gaia_label = gaia_system.get_system_label()
-            gaia_columns = [column for column in photometry_df if column.startswith(gaia_label)]
-            photometry_df = photometry_df.drop(columns=gaia_columns)
+    kernels, system_columns = phot_generator._load_kernels()
+    # Photometric systems are sent to the workers by name, they are rebuilt by _build_chunk_arguments
+    requested_systems = photometric_system if isinstance(photometric_system, list) else [photometric_system]
+    shared_data = {'system_names': [system.get_system_name() for system in internal_phot_system],
+                   'requested_system_names': [system.get_system_name() for system in requested_systems],
+                   'bp_model': bp_model, 'rp_model': rp_model, 'kernels': kernels, 'system_columns': system_columns,
+                   'truncation': truncation, 'error_correction': error_correction,
+                   'drop_gaia': error_correction and not is_gaia_in_input, 'dtype': dtype}
+    with create_progress_bar('photometry', len(parsed_input_data)) as progress_bar:
+        photometry_df = pd.concat(process_in_chunks(_generate_chunk, parsed_input_data, shared_data,
+                                                    n_workers=n_workers, chunk_size=chunk_size,
+                                                    initialise=_build_chunk_arguments, progress_bar=progress_bar),
+                                  ignore_index=True)
     additional_data = additional_data[[c for c in additional_data.columns if c not in photometry_df.columns]]
     photometry_df = pd.concat([photometry_df, additional_data], axis=1)
     photometry_df = cast_output(photometry_df)
@@ -124,3 +136,59 @@ def _generate(input_object: Union[list, Path, pd.DataFrame, str], *, photometric
     output_data = PhotometryData(photometry_df)
     output_data.save(save_file, output_path, output_file, output_format, extension)
     return _cast(photometry_df)
+
+
+def _build_chunk_arguments(shared_data: dict) -> dict:
+    """
+    Build the keyword arguments of _generate_chunk from the data shared with the worker processes. PhotometricSystem
+        members cannot always be pickled, so they are shared by name and rebuilt here.
+
+    Args:
+        shared_data (dict): Data shared by all the chunks, with the names of the internal ('system_names') and the
+            requested ('requested_system_names') photometric systems and the instrument models.
+
+    Returns:
+        dict: Keyword arguments of _generate_chunk.
+    """
+    chunk_arguments = dict(shared_data)
+    internal_phot_system = _get_systems_by_name(chunk_arguments.pop('system_names'))
+    chunk_arguments['phot_generator'] = MultiSyntheticPhotometryGenerator(internal_phot_system,
+                                                                          bp_model=chunk_arguments.pop('bp_model'),
+                                                                          rp_model=chunk_arguments.pop('rp_model'))
+    chunk_arguments['photometric_system'] = _get_systems_by_name(chunk_arguments.pop('requested_system_names'))
+    return chunk_arguments
+
+
+def _generate_chunk(parsed_input_data: pd.DataFrame, *, phot_generator: MultiSyntheticPhotometryGenerator,
+                    kernels: dict, system_columns: list, truncation: bool,
+                    photometric_system: Union[list, PhotometricSystem], error_correction: bool,
+                    drop_gaia: bool, dtype: type = np.float64) -> pd.DataFrame:
+    """
+    Generate the synthetic photometry of a chunk of the input, including the colour equation and the error correction.
+
+    Args:
+        parsed_input_data (DataFrame): Chunk of the parsed input data.
+        phot_generator (MultiSyntheticPhotometryGenerator): Generator for all the internal photometric systems.
+        kernels (dict): Photometry kernels of all the internal photometric systems, concatenated per band.
+        system_columns (list): Columns of the concatenated kernels corresponding to each internal photometric system.
+        truncation (bool): Toggle truncation of the set of bases.
+        photometric_system (list/PhotometricSystem): Photometric systems requested by the user.
+        error_correction (bool): Whether to apply the error correction.
+        drop_gaia (bool): Whether to remove the Gaia_DR3_Vega system, only added for the error correction.
+        dtype (type): Floating-point type of the photometry in the output.
+
+    Returns:
+        DataFrame: The synthetic photometry of the chunk.
+    """
+    photometry_df = phot_generator._generate_from_kernels(parsed_input_data, truncation, kernels, system_columns)
+    photometry_df = _apply_colour_equation(photometry_df, photometric_system=phot_generator.photometric_system,
+                                           save_file=False, disable_info=True)
+    if error_correction:
+        photometry_df = _apply_error_correction(photometry_df, photometric_system=photometric_system, save_file=False,
+                                                disable_info=True)
+        if drop_gaia:  # Remove Gaia_DR3_Vega system from the final result
+            gaia_label = PhotometricSystem.Gaia_DR3_Vega.get_system_label()
+            gaia_columns = [column for column in photometry_df if column.startswith(gaia_label)]
+            photometry_df = photometry_df.drop(columns=gaia_columns)
+    float_columns = photometry_df.select_dtypes(include='floating').columns
+    return photometry_df.astype(dict.fromkeys(float_columns, dtype))
@@ -103,6 +103,15 @@ class InternalPhotometricSystem(object):
     def _correct_error(self, flux, error):
         raise ValueError('Method not implemented in parent class.')
 
+    def _get_flux_offsets(self):
+        """
+        Get the flux offsets applied by the photometric system.
+
+        Returns:
+            ndarray: 1D array containing the offset of each band, or None if the system does not correct the fluxes.
+        """
+        raise ValueError('Method not implemented in parent class.')
+
     def _set_file(self, bp_model, rp_model):
         """
         Get the file path corresponding to the given label and key.
@@ -1,10 +1,9 @@
-from sys import stdout
+import numpy as np
+import pandas as pd
 
-from tqdm import tqdm
-
-from gaiaxpy.core.generic_variables import pbar_colour, pbar_units, pbar_message
-from gaiaxpy.spectrum.multi_synthetic_photometry import MultiSyntheticPhotometry
-from .synthetic_photometry_generator import SyntheticPhotometryGenerator
+from .synthetic_photometry_generator import (SyntheticPhotometryGenerator, _concatenate_kernels, _correct_photometry,
+                                             _get_photometry_corrections, _get_photometry_kernels,
+                                             _sample_photometry_batch)
 
 
 class MultiSyntheticPhotometryGenerator(SyntheticPhotometryGenerator):
@@ -19,10 +18,17 @@ class MultiSyntheticPhotometryGenerator(SyntheticPhotometryGenerator):
         self.rp_model = rp_model
 
     def generate(self, parsed_input_data, extension, output_file, output_format, save_file, truncation):
-        __FUNCTION_KEY = 'photometry'
-        # Recover attributes
-        systems = self.photometric_system
-        internal_systems = [system.value for system in systems]
+        return self._generate_from_kernels(parsed_input_data, truncation, *self._load_kernels())
+
+    def _load_sampled_bases(self):
+        """
+        Load the basis functions and merge arrays of every photometric system.
+
+        Returns:
+            tuple: A tuple containing the list of sampled basis functions and the list of merge arrays, one element per
+                photometric system.
+        """
+        internal_systems = [system.value for system in self.photometric_system]
         # Generate XP variables
         xp_sampling_list = [system.load_xpsampling_from_xml() for system in internal_systems]
         xp_sampling_grid_xp_merge_tuples_list = [system.load_xpmerge_from_xml() for system in internal_systems]
@@ -31,15 +37,47 @@ class MultiSyntheticPhotometryGenerator(SyntheticPhotometryGenerator):
         # Get basis functions list
         sampled_basis_func_list = [self._get_sampled_basis_functions(xp_sampling, xp_sampling_grid) for
                                    xp_sampling, xp_sampling_grid in zip(xp_sampling_list, xp_sampling_grid_list)]
-        # One list per system
-        photometry_list_of_lists = [self._create_photometry_list(parsed_input_data, phot_system,
-                                                                 sampled_basis_func, truncation, xp_merge)
-                                    for phot_system, sampled_basis_func, xp_merge
-                                    in zip(systems, sampled_basis_func_list, xp_merge_list)]
-        # Now the first list contains the photometries in all systems for the first source_id, and so on.
-        rearranged_photometry_list = [sublist for sublist in tqdm(zip(*photometry_list_of_lists),
-                                                                  desc=pbar_message[__FUNCTION_KEY],
-                                                                  total=len(parsed_input_data),
-                                                                  unit=pbar_units[__FUNCTION_KEY], leave=False,
-                                                                  colour=pbar_colour, file=stdout)]
-        return MultiSyntheticPhotometry(systems, rearranged_photometry_list)._generate_output_df()
+        return sampled_basis_func_list, xp_merge_list
+
+    def _load_kernels(self):
+        """
+        Load the photometry kernels of all the photometric systems, concatenated into one kernel per band. They only
+            depend on the systems, so they can be computed once and reused for any number of sources.
+
+        Returns:
+            tuple: The concatenated kernels and the columns of each photometric system, see _concatenate_kernels.
+        """
+        sampled_basis_func_list, xp_merge_list = self._load_sampled_bases()
+        return _concatenate_kernels([_get_photometry_kernels(sampled_basis_func, xp_merge) for
+                                     sampled_basis_func, xp_merge in zip(sampled_basis_func_list, xp_merge_list)])
+
+    def _generate_from_kernels(self, parsed_input_data, truncation, kernels, system_columns):
+        """
+        Generate the synthetic photometry of the input sources using already loaded kernels. The fluxes of all the
+            sources in all the systems are computed and corrected in a single pass, and only split per system to build
+            the output.
+
+        Args:
+            parsed_input_data (DataFrame): Parsed input data.
+            truncation (bool): Toggle truncation of the set of bases.
+            kernels (dict): Concatenated kernels of all the photometric systems.
+            system_columns (list): Columns of the concatenated kernels corresponding to each photometric system.
+
+        Returns:
+            DataFrame: The synthetic photometry in all systems, one row per source.
+        """
+        flux, error = _sample_photometry_batch(parsed_input_data, kernels, truncation)
+        # Corrections and magnitudes of all the bands of all the systems are computed in one pass
+        band_columns = np.concatenate([np.arange(system_slice.start, system_slice.stop) for system_slice in
+                                       system_columns])
+        photometry = _correct_photometry(flux[:, band_columns], error[:, band_columns],
+                                         _get_photometry_corrections(self.photometric_system))
+        columns = {'source_id': parsed_input_data['source_id'].to_numpy()}
+        first_band = 0
+        for phot_system in self.photometric_system:
+            label, bands = phot_system.get_system_label(), phot_system.get_bands()
+            for name in ['mag', 'flux', 'flux_error']:
+                columns.update({f'{label}_{name}_{band}': photometry[name][:, first_band + index] for index, band in
+                                enumerate(bands)})
+            first_band += len(bands)
+        return pd.DataFrame(columns)
@@ -87,6 +87,25 @@ PhotometricSystem = AutoName('PhotometricSystem', system_tuples)
 PhotometricSystem.get_available_systems = get_available_systems
 
 
+def _get_systems_by_name(names):
+    """
+    Get photometric systems from their names, e.g. to rebuild in a worker process the systems requested in the main
+        one. Additional systems are created again from the current configuration, as they may have been loaded after
+        PhotometricSystem was created.
+
+    Args:
+        names (list): Names of the photometric systems.
+
+    Returns:
+        list: List of PhotometricSystem objects, in the order of the names.
+    """
+    additional_names = [name for name in dict.fromkeys(names) if not _is_built_in_system(name)]
+    if additional_names:
+        additional_systems = AutoName('PhotometricSystem', [(name, create_system(name, _CFG_FILE_PATH)) for name in
+                                                            additional_names])
+    return [PhotometricSystem[name] if _is_built_in_system(name) else additional_systems[name] for name in names]
+
+
 def get_current_filters_path():
     _config_parser = ConfigParser()
     _config_parser.read(_CFG_FILE_PATH)
@@ -23,3 +23,6 @@ class RegularPhotometricSystem(InternalPhotometricSystem):
 
     def _correct_error(self, flux, error):
         return error
+
+    def _get_flux_offsets(self):
+        return None
@@ -28,3 +28,6 @@ class StandardisedPhotometricSystem(InternalPhotometricSystem):
         eef = abs(eef)
         flux_error_corr = error * eef
         return flux_error_corr
+
+    def _get_flux_offsets(self):
+        return self.offsets
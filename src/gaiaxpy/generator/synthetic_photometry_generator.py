@@ -6,11 +6,15 @@ Module for the generation of synthetic photometry.
 
 from configparser import ConfigParser
 
+import numpy as np
+
 from gaiaxpy.config.paths import config_ini_file
+from gaiaxpy.core.custom_errors import NoBandsAvailableError
 from gaiaxpy.core.satellite import BANDS
+from gaiaxpy.spectrum.absolute_sampled_spectrum import AbsoluteSampledSpectrum
 from gaiaxpy.spectrum.sampled_basis_functions import SampledBasisFunctions
 from gaiaxpy.spectrum.single_synthetic_photometry import SingleSyntheticPhotometry
-from gaiaxpy.spectrum.utils import get_covariance_matrix
+from gaiaxpy.spectrum.utils import _apply_flux_offsets, _flux_to_mag, get_covariance_matrix
 from gaiaxpy.spectrum.xp_continuous_spectrum import XpContinuousSpectrum
 
 config_parser = ConfigParser()
@@ -51,3 +55,133 @@ def _generate_synthetic_photometry(row, design_matrix, merge, truncation, photom
                  for band in BANDS}
     truncation = {band: row[f'{band}_n_relevant_bases'] for band in BANDS} if truncation else None
     return SingleSyntheticPhotometry(row['source_id'], cont_dict, design_matrix, merge, truncation, photometric_system)
+
+
+def _get_photometry_kernels(sampled_basis_func, merge):
+    """
+    Combine the basis functions sampled for a photometric system with its merge weights into one kernel per band.
+        Synthetic fluxes are linear in the coefficients, so the contribution of each band to the fluxes of a source is
+        the product of its coefficients and the kernel of the band.
+
+    Args:
+        sampled_basis_func (dict): The basis functions sampled for the photometric system, one entry per band.
+        merge (dict): Dictionary containing an array of weights per BP and one for RP, with one value per band of the
+            photometric system.
+
+    Returns:
+        dict: A dictionary containing the kernel of each band as SampledBasisFunctions.
+    """
+    return {band: SampledBasisFunctions.from_design_matrix(sampled_basis_func[band].get_sampling_grid(),
+                                                           sampled_basis_func[band].get_design_matrix() * merge[band])
+            for band in BANDS}
+
+
+def _concatenate_kernels(kernels_list):
+    """
+    Concatenate the kernels of several photometric systems, so that the photometry in all of them is obtained with a
+        single matrix product per band. Systems with identical kernels (e.g. a system and its standardised version)
+        share the same columns, which also guarantees that they get exactly the same fluxes.
+
+    Args:
+        kernels_list (list): The kernels of every photometric system as returned by _get_photometry_kernels.
+
+    Returns:
+        tuple: A tuple containing a dictionary with the concatenated kernel of each band as SampledBasisFunctions and a
+            list with the slice of the columns corresponding to each photometric system.
+    """
+    unique_kernels, unique_columns, system_columns = list(), list(), list()
+    n_columns = 0
+    for kernels in kernels_list:
+        for unique, columns in zip(unique_kernels, unique_columns):
+            if all(np.array_equal(kernels[band].get_design_matrix(), unique[band].get_design_matrix())
+                   for band in BANDS):
+                break
+        else:
+            width = kernels[BANDS.bp].get_design_matrix().shape[1]
+            columns = slice(n_columns, n_columns + width)
+            unique_kernels.append(kernels)
+            unique_columns.append(columns)
+            n_columns += width
+        system_columns.append(columns)
+    concatenated_kernels = {band: SampledBasisFunctions.from_design_matrix(
+        np.concatenate([kernels[band].get_sampling_grid() for kernels in unique_kernels]),
+        np.hstack([kernels[band].get_design_matrix() for kernels in unique_kernels])) for band in BANDS}
+    return concatenated_kernels, system_columns
+
+
+def _sample_photometry_batch(parsed_input_data, kernels, truncation):
+    """
+    Compute the fluxes and flux errors of all the sources in the input at once, before any correction specific to the
+        photometric system.
+
+    Args:
+        parsed_input_data (DataFrame): DataFrame containing the parsed input data, one source per row.
+        kernels (dict): The kernels of one or more photometric systems, one entry per band.
+        truncation (bool): Toggle truncation of the set of bases.
+
+    Returns:
+        tuple: A tuple containing the 2D arrays of fluxes and flux errors, with one row per source and one column per
+            column of the kernels. The photometry of the sources with a missing band is NaN.
+
+    Raises:
+        NoBandsAvailableError: If any source has no bands available.
+    """
+    split_photometry = AbsoluteSampledSpectrum.generate_spectra_batch(parsed_input_data, kernels,
+                                                                      with_correlation=False, truncation=truncation)
+    available = {band: split_photometry[band]['available'] for band in BANDS}
+    if not np.all(available[BANDS.bp] | available[BANDS.rp]):
+        raise NoBandsAvailableError()
+    both = available[BANDS.bp] & available[BANDS.rp]
+    bp_index, rp_index = [(np.cumsum(available[band]) - 1)[both] for band in BANDS]
+    bp, rp = split_photometry[BANDS.bp], split_photometry[BANDS.rp]
+    shape = (len(parsed_input_data), kernels[BANDS.bp].get_design_matrix().shape[1])
+    flux, error = np.full(shape, np.nan), np.full(shape, np.nan)
+    flux[both] = bp['flux'][bp_index] + rp['flux'][rp_index]
+    error[both] = np.sqrt(bp['error'][bp_index] ** 2 + rp['error'][rp_index] ** 2)
+    return flux, error
+
+
+def _get_photometry_corrections(photometric_systems):
+    """
+    Collect the zero-points and flux offsets of several photometric systems, so that the corrections of all their bands
+        can be applied at once.
+
+    Args:
+        photometric_systems (list): List of PhotometricSystem objects.
+
+    Returns:
+        dict: A dictionary containing the 1D arrays of zero-points ('zero_points'), flux offsets ('offsets') and the
+            mask of the bands belonging to standardised systems ('standardised'), one value per band of every system.
+    """
+    zero_points, offsets, standardised = list(), list(), list()
+    for photometric_system in photometric_systems:
+        system = photometric_system.value
+        n_bands = len(system.get_bands())
+        system_offsets = system._get_flux_offsets()
+        zero_points.append(system.get_zero_points())
+        offsets.append(np.zeros(n_bands) if system_offsets is None else system_offsets)
+        standardised.append(np.full(n_bands, system_offsets is not None))
+    return {'zero_points': np.concatenate(zero_points), 'offsets': np.concatenate(offsets),
+            'standardised': np.concatenate(standardised)}
+
+
+def _correct_photometry(flux, error, corrections):
+    """
+    Apply the corrections of one or more photometric systems to a block of fluxes and flux errors and compute the
+        magnitudes.
+
+    Args:
+        flux (ndarray): 2D array containing the fluxes, one row per source and one column per band.
+        error (ndarray): 2D array containing the flux errors, with the same shape as the fluxes.
+        corrections (dict): The corrections of every band, see _get_photometry_corrections.
+
+    Returns:
+        dict: A dictionary containing the 2D arrays of magnitudes ('mag'), fluxes ('flux') and flux errors
+            ('flux_error').
+    """
+    # Regular photometric systems keep the original values
+    corrected_flux, corrected_error = _apply_flux_offsets(flux, error, corrections['offsets'],
+                                                          corrections['standardised'])
+    # Magnitude is computed from the corrected flux
+    mag = _flux_to_mag(corrected_flux, corrections['zero_points'])
+    return {'mag': mag, 'flux': corrected_flux, 'flux_error': corrected_error}
@@ -1,7 +1,7 @@
 import numpy as np
 import pandas as pd
 
-from gaiaxpy.core.generic_functions import array_to_symmetric_matrix, rename_with_required
+from gaiaxpy.core.generic_functions import arrays_to_symmetric_matrices, rename_with_required
 from .dataframe_numpy_array_reader import DataFrameNumPyArrayReader
 from .dataframe_string_array_reader import DataFrameStringArrayReader
 from .required_columns import MANDATORY_INPUT_COLS, COV_INPUT_COLUMNS, CORR_INPUT_COLUMNS, TRUNCATION_COLS
@@ -9,7 +9,7 @@ from ..core.custom_errors import SelectorNotImplementedError
 from ..core.input_validator import check_column_overwrite
 from ..core.satellite import BANDS
 from ..file_parser.cast import _cast
-from ..spectrum.utils import get_covariance_matrix
+from ..spectrum.utils import get_covariance_column
 
 covariance_columns = ['bp_covariance_matrix', 'rp_covariance_matrix']
 matrix_columns = [('bp_n_parameters', 'bp_coefficient_correlations'),
@@ -81,11 +81,10 @@ class DataFrameReader(object):
             array_columns = []
         if needs_matrix_conversion(array_columns):
             for size_column, values_column in matrix_columns:
-                data[values_column] = data.apply(lambda row: array_to_symmetric_matrix(row[values_column],
-                                                                                       row[size_column]), axis=1)
+                data[values_column] = arrays_to_symmetric_matrices(data[values_column], data[size_column])
             if matrix_columns:
                 for band in BANDS:
-                    data[f'{band}_covariance_matrix'] = data.apply(get_covariance_matrix, axis=1, args=(band,))
+                    data[f'{band}_covariance_matrix'] = get_covariance_column(data, band)
                 self.requested_columns = self.requested_columns + covariance_columns
         if not self.disable_info:
             self.show_info_msg(done=True)
@@ -1,7 +1,7 @@
 import numpy as np
 import pandas as pd
 
-from gaiaxpy.core.generic_functions import str_to_array
+from gaiaxpy.core.generic_functions import str_column_to_arrays
 
 # Avoid warning, false positive
 pd.options.mode.chained_assignment = None
@@ -17,7 +17,7 @@ class DataFrameStringArrayReader(object):
         df = self.content
         array_columns = self.array_columns
         for column in array_columns:
-            df[column] = df[column].apply(lambda x: str_to_array(x))
+            df[column] = str_column_to_arrays(df[column])
         return df
 
     def _parse_brackets_arrays(self):
@@ -31,7 +31,37 @@ class InputReader(object):
         self.password = password
 
     def read(self):
+        parsed_data, extension = self.__get_reader(self.content).read()
+        extension = default_extension if extension is None else extension
+        return parsed_data, extension
+
+    def read_in_chunks(self, chunk_size):
+        """
+        Read the input in chunks of consecutive rows. DataFrames and local files are parsed one chunk at a time, so
+            that only one parsed chunk needs to be held in memory. Other inputs (e.g. lists of sources or ADQL queries)
+            are read at once and then split.
+
+        Args:
+            chunk_size (int): Maximum number of rows per chunk.
+
+        Yields:
+            tuple: A tuple containing:
+                DataFrame: A chunk of the parsed input data.
+                str: The extension of the input (the default one if the input is not a file).
+        """
         content = self.content
+        if isinstance(content, pd.DataFrame):
+            for start in range(0, len(content), chunk_size):
+                yield self.__get_reader(content.iloc[start:start + chunk_size]).read()[0], default_extension
+        elif (isinstance(content, Path) or isinstance(content, str)) and isfile(content):
+            for parsed_data, extension in self.__get_reader(content).read_in_chunks(chunk_size):
+                yield parsed_data, default_extension if extension is None else extension
+        else:
+            parsed_data, extension = self.read()
+            for start in range(0, len(parsed_data), chunk_size):
+                yield parsed_data.iloc[start:start + chunk_size], extension
+
+    def __get_reader(self, content):
         function = self.function
         truncation = self.truncation
         disable_info = self.disable_info
@@ -58,6 +88,4 @@ class InputReader(object):
                                 disable_info=disable_info)
         else:
             raise ValueError('The input provided does not match any of the expected input types.')
-        parsed_data, extension = reader.read()
-        extension = default_extension if extension is None else extension
-        return parsed_data, extension
+        return reader
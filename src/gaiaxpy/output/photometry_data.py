@@ -71,7 +71,7 @@ class PhotometryData(OutputData):
             output_file (str): Name of the output file.
         """
         photometry_df = self.data
-        header_lines = _build_photometry_header(photometry_df.columns)
+        header_lines = _build_photometry_header(photometry_df.columns, photometry_df.dtypes)
         Path(output_path).mkdir(parents=True, exist_ok=True)
         photometry_df.to_csv(join(output_path, f'{output_file}.ecsv'), index=False)
         _add_ecsv_header(header_lines, output_path, output_file)
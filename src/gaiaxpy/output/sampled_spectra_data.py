@@ -8,6 +8,7 @@ import warnings
 from os.path import join
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 from astropy.io import fits
 from astropy.io.votable.tree import Field, Param, Resource, VOTableFile
@@ -18,7 +19,7 @@ from numpy import ndarray
 
 from .output_data import OutputData
 from .utils import (_add_ecsv_header, _array_to_standard, _build_ecsv_header, _generate_fits_header,
-                    _get_sampling_dict, _load_header_dict, _get_col_subtype_len)
+                    _get_array_dtype, _get_sampling_dict, _load_header_dict, _get_col_subtype_len)
 
 try:
     from astropy.io.votable.tree import TableElement as ATable
@@ -40,55 +41,6 @@ class SampledSpectraData(OutputData):
             output_file (str): Name of the output file.
         """
 
-        def _save_avro_sampling(_positions, _output_path, _output_file):
-            """
-            Save the sampling in a separate avro file.
-
-            Args:
-                _positions (list): Sampling positions.
-                _output_path (str): Path where to store the output file.
-                _output_file (str): Name of the output file.
-            """
-            schema = {'doc': 'Output sampling.', 'name': 'Sampling', 'namespace': 'sampling', 'type': 'record',
-                      'fields': [{'name': 'pos', 'type': 'string'}, ], }
-            # Must be an iterable
-            sampling = [_get_sampling_dict(_positions)]
-            # Sampling field to string
-            sampling[0]['pos'] = str(sampling[0]['pos'])
-            # Validate that records match the schema
-            validate_many(sampling, schema)
-            _parsed_schema = parse_schema(schema)
-            with open(join(_output_path, f'{_output_file}_sampling.avro'), 'wb') as _output:
-                writer(_output, _parsed_schema, sampling)
-
-        def _generate_avro_schema(_spectra_dicts):
-            """
-            Generate the AVRO schema required to store the output.
-
-            Args:
-                _spectra_dicts (list): A list of dictionaries containing spectra.
-
-            Returns:
-                dict: A dictionary containing the parsed schema that matches the input.
-                list: A list of dictionaries with the modified input spectra according to the valid AVRO types.
-            """
-            field_to_type = {'source_id': 'long', 'xp': 'string', 'flux': 'string', 'flux_error': 'string',
-                             'correlation': 'string', 'standard_deviation': 'float'}
-
-            def build_field(keys):
-                return [{'name': key, 'type': field_to_type[key]} for key in keys]
-
-            schema = {'doc': 'Spectrum output.', 'name': 'Spectra', 'namespace': 'spectrum', 'type': 'record',
-                      'fields': build_field(_spectra_dicts[0].keys()), }
-            # Spectrum fields to string
-            for spectrum in _spectra_dicts:
-                for field, _type in field_to_type.items():
-                    if _type == 'string' and field in spectrum.keys() and not field == 'xp':
-                        spectrum[field] = str(tuple(spectrum[field]))
-            # Validate that records match the schema
-            validate_many(_spectra_dicts, schema)
-            return parse_schema(schema), _spectra_dicts
-
         data = self.data
         positions = self.positions
         Path(output_path).mkdir(parents=True, exist_ok=True)
@@ -108,15 +60,10 @@ class SampledSpectraData(OutputData):
             output_path (str): Path where to save the file.
             output_file (str): Name of the output file.
         """
-        data = self.data
-        positions = self.positions
-        modified_data = data.map(lambda x: _array_to_standard(x) if isinstance(x, ndarray) else x)
+        modified_data = _to_text_columns(self.data)
         Path(output_path).mkdir(parents=True, exist_ok=True)
         modified_data.to_csv(join(output_path, f'{output_file}.csv'), index=False)
-        # Assume the sampling is the same for all spectra
-        pos = [str(_array_to_standard(positions))]
-        sampling_df = pd.DataFrame({'pos': pos})
-        sampling_df.to_csv(join(output_path, f'{output_file}_sampling.csv'), index=False)
+        _save_csv_sampling(self.positions, output_path, output_file)
 
     def _save_ecsv(self, output_path, output_file):
         """
@@ -126,10 +73,8 @@ class SampledSpectraData(OutputData):
             output_path (str): Path where to save the file.
             output_file (str): Name of the output file.
         """
-        data = self.data
-        positions = self.positions
-        modified_data = data.map(lambda x: _array_to_standard(x, 'ecsv') if isinstance(x, ndarray) else x)
-        header_lines = _build_ecsv_header(modified_data, positions)
+        modified_data = _to_text_columns(self.data, 'ecsv')
+        header_lines = _build_ecsv_header(modified_data, self.positions, _get_array_dtype(self.data))
         Path(output_path).mkdir(parents=True, exist_ok=True)
         modified_data.to_csv(join(output_path, f'{output_file}.ecsv'), index=False)
         _add_ecsv_header(header_lines, output_path, output_file)
@@ -143,45 +88,13 @@ class SampledSpectraData(OutputData):
             output_file (str): Name of the output file.
         """
         warnings.filterwarnings('ignore', category=UnitsWarning)
-
-        def _flux_contains_none(arrays):
-            return any(arr is None for arr in arrays['flux'])
-
-        data = self.data
-        positions = self.positions
         # Create a list of HDUs
         hdu_list = list()
         # create a header to include the sampling
         hdr = fits.Header()
         primary_hdu = fits.PrimaryHDU(header=hdr)
         hdu_list.append(primary_hdu)
-        # Create a dictionary to hold all the data
-        output_by_column_dict = data.reset_index().to_dict(orient='list')
-        # Remove index from output dict
-        output_by_column_dict.pop('index', None)
-        spectra_keys = output_by_column_dict.keys()
-        data_type = data.attrs['data_type']
-        units_dict = data_type.get_units()
-        pos_len = len(positions)
-        contains_none = _flux_contains_none(output_by_column_dict)
-        # D: double precision float
-        flux_format = 'PD()' if contains_none else f'{pos_len}D'
-        # E: single precision float
-        flux_error_format = 'PE()' if contains_none else f'{pos_len}E'
-        aux_corr = data.get('correlation')
-        correlation_format = ''
-        if aux_corr is not None:
-            correlation_format = 'PD()' if contains_none else f"{_get_col_subtype_len(data, 'correlation')}D"
-        # Define formats for each type according to FITS
-        column_formats = {'source_id': 'K', 'xp': '2A', 'flux': flux_format, 'flux_error': flux_error_format,
-                          'correlation': correlation_format, 'standard_deviation': 'E'}
-        columns = [
-            fits.Column(name=key, array=[value if value is not None else [] for value in output_by_column_dict[key]],
-                        format=column_formats[key], unit=units_dict.get(key, '')) for key in spectra_keys]
-        header = _generate_fits_header(data, column_formats)
-        header['Sampling'] = str(tuple(positions))
-        hdu = fits.BinTableHDU.from_columns(columns, header=header)
-        hdu_list.append(hdu)
+        hdu_list.append(_build_fits_table_hdu(self.data, self.positions))
         # Put all HDUs together
         hdul = fits.HDUList(hdu_list)
         # Write the file and replace it if it already exists
@@ -212,8 +125,10 @@ class SampledSpectraData(OutputData):
             len_error = str(_spectra_flux_error_len)
             len_correlation = str(
                 len(_spectra_df['correlation'].iloc[0])) if 'correlation' in _spectra_df.columns else ''
-            fields_datatypes = {'source_id': 'long', 'xp': 'char', 'flux': 'double', 'flux_error': 'float',
-                                'correlation': 'double', 'standard_deviation': 'float'}
+            # Arrays are stored in single precision if they were computed in single precision
+            array_datatype = 'float' if _get_array_dtype(_spectra_df) == np.float32 else 'double'
+            fields_datatypes = {'source_id': 'long', 'xp': 'char', 'flux': array_datatype, 'flux_error': 'float',
+                                'correlation': array_datatype, 'standard_deviation': 'float'}
             fields_array_size = {'source_id': '', 'xp': '2', 'flux': len_flux, 'flux_error': len_error,
                                  'correlation': len_correlation, 'standard_deviation': ''}
             fields_id = {key: f'_{key}' for key in ['source_id', 'xp', 'flux', 'flux_error', 'correlation']}
@@ -257,3 +172,152 @@ class SampledSpectraData(OutputData):
         Path(output_path).mkdir(parents=True, exist_ok=True)
         output_path = join(output_path, f'{output_file}.xml')
         votable.to_xml(output_path)
+
+
+def _save_avro_sampling(positions, output_path, output_file):
+    """
+    Save the sampling in a separate avro file.
+
+    Args:
+        positions (list): Sampling positions.
+        output_path (str): Path where to store the output file.
+        output_file (str): Name of the output file.
+    """
+    schema = {'doc': 'Output sampling.', 'name': 'Sampling', 'namespace': 'sampling', 'type': 'record',
+              'fields': [{'name': 'pos', 'type': 'string'}, ], }
+    # Must be an iterable
+    sampling = [_get_sampling_dict(positions)]
+    # Sampling field to string
+    sampling[0]['pos'] = str(sampling[0]['pos'])
+    # Validate that records match the schema
+    validate_many(sampling, schema)
+    parsed_schema = parse_schema(schema)
+    with open(join(output_path, f'{output_file}_sampling.avro'), 'wb') as output:
+        writer(output, parsed_schema, sampling)
+
+
+def _get_avro_schema(columns):
+    """
+    Get the AVRO schema required to store the output. It only depends on the columns, the arrays of a spectrum can be
+        null if the corresponding band is missing in the input.
+
+    Args:
+        columns (iterable): Names of the columns of the output spectra.
+
+    Returns:
+        dict: A dictionary containing the parsed schema.
+    """
+    field_to_type = {'source_id': 'long', 'xp': 'string', 'flux': ['null', 'string'],
+                     'flux_error': ['null', 'string'], 'correlation': ['null', 'string'], 'standard_deviation': 'float'}
+    schema = {'doc': 'Spectrum output.', 'name': 'Spectra', 'namespace': 'spectrum', 'type': 'record',
+              'fields': [{'name': column, 'type': field_to_type[column]} for column in columns], }
+    return parse_schema(schema)
+
+
+def _to_avro_records(spectra_dicts):
+    """
+    Convert the arrays of the spectra to the string representation used in AVRO files.
+
+    Args:
+        spectra_dicts (list): A list of dictionaries containing spectra.
+
+    Returns:
+        list: The input list, with the arrays in the dictionaries converted to strings.
+    """
+    array_fields = ['flux', 'flux_error', 'correlation']
+    for spectrum in spectra_dicts:
+        for field in array_fields:
+            if spectrum.get(field) is not None:
+                spectrum[field] = str(tuple(spectrum[field]))
+    return spectra_dicts
+
+
+def _generate_avro_schema(spectra_dicts):
+    """
+    Generate the AVRO schema required to store the output.
+
+    Args:
+        spectra_dicts (list): A list of dictionaries containing spectra.
+
+    Returns:
+        dict: A dictionary containing the parsed schema that matches the input.
+        list: A list of dictionaries with the modified input spectra according to the valid AVRO types.
+    """
+    parsed_schema = _get_avro_schema(spectra_dicts[0].keys())
+    spectra_dicts = _to_avro_records(spectra_dicts)
+    # Validate that records match the schema
+    validate_many(spectra_dicts, parsed_schema)
+    return parsed_schema, spectra_dicts
+
+
+def _to_text_columns(data, extension='csv'):
+    """
+    Convert the array columns of the output to the text representation used in CSV and ECSV files.
+
+    Args:
+        data (DataFrame): Output spectra.
+        extension (str): Either 'csv' or 'ecsv'.
+
+    Returns:
+        DataFrame: The output spectra with the arrays converted.
+    """
+    return data.map(lambda x: _array_to_standard(x, extension) if isinstance(x, ndarray) else x)
+
+
+def _save_csv_sampling(positions, output_path, output_file):
+    """
+    Save the sampling in a separate CSV file.
+
+    Args:
+        positions (ndarray): Sampling positions.
+        output_path (str): Path where to store the output file.
+        output_file (str): Name of the output file.
+    """
+    # Assume the sampling is the same for all spectra
+    pos = [str(_array_to_standard(positions))]
+    sampling_df = pd.DataFrame({'pos': pos})
+    sampling_df.to_csv(join(output_path, f'{output_file}_sampling.csv'), index=False)
+
+
+def _build_fits_table_hdu(data, positions, variable_length=None):
+    """
+    Build the FITS binary table containing the output spectra.
+
+    Args:
+        data (DataFrame): Output spectra.
+        positions (ndarray): Sampling positions.
+        variable_length (bool): Whether to store the arrays in variable-length columns. By default, they are only
+            used if some spectra are missing.
+
+    Returns:
+        BinTableHDU: The binary table.
+    """
+    # Create a dictionary to hold all the data
+    output_by_column_dict = data.reset_index().to_dict(orient='list')
+    # Remove index from output dict
+    output_by_column_dict.pop('index', None)
+    spectra_keys = output_by_column_dict.keys()
+    data_type = data.attrs['data_type']
+    units_dict = data_type.get_units()
+    pos_len = len(positions)
+    if variable_length is None:
+        variable_length = any(arr is None for arr in output_by_column_dict['flux'])
+    # D: double precision float, E: single precision float
+    array_format = 'E' if _get_array_dtype(data) == np.float32 else 'D'
+    flux_format = f'P{array_format}()' if variable_length else f'{pos_len}{array_format}'
+    # E: single precision float
+    flux_error_format = 'PE()' if variable_length else f'{pos_len}E'
+    aux_corr = data.get('correlation')
+    correlation_format = ''
+    if aux_corr is not None:
+        correlation_format = f'P{array_format}()' if variable_length else \
+            f"{_get_col_subtype_len(data, 'correlation')}{array_format}"
+    # Define formats for each type according to FITS
+    column_formats = {'source_id': 'K', 'xp': '2A', 'flux': flux_format, 'flux_error': flux_error_format,
+                      'correlation': correlation_format, 'standard_deviation': 'E'}
+    columns = [
+        fits.Column(name=key, array=[value if value is not None else [] for value in output_by_column_dict[key]],
+                    format=column_formats[key], unit=units_dict.get(key, '')) for key in spectra_keys]
+    header = _generate_fits_header(data, column_formats)
+    header['Sampling'] = str(tuple(positions))
+    return fits.BinTableHDU.from_columns(columns, header=header)
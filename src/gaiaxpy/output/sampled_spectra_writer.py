@@ -0,0 +1,232 @@
+"""
+sampled_spectra_writer.py
+====================================
+Module to write sampled spectra to a file one chunk at a time.
+"""
+
+import warnings
+from os import remove
+from os.path import join
+from pathlib import Path
+from shutil import copyfileobj
+from tempfile import TemporaryFile
+
+import numpy as np
+import pandas as pd
+from astropy.io import fits
+from astropy.units import UnitsWarning
+from fastavro import writer
+
+from .sampled_spectra_data import (SampledSpectraData, _build_fits_table_hdu, _get_avro_schema, _save_avro_sampling,
+                                   _save_csv_sampling, _to_avro_records, _to_text_columns)
+from .utils import _build_ecsv_header, _get_array_dtype
+from ..core.generic_functions import standardise_extension
+from ..file_parser.parse_generic import InvalidExtensionError
+
+# Data types of the FITS column formats used in the output
+_fits_dtypes = {'D': '>f8', 'E': '>f4', 'K': '>i8'}
+_fits_block_size = 2880
+# Array descriptors (number of elements and offset in the heap) of the variable-length columns. The 64-bit descriptors
+# of the Q format are used, as the heap of a large output can exceed the 2 GiB addressable by the 32-bit P format.
+_fits_descriptor_dtype = ('>i8', 2)
+
+
+class SampledSpectraWriter(object):
+    """
+    Writer of sampled spectra to a single output file, one chunk at a time, so that the spectra do not need to be held
+    in memory. The output is the same as the one written by SampledSpectraData, except for FITS files, where the arrays
+    are always stored in variable-length columns. XML files cannot be extended, so their chunks are kept in memory and
+    written when the writer is closed.
+    """
+
+    def __init__(self, output_path, output_file, output_format, positions):
+        """
+        Initialise a writer.
+
+        Args:
+            output_path (str): Path where to save the file.
+            output_file (str): Name of the output file without extension.
+            output_format (str): Format of the output file.
+            positions (ndarray): Sampling shared by all the spectra.
+
+        Raises:
+            InvalidExtensionError: If the format is not valid.
+        """
+        self.output_path = output_path
+        self.output_file = output_file
+        self.output_format = standardise_extension(output_format)
+        if self.output_format not in ['avro', 'csv', 'ecsv', 'fits', 'xml']:
+            raise InvalidExtensionError()
+        self.positions = positions
+        self.path = join(output_path, f'{output_file}.{self.output_format}')
+        self.n_chunks = 0
+        self._xml_chunks = list()
+        self._fits_layout = None
+        self._avro_schema = None
+        Path(output_path).mkdir(parents=True, exist_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def write(self, data):
+        """
+        Append a chunk of spectra to the output file. The sampling file is written with the first chunk.
+
+        Args:
+            data (DataFrame): Chunk of spectra, with the columns and data type of the converter output.
+        """
+        if data.empty:
+            return
+        output_format = self.output_format
+        if output_format == 'avro':
+            self._write_avro(data)
+        elif output_format == 'csv':
+            self._write_csv(data)
+        elif output_format == 'ecsv':
+            self._write_ecsv(data)
+        elif output_format == 'fits':
+            self._write_fits(data)
+        else:
+            self._xml_chunks.append(data)
+        self.n_chunks += 1
+
+    def close(self):
+        """
+        Complete the output file. Files in formats that can be extended are valid after every chunk, except for FITS
+            files, which are only valid after the writer is closed.
+        """
+        if self._fits_layout is not None:
+            self._close_fits()
+        if self._xml_chunks:
+            data = pd.concat(self._xml_chunks, ignore_index=True)
+            data.attrs = self._xml_chunks[0].attrs
+            SampledSpectraData(data, self.positions)._save_xml(self.output_path, self.output_file)
+            self._xml_chunks = list()
+        if self.n_chunks:
+            print(f'Done! Output saved to path: {self.path}', end='\r')
+
+    def abort(self):
+        """
+        Stop writing without completing the output file, e.g. after an error. FITS files are removed, as they are not
+            valid until they are completed, and XML chunks are discarded. The chunks already appended to files in
+            formats that can be extended are kept.
+        """
+        if self._fits_layout is not None:
+            layout = self._fits_layout
+            layout['heap'].close()
+            layout['file'].close()
+            self._fits_layout = None
+            remove(self.path)
+        self._xml_chunks = list()
+
+    def _write_avro(self, data):
+        first_chunk = self.n_chunks == 0
+        # All the chunks share the schema of the first one, which does not depend on the missing bands
+        if first_chunk:
+            self._avro_schema = _get_avro_schema(data.columns)
+        spectra_dicts = _to_avro_records(data.to_dict('records'))
+        # In append mode, fastavro adds new blocks to the existing file
+        with open(self.path, 'wb' if first_chunk else 'a+b') as output:
+            writer(output, self._avro_schema, spectra_dicts)
+        if first_chunk:
+            _save_avro_sampling(self.positions, self.output_path, self.output_file)
+
+    def _write_csv(self, data):
+        first_chunk = self.n_chunks == 0
+        _to_text_columns(data).to_csv(self.path, index=False, mode='w' if first_chunk else 'a', header=first_chunk)
+        if first_chunk:
+            _save_csv_sampling(self.positions, self.output_path, self.output_file)
+
+    def _write_ecsv(self, data):
+        modified_data = _to_text_columns(data, 'ecsv')
+        first_chunk = self.n_chunks == 0
+        if first_chunk:
+            with open(self.path, 'w') as output:
+                output.write(_build_ecsv_header(modified_data, self.positions, _get_array_dtype(data)))
+        modified_data.to_csv(self.path, index=False, mode='a', header=first_chunk)
+
+    def _write_fits(self, data):
+        """
+        Append the rows of a chunk to the binary table. The rows are written to the output file directly, while the
+            arrays they point to are written to a temporary heap that is appended to the table when the writer is
+            closed.
+        """
+        if self.n_chunks == 0:
+            self._open_fits(data)
+        layout = self._fits_layout
+        rows = np.zeros(len(data), dtype=layout['row_dtype'])
+        heap_chunk = list()
+        for column, dtype in layout['columns'].items():
+            if column not in layout['max_lengths']:
+                rows[column] = data[column].to_numpy(dtype=str) if dtype.kind == 'S' else \
+                    data[column].to_numpy(dtype=dtype.newbyteorder('='), na_value=np.nan)
+                continue
+            for index, array in enumerate(data[column]):
+                array = np.empty(0, dtype=dtype) if array is None else np.asarray(array, dtype=dtype)
+                rows[column][index] = len(array), layout['heap_size']
+                layout['heap_size'] += array.nbytes
+                layout['max_lengths'][column] = max(layout['max_lengths'][column], len(array))
+                heap_chunk.append(array.tobytes())
+        layout['file'].write(rows.tobytes())
+        layout['heap'].write(b''.join(heap_chunk))
+        layout['n_rows'] += len(rows)
+
+    def _open_fits(self, data):
+        """
+        Write the primary HDU and the header of the binary table, whose size does not depend on the number of rows.
+        """
+        warnings.filterwarnings('ignore', category=UnitsWarning)
+        header = _build_fits_table_hdu(data.iloc[:1], self.positions, variable_length=True).header
+        columns, max_lengths = dict(), dict()
+        for index, column in enumerate(data.columns):
+            tform = header[f'TFORM{index + 1}']
+            if tform.startswith(('P', 'Q')):
+                columns[column] = np.dtype(_fits_dtypes[tform[1]])
+                max_lengths[column] = 0
+            else:
+                columns[column] = np.dtype(f'S{tform[:-1] or 1}' if tform[-1] == 'A' else _fits_dtypes[tform[-1]])
+        # The rows of variable-length columns contain the number of elements and their offset in the heap
+        row_dtype = np.dtype([(column, _fits_descriptor_dtype if column in max_lengths else dtype)
+                              for column, dtype in columns.items()])
+        output = open(self.path, 'wb')
+        output.write(fits.PrimaryHDU().header.tostring().encode('ascii'))
+        self._fits_layout = {'file': output, 'heap': TemporaryFile(), 'header': header,
+                             'header_offset': output.tell(), 'columns': columns, 'max_lengths': max_lengths,
+                             'row_dtype': row_dtype, 'n_rows': 0, 'heap_size': 0}
+        output.write(self.__get_fits_header_bytes())
+
+    def _close_fits(self):
+        """
+        Append the heap to the binary table, pad the data unit and write the final header.
+        """
+        layout = self._fits_layout
+        output, heap = layout['file'], layout['heap']
+        try:
+            heap.seek(0)
+            copyfileobj(heap, output)
+            output.write(b'\0' * (-output.tell() % _fits_block_size))
+            output.seek(layout['header_offset'])
+            output.write(self.__get_fits_header_bytes())
+        finally:
+            heap.close()
+            output.close()
+            self._fits_layout = None
+
+    def __get_fits_header_bytes(self):
+        layout = self._fits_layout
+        header = layout['header']
+        header['NAXIS1'] = layout['row_dtype'].itemsize
+        header['NAXIS2'] = layout['n_rows']
+        header['PCOUNT'] = layout['heap_size']
+        header.remove('THEAP', ignore_missing=True)
+        for index, column in enumerate(layout['columns']):
+            if column in layout['max_lengths']:
+                tform = header[f'TFORM{index + 1}']
+                header[f'TFORM{index + 1}'] = f"Q{tform[1]}({layout['max_lengths'][column]})"
+        return header.tostring().encode('ascii')
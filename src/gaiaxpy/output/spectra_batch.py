@@ -0,0 +1,205 @@
+"""
+spectra_batch.py
+====================================
+Module to represent a batch of sampled spectra in columnar form.
+"""
+
+import numpy as np
+import pandas as pd
+
+from gaiaxpy.core.generic_functions import cast_output, correlation_from_covariance, packed_correlation_from_covariance
+from gaiaxpy.core.satellite import BANDS
+from gaiaxpy.spectrum.sampled_spectrum import (MAX_BLOCK_BYTES, MERGED_CORRELATION_TEMPORARIES, _add_band_covariance,
+                                               _get_block_size)
+
+
+class SpectraBatch(object):
+    """
+    Sampled spectra sharing the same sampling grid, stored as one 2D array per quantity with one spectrum per row.
+    """
+
+    def __init__(self, source_id, flux, flux_error, positions, spectrum_type, xp=None, correlation=None,
+                 standard_deviation=None, covariance_factor=None, design_matrices=None, merge=None):
+        """
+        Initialise a batch of spectra.
+
+        Args:
+            source_id (ndarray): 1D array containing the source identifier of each spectrum.
+            flux (ndarray): 2D array containing the flux values, one spectrum per row.
+            flux_error (ndarray): 2D array containing the flux errors, one spectrum per row.
+            positions (ndarray): 1D array containing the positions of the samples.
+            spectrum_type (type): Class of the spectra in the batch (e.g. XpSampledSpectrum).
+            xp (ndarray): 1D array containing the band of each spectrum. If given, the batch must contain all the BP
+                spectra followed by all the RP spectra, and the rows of the missing bands must be filled with NaN.
+            correlation (ndarray): 2D array containing the lower triangle of the correlation matrix of each spectrum.
+            standard_deviation (ndarray): 1D array containing the standard deviation of each spectrum.
+            covariance_factor (dict): Low-rank representation of the covariance of the spectra. For each band, a 3D
+                array containing a factor L of the covariance matrix C of the continuous spectrum (C = L @ L.T), one
+                per spectrum. The factors are NaN for the bands that do not contribute to a spectrum.
+            design_matrices (dict): 2D array containing the design matrix of each band. Required by covariance_factor.
+            merge (dict): 1D array containing the weights of each band. Only used by covariance_factor when the
+                spectra combine both bands.
+        """
+        self.source_id = np.asarray(source_id)
+        self.flux = flux
+        self.flux_error = flux_error
+        self.positions = positions
+        self.spectrum_type = spectrum_type
+        self.xp = xp
+        self.correlation = correlation
+        self.standard_deviation = standard_deviation
+        self.covariance_factor = covariance_factor
+        self.design_matrices = design_matrices
+        self.merge = merge
+
+    @classmethod
+    def concatenate(cls, batches):
+        """
+        Concatenate batches of spectra computed on consecutive chunks of the same input. For XP spectra, the BP and RP
+            blocks of each batch are concatenated separately, so that the result keeps all BP spectra first.
+
+        Args:
+            batches (list): List of SpectraBatch objects with the same sampling, type and content.
+
+        Returns:
+            SpectraBatch: The concatenated batch.
+        """
+        first = batches[0]
+        if len(batches) == 1:
+            return first
+
+        def _concatenate(arrays):
+            if arrays[0] is None:
+                return None
+            if first.xp is None:
+                return np.concatenate(arrays)
+            blocks = [np.split(array, len(BANDS)) for array in arrays]
+            return np.concatenate([block[band_index] for band_index in range(len(BANDS)) for block in blocks])
+
+        def _concatenate_attribute(attribute):
+            return _concatenate([getattr(batch, attribute) for batch in batches])
+
+        covariance_factor = None if first.covariance_factor is None else {
+            band: _concatenate([batch.covariance_factor[band] for batch in batches])
+            for band in first.covariance_factor}
+        return cls(_concatenate_attribute('source_id'), _concatenate_attribute('flux'),
+                   _concatenate_attribute('flux_error'), first.positions, first.spectrum_type,
+                   xp=_concatenate_attribute('xp'), correlation=_concatenate_attribute('correlation'),
+                   standard_deviation=_concatenate_attribute('standard_deviation'), covariance_factor=covariance_factor,
+                   design_matrices=first.design_matrices, merge=first.merge)
+
+    def __len__(self):
+        return len(self.source_id)
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.spectrum_type.__name__}, n_spectra={len(self)}, ' \
+               f'n_samples={len(self.positions)})'
+
+    def get_covariance(self, index):
+        """
+        Rebuild the covariance matrix of a sampled spectrum from its covariance factor. Samples with NaN flux (e.g.
+            outside the range of the only available band) are NaN in the covariance too.
+
+        Args:
+            index (int): Row of the spectrum in the batch.
+
+        Returns:
+            ndarray: 2D array containing the covariance matrix of the sampled spectrum, without the scaling by the
+                standard deviation (the same matrix the correlation output is computed from).
+        """
+        if self.covariance_factor is None:
+            raise ValueError("The covariance can only be rebuilt for spectra computed with with_correlation='factor'.")
+        return self._rebuild_covariance(np.array([index]))[0]
+
+    def get_correlation(self, index):
+        """
+        Rebuild the correlation matrix of a sampled spectrum from its covariance factor.
+
+        Args:
+            index (int): Row of the spectrum in the batch.
+
+        Returns:
+            ndarray: 2D array containing the correlation matrix of the sampled spectrum.
+        """
+        return correlation_from_covariance(self.get_covariance(index))
+
+    def get_packed_correlation(self, dtype=None, max_block_bytes=MAX_BLOCK_BYTES):
+        """
+        Get the lower triangle (excluding the diagonal) of the correlation matrix of every spectrum, rebuilding it from
+            the covariance factors if required. The spectra are processed in blocks to bound the memory used.
+
+        Args:
+            dtype (type): Data type of the output (e.g. np.float32). Default is float64.
+            max_block_bytes (int): Maximum size in bytes of the temporary arrays.
+
+        Returns:
+            ndarray: 2D array containing one packed correlation matrix per row, in the order given by np.tril_indices.
+        """
+        if self.covariance_factor is None:
+            return self.correlation
+        n_spectra, n_samples = len(self), len(self.positions)
+        correlation = np.empty((n_spectra, n_samples * (n_samples - 1) // 2), dtype=dtype or np.float64)
+        block_size = _get_block_size(MERGED_CORRELATION_TEMPORARIES * n_samples ** 2 * np.dtype(np.float64).itemsize,
+                                     max_block_bytes)
+        lower_triangle = np.tril_indices(n_samples, k=-1)
+        for start in range(0, n_spectra, block_size):
+            rows = np.arange(start, min(start + block_size, n_spectra))
+            correlation[rows] = packed_correlation_from_covariance(self._rebuild_covariance(rows),
+                                                                   lower_triangle=lower_triangle)
+        return correlation
+
+    def _rebuild_covariance(self, rows):
+        """
+        Rebuild the covariance matrices of a set of spectra from their covariance factors.
+
+        Args:
+            rows (ndarray): 1D array containing the rows of the spectra in the batch.
+
+        Returns:
+            ndarray: 3D array containing the covariance matrices, one per spectrum.
+        """
+        n_samples = len(self.positions)
+        contributing = {band: ~np.isnan(factor[rows, 0, 0]) for band, factor in self.covariance_factor.items()}
+        both = np.logical_and.reduce(list(contributing.values()))
+        covariance = np.zeros((len(rows), n_samples, n_samples))
+        for band, factor in self.covariance_factor.items():
+            in_band = contributing[band]
+            sampled_factor = np.matmul(np.swapaxes(factor[rows[in_band]], 1, 2), self.design_matrices[band])
+            # The weights only apply when both bands are available
+            weights = None if self.merge is None else np.where(both[in_band][:, np.newaxis], self.merge[band], 1.0)
+            _add_band_covariance(covariance, in_band, np.matmul(np.swapaxes(sampled_factor, 1, 2), sampled_factor),
+                                 weights)
+        patched = np.isnan(self.flux[rows])
+        covariance[patched[:, :, np.newaxis] | patched[:, np.newaxis, :]] = np.nan
+        return covariance
+
+    def to_pandas(self):
+        """
+        Build the DataFrame returned by the calibrator and the converter, with one array per row in the flux, flux
+            error and correlation columns. For XP spectra, the BP and RP spectra of each source are placed next to each
+            other and the arrays of the missing bands are replaced with None.
+
+        Returns:
+            DataFrame: The spectra in the batch.
+        """
+        correlation = self.get_packed_correlation(dtype=self.flux.dtype)
+        columns = {'flux': self.flux, 'flux_error': self.flux_error}
+        if correlation is not None:
+            columns['correlation'] = correlation
+        if self.xp is None:
+            spectra_dict = {'source_id': self.source_id}
+            spectra_dict.update({column: list(values) for column, values in columns.items()})
+        else:
+            # Interleave the BP and RP blocks
+            n_spectra = len(self)
+            order = np.arange(n_spectra).reshape(len(BANDS), n_spectra // len(BANDS)).T.ravel()
+            available = ~np.all(np.isnan(self.flux[order]), axis=1)
+            spectra_dict = {'source_id': self.source_id[order], 'xp': self.xp[order]}
+            for column, values in columns.items():
+                spectra_dict[column] = [row if is_available else None for row, is_available in
+                                        zip(values[order], available)]
+            if self.standard_deviation is not None:
+                spectra_dict['standard_deviation'] = self.standard_deviation[order]
+        spectra_df = pd.DataFrame(spectra_dict)
+        spectra_df.attrs['data_type'] = self.spectrum_type
+        return cast_output(spectra_df)
@@ -47,6 +47,24 @@ def _get_array_columns(df):
     return [column for column in df.columns if isinstance(df[column].iloc[0], ndarray)]
 
 
+def _get_array_dtype(df, column='flux'):
+    """
+    Get the data type of the arrays in a column, ignoring the rows where the array is missing.
+
+    Args:
+        df (DataFrame): DataFrame containing the column.
+        column (str): Name of the column.
+
+    Returns:
+        dtype: Data type of the first array found, or None if there are none.
+    """
+    if column in df.columns:
+        for value in df[column]:
+            if isinstance(value, ndarray):
+                return value.dtype
+    return None
+
+
 def _get_sampling_dict(positions):
     return {'pos': _array_to_standard(positions)}
 
@@ -70,8 +88,10 @@ def _get_col_subtype_len(_df, _column):
     raise ValueError('All arrays in the data seem to be empty. This should never happen.')
 
 
-def _build_ecsv_header(df, positions=None):
+def _build_ecsv_header(df, positions=None, array_dtype=None):
     positions = None if positions is None else str(list(positions))
+    # Arrays stored in double precision by default can be in single precision
+    array_subtype = None if array_dtype is None else np.dtype(array_dtype).name
     columns = df.columns
     header_dict = _load_header_dict()
     header = _initialise_header()
@@ -83,8 +103,10 @@ def _build_ecsv_header(df, positions=None):
         header.append(f'#   name: {column}')
         header.append(f'#   datatype: {current_column["datatype"]}')
         if 'subtype' in current_column.keys():
-            header.append(
-                f'#   subtype: {current_column["subtype"].replace("null", str(_get_col_subtype_len(df, column)))}')
+            subtype = current_column['subtype'].replace('null', str(_get_col_subtype_len(df, column)))
+            if array_subtype:
+                subtype = subtype.replace('float64', array_subtype)
+            header.append(f'#   subtype: {subtype}')
         header.append(f'#   description: {current_column["description"]}')
         if units_dict.get(column, None):
             header.append(f'#   unit: {units_dict[column]}')
@@ -101,7 +123,7 @@ def _initialise_header():
     return ["# %ECSV 1.0", "# ---", "# delimiter: ','", "# datatype:"]
 
 
-def _build_photometry_header(columns):
+def _build_photometry_header(columns, dtypes=None):
     header_dict = _load_header_dict()
     header = _initialise_header()
     for column in columns:
@@ -116,7 +138,10 @@ def _build_photometry_header(columns):
                 parameter = '_mag_'
             system, band = column.split(parameter)
             parameter = f'phot{parameter}'[:-1]
-            header.append(f'#   datatype: {header_dict[parameter]["datatype"]}')
+            datatype = header_dict[parameter]['datatype']
+            if dtypes is not None and dtypes[column] == np.float32:
+                datatype = 'float32'
+            header.append(f'#   datatype: {datatype}')
             header.append(f'#   description: {header_dict[parameter]["description"]} {band} band')
         else:
             header.append(f'#   datatype: {header_dict[column]["datatype"]}')
@@ -12,6 +12,7 @@ from .sampled_spectrum import SampledSpectrum
 from .utils import _list_to_array
 from ..core.custom_errors import NoBandsAvailableError
 from ..core.generic_functions import correlation_from_covariance
+from ..core.satellite import BANDS
 
 
 class AbsoluteSampledSpectrum(SampledSpectrum):
@@ -73,6 +74,30 @@ class AbsoluteSampledSpectrum(SampledSpectrum):
                 split_spectrum[band]['stdev'] = stdev
         return split_spectrum
 
+    @staticmethod
+    def generate_spectra_batch(parsed_input_data, sampled_bases, with_correlation, truncation=False, dtype=None):
+        """
+        Sample the continuous spectra of all the sources in the input at once, one matrix product per band.
+
+        Args:
+            parsed_input_data (DataFrame): DataFrame containing the parsed input data, one source per row.
+            sampled_bases (dict): The set of basis functions sampled onto the grid defining the resolution of the final
+                sampled spectra.
+            with_correlation (bool): Whether correlation information should be computed.
+            truncation (bool): Toggle truncation of the set of bases. The level of truncation to be applied is defined
+                by the recommended value of each source.
+            dtype (type): Data type used in the computations (e.g. np.float32). Default is float64.
+
+        Returns:
+            dict: A dictionary with one entry per band. Each entry contains the mask of the sources for which the band
+                is available ('available') and the stacked flux, error and optionally continuous covariance of those
+                sources.
+        """
+        return {band: SampledSpectrum._sample_band_batch(parsed_input_data, band, sampled_bases[band],
+                                                         with_correlation=with_correlation, truncation=truncation,
+                                                         dtype=dtype)
+                for band in BANDS}
+
     def __merge_output(self, split_spectrum, merge, with_correlation):
         raise NotImplementedError('Method not implemented for base class.')
 
@@ -1,7 +1,11 @@
 import numpy as np
 
+from gaiaxpy.core.custom_errors import NoBandsAvailableError
+from gaiaxpy.core.generic_functions import packed_correlation_from_covariance
 from gaiaxpy.core.satellite import BANDS, RP_WL, BP_WL
 from gaiaxpy.spectrum.absolute_sampled_spectrum import AbsoluteSampledSpectrum
+from gaiaxpy.spectrum.sampled_spectrum import (MAX_BLOCK_BYTES, MERGED_CORRELATION_TEMPORARIES, SampledSpectrum,
+                                               _add_band_covariance, _get_block_size)
 
 
 class CalibrationAbsoluteSampledSpectrum(AbsoluteSampledSpectrum):
@@ -45,3 +49,114 @@ class CalibrationAbsoluteSampledSpectrum(AbsoluteSampledSpectrum):
             if with_correlation:
                 self.covariance[:, np.argwhere(np.isnan(masked_pos))] = np.nan
                 self.covariance[np.argwhere(np.isnan(masked_pos)), :] = np.nan
+
+    @staticmethod
+    def merge_output_batch(split_spectra, merge, pos, dtype=None):
+        """
+        Merge the stacks of BP and RP sampled spectra returned by generate_spectra_batch into absolute spectra. The
+            result is the same as merging each source separately.
+
+        Args:
+            split_spectra (dict): The output of AbsoluteSampledSpectrum.generate_spectra_batch.
+            merge (dict): The weighting factors for BP and RP sampled onto the grid defining the resolution of the final
+                sampled spectra.
+            pos (ndarray): 1D array containing the positions of the samples.
+            dtype (type): Data type of the output (e.g. np.float32). Default is float64.
+
+        Returns:
+            tuple: A tuple containing the 2D arrays of flux and flux error, one row per source.
+
+        Raises:
+            NoBandsAvailableError: If any source has no bands available.
+        """
+        available = {band: split_spectra[band]['available'] for band in BANDS}
+        if not np.all(available[BANDS.bp] | available[BANDS.rp]):
+            raise NoBandsAvailableError()
+        # Position of each source in the stack of every band
+        stack_index = {band: np.cumsum(available[band]) - 1 for band in BANDS}
+        n_sources, n_samples = len(available[BANDS.bp]), len(pos)
+        flux = np.full((n_sources, n_samples), np.nan, dtype=dtype)
+        error = np.full((n_sources, n_samples), np.nan, dtype=dtype)
+        # Sources with both bands
+        both = available[BANDS.bp] & available[BANDS.rp]
+        bp, rp = split_spectra[BANDS.bp], split_spectra[BANDS.rp]
+        bp_index, rp_index = stack_index[BANDS.bp][both], stack_index[BANDS.rp][both]
+        flux[both] = np.add(np.multiply(bp['flux'][bp_index], merge[BANDS.bp]),
+                            np.multiply(rp['flux'][rp_index], merge[BANDS.rp]))
+        error[both] = np.sqrt(np.add(np.multiply(bp['error'][bp_index] ** 2, merge[BANDS.bp] ** 2),
+                                     np.multiply(rp['error'][rp_index] ** 2, merge[BANDS.rp] ** 2)))
+        # Sources with only one band, values outside the range of the available band are patched
+        masked_pos = CalibrationAbsoluteSampledSpectrum._get_masked_positions(pos)
+        for band, other_band in [(BANDS.bp, BANDS.rp), (BANDS.rp, BANDS.bp)]:
+            only = available[band] & ~available[other_band]
+            if not only.any():
+                continue
+            band_index = stack_index[band][only]
+            band_flux, band_error = split_spectra[band]['flux'][band_index], split_spectra[band]['error'][band_index]
+            band_flux[:, masked_pos[band]] = np.nan
+            band_error[:, masked_pos[band]] = np.nan
+            flux[only], error[only] = band_flux, band_error
+        return flux, error
+
+    @staticmethod
+    def merge_correlation_batch(split_spectra, sampled_bases, merge, pos, dtype=None, max_block_bytes=MAX_BLOCK_BYTES):
+        """
+        Compute the packed lower triangle of the correlation matrices of the merged absolute spectra. The sources are
+            processed in blocks, so the full covariance matrices of all sources never coexist in memory. The result is
+            the same as merging each source separately.
+
+        Args:
+            split_spectra (dict): The output of AbsoluteSampledSpectrum.generate_spectra_batch, including the continuous
+                covariance of the sources.
+            sampled_bases (dict): The set of basis functions sampled onto the grid defining the resolution of the final
+                sampled spectra.
+            merge (dict): The weighting factors for BP and RP sampled onto the grid defining the resolution of the final
+                sampled spectra.
+            pos (ndarray): 1D array containing the positions of the samples.
+            dtype (type): Data type of the output (e.g. np.float32). Default is float64.
+            max_block_bytes (int): Maximum size in bytes of the temporary arrays.
+
+        Returns:
+            ndarray: 2D array containing one packed correlation matrix per row, in the order given by np.tril_indices.
+        """
+        available = {band: split_spectra[band]['available'] for band in BANDS}
+        stack_index = {band: np.cumsum(available[band]) - 1 for band in BANDS}
+        n_sources, n_samples = len(available[BANDS.bp]), len(pos)
+        rows, columns = np.tril_indices(n_samples, k=-1)
+        # Pairs of samples that are patched with NaN when only one band is available
+        masked_pos = CalibrationAbsoluteSampledSpectrum._get_masked_positions(pos)
+        masked_pairs = {band: masked_pos[band][rows] | masked_pos[band][columns] for band in BANDS}
+        correlation = np.empty((n_sources, len(rows)), dtype=dtype or np.float64)
+        block_size = _get_block_size(MERGED_CORRELATION_TEMPORARIES * n_samples ** 2 * np.dtype(np.float64).itemsize,
+                                     max_block_bytes)
+        for start in range(0, n_sources, block_size):
+            block = slice(start, min(start + block_size, n_sources))
+            both = available[BANDS.bp][block] & available[BANDS.rp][block]
+            covariance = np.zeros((len(both), n_samples, n_samples))
+            for band in BANDS:
+                in_band = available[band][block]
+                # The weights only apply when both bands are available
+                weights = np.where(both[in_band][:, np.newaxis], merge[band], 1.0)
+                # The covariance of the band is not kept, so that it does not add to the memory used afterwards
+                _add_band_covariance(covariance, in_band, SampledSpectrum._sample_covariance_batch(
+                    split_spectra[band]['coefficient_covariance'][stack_index[band][block][in_band]],
+                    sampled_bases[band].get_design_matrix()), weights)
+            block_correlation = packed_correlation_from_covariance(covariance, lower_triangle=(rows, columns))
+            for band, other_band in [(BANDS.bp, BANDS.rp), (BANDS.rp, BANDS.bp)]:
+                only = available[band][block] & ~available[other_band][block]
+                block_correlation[np.ix_(only, masked_pairs[band])] = np.nan
+            correlation[block] = block_correlation
+        return correlation
+
+    @staticmethod
+    def _get_masked_positions(pos):
+        """
+        Get the samples that lie outside the range covered by each band.
+
+        Args:
+            pos (ndarray): 1D array containing the positions of the samples.
+
+        Returns:
+            dict: A dictionary containing one boolean mask per band.
+        """
+        return {BANDS.bp: pos >= BP_WL.high, BANDS.rp: pos <= RP_WL.low}
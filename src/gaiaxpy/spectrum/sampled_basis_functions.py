@@ -4,12 +4,8 @@ sampled_basis_functions.py
 Module to represent a set of basis functions evaluated on a grid.
 """
 
-import functools
-import math
-
 import numpy as np
 from scipy.interpolate import BSpline
-from scipy.special import eval_hermite, gamma
 
 from gaiaxpy.core import nature, satellite
 
@@ -50,7 +46,6 @@ class SampledBasisFunctions(object):
         Returns:
             SampledBasisFunctions: An instance of this class.
         """
-        n_samples = len(sampling)
         scale = ((external_instrument_model.bases['normRangeMax'] -
                   external_instrument_model.bases['normRangeMin']) /
                  (external_instrument_model.bases['pwlRangeMax'] -
@@ -62,25 +57,23 @@ class SampledBasisFunctions(object):
         rescaled_pwl = (sampling_pwl * scale) + offset
 
         bases_transformation = external_instrument_model.bases['transformationMatrix']
-        evaluated_hermite_bases = np.array([_evaluate_hermite_function(n_h, pos, weight) for pos, weight in
-                                            zip(rescaled_pwl, weights) for n_h in np.arange(
-                int(external_instrument_model.bases['nInverseBasesCoefficients']))]).reshape(
-            n_samples, int(external_instrument_model.bases['nInverseBasesCoefficients']))
-        _design_matrix = external_instrument_model.bases['inverseBasesCoefficients'] @ evaluated_hermite_bases.T
+        # The bases are only evaluated where some contribution is expected
+        evaluated_hermite_bases = _hermite_functions(int(external_instrument_model.bases['nInverseBasesCoefficients']),
+                                                     rescaled_pwl) * (np.asarray(weights) > 0)
+        _design_matrix = external_instrument_model.bases['inverseBasesCoefficients'] @ evaluated_hermite_bases
         transformed_design_matrix = bases_transformation @ _design_matrix
 
         hc = 1.e9 * nature.C * nature.PLANCK
 
         def compute_norm(wl):
             r = external_instrument_model.get_response(wl)
-            if r > 0:
-                return hc / (satellite.TELESCOPE_PUPIL_AREA * r * wl)
-            else:
-                return 0.0
+            positive = r > 0
+            norm = np.zeros_like(wl, dtype=float)
+            norm[positive] = hc / (satellite.TELESCOPE_PUPIL_AREA * r[positive] * wl[positive])
+            return norm
 
-        norm = np.array([compute_norm(wl) for wl in sampling])
-        design_matrix = np.array([transformed_design_matrix[i] * norm for i in
-                                  np.arange(external_instrument_model.bases['nBases'])])
+        norm = compute_norm(np.asarray(sampling, dtype=float))
+        design_matrix = transformed_design_matrix[:int(external_instrument_model.bases['nBases'])] * norm
 
         return cls(sampling, design_matrix=design_matrix)
 
@@ -121,27 +114,30 @@ class SampledBasisFunctions(object):
         return self.sampling_grid
 
 
-def _evaluate_hermite_function(n, x, w):
-    return _hermite_function(n, x) if w > 0 else 0
+def _hermite_functions(n_orders, x):
+    """
+    Evaluate the Hermite functions of orders 0 to n_orders - 1 on a set of positions using the three-term recurrence.
 
+    Args:
+        n_orders (int): Number of Hermite functions to evaluate.
+        x (ndarray): 1D array containing the positions.
 
-@functools.lru_cache(maxsize=128)
-def _hermite_function(n, x):
-    if n == 0:
-        return sqrt_4_pi * np.exp(-x ** 2. / 2.)
-    elif n == 1:
-        return sqrt_4_pi * np.exp(-x ** 2. / 2.) * np.sqrt(2.) * x
-    c1 = np.sqrt(2. / n) * x
-    c2 = -np.sqrt((n - 1) / n)
-    return c1 * _hermite_function(n - 1, x) + c2 * _hermite_function(n - 2, x)
+    Returns:
+        ndarray: 2D array of shape (n_orders, len(x)) containing the value of each function at each position.
+    """
+    x = np.asarray(x, dtype=float)
+    hermite_functions = np.empty((n_orders, len(x)))
+    if n_orders > 0:
+        hermite_functions[0] = sqrt_4_pi * np.exp(-x ** 2. / 2.)
+    if n_orders > 1:
+        hermite_functions[1] = hermite_functions[0] * np.sqrt(2.) * x
+    for n in range(2, n_orders):
+        hermite_functions[n] = np.sqrt(2. / n) * x * hermite_functions[n - 1] - np.sqrt((n - 1) / n) * \
+            hermite_functions[n - 2]
+    return hermite_functions
 
 
 def populate_design_matrix(sampling_grid, bases_config):
-    def __psi(n, x):
-        return (1.0 / np.sqrt(math.pow(2, n) * gamma(n + 1) * np.sqrt(np.pi)) * np.exp(-x ** 2 / 2.0) *
-                eval_hermite(n, x))
-
-    n_samples = len(sampling_grid)
     bc_columns = bases_config.columns
     if 'knots' not in bc_columns and 'transformedSetDimension' in bc_columns:  # Hermite
         normalised_range_lower, normalised_range_upper = bases_config['normalizedRange'].iloc(0)[0]
@@ -153,9 +149,7 @@ def populate_design_matrix(sampling_grid, bases_config):
         transformed_set_dimension = int(bases_config['transformedSetDimension'].iloc[0])
         bases_transformation = bases_config['transformationMatrix'].iloc(0)[0].reshape(dimension,
                                                                                        transformed_set_dimension)
-        design_matrix = np.array([__psi(n_h, pos) for pos in rescaled_pwl for n_h in np.arange(dimension)]).reshape(
-            n_samples, dimension)
-        return bases_transformation @ design_matrix.T
+        return bases_transformation @ _hermite_functions(dimension, rescaled_pwl)
     elif 'knots' in bc_columns:  # Spline
         if len(bases_config) != 1:
             raise ValueError('Only one row should be accepted at a time.')
@@ -170,13 +164,9 @@ def populate_design_matrix(sampling_grid, bases_config):
             bases_transformation = transformation_matrix.reshape(ts_dim, n_bases)
         else:
             bases_transformation = np.identity(n_bases)
-        design_matrix = np.zeros((n_bases, n_samples))
-
-        for basis_id in np.arange(n_bases):  # Evaluate
-            c = np.zeros(n_knots)
-            c[basis_id] = 1.0
-            basis = BSpline(knots, c, degree)
-            design_matrix[basis_id] = np.array([basis(pos) for pos in sampling_grid])
+        # Evaluate all the bases at once as a vector-valued spline, each basis having a unit coefficient vector
+        bases = BSpline(knots, np.identity(n_bases), degree)
+        design_matrix = bases(np.asarray(sampling_grid, dtype=float)).T
         return bases_transformation.dot(design_matrix)
     else:
         raise ValueError('Design matrix cannot be populated from the given configuration.')
@@ -8,6 +8,52 @@ import numpy as np
 from numpy import ndarray, nan
 
 from .generic_spectrum import Spectrum
+from .utils import _stack_band
+from ..core.generic_functions import packed_correlation_from_covariance
+
+# Maximum size in bytes of the temporary arrays created when sampling a stack of spectra
+MAX_BLOCK_BYTES = 64 * 1024 ** 2
+# Number of arrays of the size of a sampled covariance matrix that are alive at once per spectrum while its packed
+# correlation is computed: the covariance itself and the packed arrays of packed_correlation_from_covariance
+CORRELATION_TEMPORARIES = 2.5
+# When the covariances of both bands are merged, the covariance of one band and a copy of the merged rows updated with it
+# are also alive
+MERGED_CORRELATION_TEMPORARIES = 3
+
+
+def _get_block_size(bytes_per_spectrum, max_block_bytes=MAX_BLOCK_BYTES):
+    """
+    Get the number of spectra that can be processed at once without exceeding the given memory size.
+
+    Args:
+        bytes_per_spectrum (int): Size in bytes of the temporary arrays required by one spectrum.
+        max_block_bytes (int): Maximum size in bytes of the temporary arrays.
+
+    Returns:
+        int: Number of spectra per block (at least one).
+    """
+    return max(1, max_block_bytes // max(1, bytes_per_spectrum))
+
+
+def _add_band_covariance(covariance, in_band, band_covariance, weights=None):
+    """
+    Add the covariance matrices of one band to the merged covariance matrices of the spectra where it is available. The
+        band covariance is weighted in place, it should not be used afterwards.
+
+    Args:
+        covariance (ndarray): 3D array containing the merged covariance matrices, one per spectrum.
+        in_band (ndarray): 1D boolean array telling whether the band is available for each spectrum.
+        band_covariance (ndarray): 3D array containing the covariance matrices of the band, one per spectrum where it
+            is available.
+        weights (ndarray): 2D array containing the merge weights of the band, one row per spectrum where it is
+            available. By default, the covariance is not weighted.
+    """
+    if weights is not None:
+        band_covariance *= weights[:, np.newaxis, :]
+    if in_band.all():
+        covariance += band_covariance
+    else:
+        covariance[in_band] += band_covariance
 
 
 class SampledSpectrum(Spectrum):
@@ -114,6 +160,24 @@ class SampledSpectrum(Spectrum):
             return coefficients @ design_matrix
         return nan
 
+    @staticmethod
+    def _sample_flux_batch(coefficients, design_matrix):
+        """
+        Compute the flux values for a stack of spectra sharing the same design matrix in a single matrix product.
+
+        Args:
+            coefficients (ndarray): 2D array containing the coefficients of one spectrum per row.
+            design_matrix (ndarray): 2D array containing the evaluation of the basis functions on the desired sampling
+                grid.
+
+        Returns:
+            ndarray: 2D array containing the flux values for all samples, one spectrum per row.
+        """
+        if coefficients.shape[0] != 0 and coefficients.shape[1] != design_matrix.shape[0]:
+            raise ValueError("Coefficients length doesn't match the design matrix dimension. Please make sure you're "
+                             "using the correct input files and configuration.")
+        return coefficients @ design_matrix
+
     @staticmethod
     def _sample_error(covariance, design_matrix, standard_deviation):
         """
@@ -139,6 +203,36 @@ class SampledSpectrum(Spectrum):
         else:
             raise TypeError('Covariance must be either a NumPy array or nan.')
 
+    @staticmethod
+    def _sample_error_batch(covariance, design_matrix, standard_deviation, max_block_bytes=MAX_BLOCK_BYTES):
+        """
+        Compute the errors associated to the flux values for a stack of spectra sharing the same design matrix. The
+            stack is processed in blocks so that the temporary arrays never exceed the given size.
+
+        Args:
+            covariance (ndarray): 3D array containing the covariance matrices of the continuous representation, one per
+                spectrum.
+            design_matrix (ndarray): 2D array containing the evaluation of the basis functions on the desired sampling
+                grid.
+            standard_deviation (ndarray): 1D array containing the standard deviation of each spectrum.
+            max_block_bytes (int): Maximum size in bytes of the temporary arrays.
+
+        Returns:
+            ndarray: 2D array containing the errors in flux for all samples, one spectrum per row.
+        """
+        n_spectra = covariance.shape[0]
+        n_bases, n_samples = design_matrix.shape
+        design_matrix_t = design_matrix.T
+        block_size = _get_block_size(n_bases * n_samples * covariance.itemsize, max_block_bytes)
+        error = np.empty((n_spectra, n_samples), dtype=np.result_type(covariance, design_matrix))
+        for start in range(0, n_spectra, block_size):
+            end = min(start + block_size, n_spectra)
+            product = np.matmul(design_matrix_t, covariance[start:end])
+            np.multiply(product, design_matrix_t, out=product)
+            np.sqrt(product.sum(axis=2), out=error[start:end])
+        error *= np.reshape(standard_deviation, (-1, 1))
+        return error
+
     @staticmethod
     def _sample_covariance(covariance, design_matrix):
         """
@@ -155,3 +249,84 @@ class SampledSpectrum(Spectrum):
             ndarray: 2D array containing the covariance matrix of the sampled spectrum.
         """
         return design_matrix.T @ covariance @ design_matrix
+
+    @staticmethod
+    def _sample_covariance_batch(covariance, design_matrix):
+        """
+        Compute the covariance matrices of a stack of sampled spectra sharing the same design matrix.
+
+        Args:
+            covariance (ndarray): 3D array containing the covariance matrices of the continuous representation, one per
+                spectrum.
+            design_matrix (ndarray): 2D array containing the evaluation of the basis functions on the desired sampling
+                grid.
+
+        Returns:
+            ndarray: 3D array containing the covariance matrices of the sampled spectra.
+        """
+        return np.matmul(np.matmul(design_matrix.T, covariance), design_matrix)
+
+    @staticmethod
+    def _sample_correlation_batch(covariance, design_matrix, dtype=None, max_block_bytes=MAX_BLOCK_BYTES):
+        """
+        Compute the packed lower triangle of the correlation matrices of a stack of sampled spectra. The stack is
+            processed in blocks, so the full covariance matrices of all spectra never coexist in memory.
+
+        Args:
+            covariance (ndarray): 3D array containing the covariance matrices of the continuous representation, one per
+                spectrum.
+            design_matrix (ndarray): 2D array containing the evaluation of the basis functions on the desired sampling
+                grid.
+            dtype (type): Data type of the output (e.g. np.float32). Default is the data type of the covariance.
+            max_block_bytes (int): Maximum size in bytes of the temporary arrays.
+
+        Returns:
+            ndarray: 2D array containing one packed correlation matrix per row, in the order given by np.tril_indices.
+        """
+        n_spectra, n_samples = covariance.shape[0], design_matrix.shape[1]
+        block_size = _get_block_size(int(CORRELATION_TEMPORARIES * n_samples ** 2 * covariance.itemsize),
+                                     max_block_bytes)
+        correlation = np.empty((n_spectra, n_samples * (n_samples - 1) // 2),
+                               dtype=dtype or np.result_type(covariance, design_matrix))
+        lower_triangle = np.tril_indices(n_samples, k=-1)
+        for start in range(0, n_spectra, block_size):
+            end = min(start + block_size, n_spectra)
+            correlation[start:end] = packed_correlation_from_covariance(
+                SampledSpectrum._sample_covariance_batch(covariance[start:end], design_matrix),
+                lower_triangle=lower_triangle)
+        return correlation
+
+    @staticmethod
+    def _sample_band_batch(parsed_input_data, band, sampled_basis_functions, with_correlation=False, truncation=False,
+                           dtype=None):
+        """
+        Sample the continuous spectra of all the sources in the input for one band at once.
+
+        Args:
+            parsed_input_data (DataFrame): DataFrame containing the parsed input data, one source per row.
+            band (str): Gaia photometer, can be either 'bp' or 'rp'.
+            sampled_basis_functions (SampledBasisFunctions): The set of basis functions sampled onto the grid defining
+                the resolution of the final sampled spectra.
+            with_correlation (bool): Whether the covariance matrices of the continuous spectra should be returned, so
+                that the correlation of the sampled spectra can be computed.
+            truncation (bool): Toggle truncation of the set of bases. The level of truncation to be applied is defined
+                by the recommended value of each source.
+            dtype (type): Data type used in the computations (e.g. np.float32). Default is float64.
+
+        Returns:
+            dict: A dictionary containing the mask of the sources for which the band is available ('available') and
+                the stacked flux, error, standard deviation and optionally continuous covariance of those sources.
+        """
+        dtype = dtype or np.float64
+        available, coefficients, covariance, stdev = _stack_band(parsed_input_data, band, truncation=truncation,
+                                                                 dtype=dtype)
+        design_matrix = sampled_basis_functions.get_design_matrix().astype(dtype, copy=False)
+        n_bases = design_matrix.shape[0]
+        if not available.any():
+            coefficients, covariance = np.empty((0, n_bases), dtype=dtype), np.empty((0, n_bases, n_bases), dtype=dtype)
+        band_spectra = {'available': available, 'stdev': stdev,
+                        'flux': SampledSpectrum._sample_flux_batch(coefficients, design_matrix),
+                        'error': SampledSpectrum._sample_error_batch(covariance, design_matrix, stdev)}
+        if with_correlation:
+            band_spectra['coefficient_covariance'] = covariance
+        return band_spectra
@@ -6,9 +6,8 @@ Module to represent a synthetic photometry in a single photometric system.
 
 import warnings
 
-import numpy as np
-
 from .photometric_absolute_sampled_spectrum import PhotometricAbsoluteSampledSpectrum
+from .utils import _flux_to_mag
 
 # Ignore negative flux, handled in the code.
 warnings.filterwarnings('ignore', category=RuntimeWarning)
@@ -69,21 +68,10 @@ class SingleSyntheticPhotometry(PhotometricAbsoluteSampledSpectrum):
         return {f'{name}_{band}': values[i] for i, band in enumerate(bands)}
 
     def _compute_mag(self):
-        def flux_to_mag(flux, zero_point):
-            """
-            Convert flux to magnitude.
-
-            Args:
-                flux (float): Flux value.
-                zero_point (float): Photometric zero-point.
-
-            Returns:
-                float: The magnitude.
-            """
-            if flux <= 0:
-                return np.nan
-            result = -2.5 * np.log10(flux) + zero_point
-            return result
+        """
+        Compute the magnitudes from the fluxes, NaN for non-positive fluxes.
 
-        return [flux_to_mag(flux, zero_point) for flux, zero_point in
-                zip(self.flux, self.photometric_system.get_zero_points())]
+        Returns:
+            ndarray: 1D array containing the magnitude in each band.
+        """
+        return _flux_to_mag(self.flux, self.photometric_system.get_zero_points())
@@ -23,6 +23,149 @@ def get_covariance_matrix(row, band):
     raise ValueError(f'None of the expected columns could be found in the input row. Columns are: {columns}.')
 
 
+def get_covariance_column(df, band):
+    """
+    Get the covariance matrices of all the sources in a DataFrame for the given band.
+
+    Args:
+        df (DataFrame): DataFrame containing the parsed input data.
+        band (str): Gaia photometer, can be either 'bp' or 'rp'.
+
+    Returns:
+        Series: A Series containing one covariance matrix (or NaN if the band is missing) per source.
+    """
+    for column in [f'{band}_covariance_matrix', f'{band}_coefficient_covariances']:
+        if column in df.columns:
+            return df[column].where(df[column].notna(), np.nan).infer_objects()
+    if f'{band}_coefficient_correlations' not in df.columns:
+        return df.apply(get_covariance_matrix, axis=1, args=(band,))
+    return _correlation_to_covariance_column(df[f'{band}_coefficient_correlations'], df[f'{band}_coefficient_errors'],
+                                             df[f'{band}_standard_deviation'])
+
+
+def _correlation_to_covariance_column(correlations, formal_errors, standard_deviations):
+    """
+    Compute the covariance matrices of a column of correlation matrices, as _correlation_to_covariance_dr3int5 does for
+        a single matrix. The matrices of the same size are stacked and scaled in place by the outer product of their
+        normalised errors, instead of being multiplied by two diagonal matrices. Any other values (e.g. those of a
+        missing band, or matrices containing non-finite values) are converted one at a time.
+
+    Args:
+        correlations (Series): Column of correlation matrices.
+        formal_errors (Series): Column of formal errors of the parameters.
+        standard_deviations (Series): Column of standard deviations of the LSQ solutions.
+
+    Returns:
+        Series: Column of covariance matrices (or NaN if the band is missing) with the same index as the input.
+    """
+    covariances, errors, deviations = list(correlations), list(formal_errors), list(standard_deviations)
+    standard_deviations = standard_deviations.to_numpy(dtype=float, na_value=np.nan)
+    groups = dict()
+    for position, (correlation, error) in enumerate(zip(covariances, errors)):
+        if isinstance(correlation, np.ndarray) and isinstance(error, np.ndarray) and correlation.dtype == np.float64 \
+                and error.dtype == np.float64 and error.ndim == 1 and correlation.shape == (len(error), len(error)):
+            groups.setdefault(len(error), list()).append(position)
+        else:
+            covariances[position] = _correlation_to_covariance_dr3int5(correlation, error, deviations[position])
+    for positions in groups.values():
+        positions = np.array(positions)
+        stacked_covariances = np.stack([covariances[position] for position in positions])
+        scaled_errors = np.stack([errors[position] for position in positions]) / \
+            standard_deviations[positions, np.newaxis]
+        # The products are computed in the same order as in the matrix product with the diagonal errors
+        stacked_covariances *= scaled_errors[:, :, np.newaxis]
+        stacked_covariances *= scaled_errors[:, np.newaxis, :]
+        is_finite = np.isfinite(stacked_covariances).all(axis=(1, 2))
+        for position, covariance, finite in zip(positions, stacked_covariances, is_finite):
+            covariances[position] = covariance if finite else \
+                _correlation_to_covariance_dr3int5(covariances[position], errors[position], deviations[position])
+    return pd.Series(covariances, index=correlations.index, dtype=object).infer_objects()
+
+
+def _stack_band(df, band, truncation=False, dtype=float):
+    """
+    Stack the continuous representation of all the sources in a DataFrame for the given band.
+
+    Args:
+        df (DataFrame): DataFrame containing the parsed input data.
+        band (str): Gaia photometer, can be either 'bp' or 'rp'.
+        truncation (bool): Toggle truncation of the set of bases. The level of truncation to be applied is defined by
+            the recommended value of each source.
+        dtype (type): Data type of the stacked coefficients and covariance matrices.
+
+    Returns:
+        tuple: A tuple containing:
+            ndarray: 1D boolean array flagging the sources for which the band is available.
+            ndarray: 2D array containing the coefficients of the available sources, one row per source.
+            ndarray: 3D array containing the covariance matrices of the available sources.
+            ndarray: 1D array containing the standard deviations of the available sources.
+
+    Raises:
+        ValueError: If the number of coefficients is not the same for all the available sources.
+    """
+    covariances = get_covariance_column(df, band).to_numpy()
+    available = np.array([isinstance(covariance, np.ndarray) for covariance in covariances], dtype=bool)
+    if not available.any():
+        return available, np.empty((0, 0), dtype=dtype), np.empty((0, 0, 0), dtype=dtype), np.empty(0)
+    coefficients = df[f'{band}_coefficients'].to_numpy()[available]
+    standard_deviation = df[f'{band}_standard_deviation'].to_numpy(dtype=float, na_value=np.nan)[available]
+    try:
+        coefficients, covariances = np.stack(coefficients).astype(dtype), np.stack(covariances[available]).astype(dtype)
+    except ValueError:
+        raise ValueError(f'All the {band.upper()} spectra in the input must have the same number of coefficients.')
+    if truncation:
+        n_relevant_bases = df[f'{band}_n_relevant_bases'].to_numpy(dtype=float, na_value=np.nan)[available]
+        _truncate_stack(coefficients, covariances, n_relevant_bases)
+    return available, coefficients, covariances, standard_deviation
+
+
+def _truncate_stack(coefficients, covariances, n_relevant_bases):
+    """
+    Truncate a stack of continuous spectra in place by setting to zero the coefficients and covariance elements beyond
+        the number of relevant bases of each source. This is equivalent to dropping those bases, but keeps the shape of
+        the stack so that all sources can still be sampled together. Sources without a valid number of relevant bases
+        are not truncated.
+
+    Args:
+        coefficients (ndarray): 2D array containing the coefficients, one source per row.
+        covariances (ndarray): 3D array containing the covariance matrices, one per source.
+        n_relevant_bases (ndarray): 1D array containing the number of relevant bases of each source.
+    """
+    n_bases = coefficients.shape[1]
+    n_relevant_bases = np.where(np.isnan(n_relevant_bases) | (n_relevant_bases <= 0), n_bases, n_relevant_bases)
+    irrelevant = np.arange(n_bases) >= n_relevant_bases[:, np.newaxis]
+    coefficients[irrelevant] = 0.0
+    covariances[irrelevant[:, :, np.newaxis] | irrelevant[:, np.newaxis, :]] = 0.0
+
+
+def _factorise_covariance(covariances):
+    """
+    Compute a square factor L of each covariance matrix in a stack, such that C = L @ L.T. The Cholesky factor is used
+        whenever possible. Bases with zero variance (e.g. truncated ones) get zero rows in the factor, and matrices that
+        are not positive definite are factorised from their eigendecomposition.
+
+    Args:
+        covariances (ndarray): 3D array containing the covariance matrices, one per source.
+
+    Returns:
+        ndarray: 3D array containing the factors, one per source.
+    """
+    zero_variance = np.diagonal(covariances, axis1=1, axis2=2) == 0
+    regularised = covariances + zero_variance[:, :, np.newaxis] * np.eye(covariances.shape[1])
+    try:
+        factors = np.linalg.cholesky(regularised)
+    except np.linalg.LinAlgError:
+        factors = np.empty_like(covariances)
+        for index, covariance in enumerate(regularised):
+            try:
+                factors[index] = np.linalg.cholesky(covariance)
+            except np.linalg.LinAlgError:
+                eigenvalues, eigenvectors = np.linalg.eigh(covariance)
+                factors[index] = eigenvectors * np.sqrt(np.clip(eigenvalues, 0, None))
+    factors[zero_variance] = 0.0
+    return factors
+
+
 def _correlation_to_covariance_dr3int5(correlation_matrix, formal_errors, standard_deviation):
     """
     Compute the covariance matrix from the correlation matrix and the parameter formal errors.
@@ -90,3 +233,39 @@ def _list_to_array(lst):
         else:
             return np.array(lst)
     raise ValueError('Wrong input type.')
+
+
+def _flux_to_mag(flux, zero_points):
+    """
+    Convert fluxes to magnitudes. Non-positive fluxes have no magnitude, so NaN is returned for them.
+
+    Args:
+        flux (ndarray): Array containing the fluxes, with the bands along the last axis.
+        zero_points (ndarray): 1D array containing the zero-point of each band.
+
+    Returns:
+        ndarray: Array containing the magnitudes, with the same shape as the fluxes.
+    """
+    flux = np.asarray(flux, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(flux > 0, -2.5 * np.log10(flux) + zero_points, np.nan)
+
+
+def _apply_flux_offsets(flux, error, offsets, standardised):
+    """
+    Apply the flux offsets of standardised photometric systems and scale the flux errors accordingly. Regular systems
+        are left unchanged.
+
+    Args:
+        flux (ndarray): Array containing the fluxes, with the bands along the last axis.
+        error (ndarray): Array containing the flux errors, with the same shape as the fluxes.
+        offsets (ndarray): 1D array containing the flux offset of each band.
+        standardised (ndarray): 1D boolean array, True for the bands that belong to a standardised system.
+
+    Returns:
+        tuple: A tuple containing the corrected fluxes and flux errors.
+    """
+    corrected_flux = flux + offsets
+    with np.errstate(divide='ignore', invalid='ignore'):
+        corrected_error = np.where(standardised, error * np.abs(corrected_flux / flux), error)
+    return np.where(standardised, corrected_flux, flux), corrected_error
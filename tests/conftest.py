@@ -0,0 +1,7 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def disable_design_matrix_cache(monkeypatch):
+    # Tests must not read or write the cache of the user, those testing the cache enable it in a temporary directory
+    monkeypatch.delenv('GAIAXPY_CACHE_DIR', raising=False)
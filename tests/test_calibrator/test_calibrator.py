@@ -1,23 +1,31 @@
+import tracemalloc
+
 import numpy as np
 import numpy.testing as npt
+import pandas as pd
 import pytest
 from pandas import testing as pdt
 
-from gaiaxpy import calibrate
-from gaiaxpy.calibrator.calibrator import _calibrate, _create_spectrum
+from gaiaxpy import calibrate, calibrate_iter
+from gaiaxpy.calibrator.calibrator import _calibrate, _create_spectra_batch
 from gaiaxpy.core.config import load_xpmerge_from_xml, load_xpsampling_from_xml
+from gaiaxpy.core.generic_functions import format_sampled_output
 from gaiaxpy.core.satellite import BANDS
 from gaiaxpy.file_parser.parse_internal_continuous import InternalContinuousParser
-from gaiaxpy.input_reader.required_columns import MANDATORY_INPUT_COLS, CORR_INPUT_COLUMNS
+from gaiaxpy.input_reader.required_columns import MANDATORY_INPUT_COLS, CORR_INPUT_COLUMNS, TRUNCATION_COLS
+from gaiaxpy.output.spectra_batch import SpectraBatch
 from gaiaxpy.spectrum.absolute_sampled_spectrum import AbsoluteSampledSpectrum
+from gaiaxpy.spectrum.calibration_absolute_sampled_spectrum import CalibrationAbsoluteSampledSpectrum
 from gaiaxpy.spectrum.sampled_basis_functions import SampledBasisFunctions
+from gaiaxpy.spectrum.sampled_spectrum import MERGED_CORRELATION_TEMPORARIES
 from tests.files.paths import (mean_spectrum_csv_file, mean_spectrum_avro_file, mean_spectrum_fits_file,
-                               mean_spectrum_xml_file, mean_spectrum_xml_plain_file, mean_spectrum_ecsv_file)
+                               mean_spectrum_xml_file, mean_spectrum_xml_plain_file, mean_spectrum_ecsv_file,
+                               with_missing_bp_csv_file)
 from tests.test_calibrator.calibrator_solutions import (solution_default_df, solution_custom_df,
                                                         solution_v211w_default_df, solution_v211w_custom_df,
                                                         sol_custom_sampling_array, sol_v211w_default_sampling_array,
                                                         sol_default_sampling_array)
-from tests.utils.utils import is_instance_err_message, npt_array_err_message
+from tests.utils.utils import create_calibrated_spectrum, is_instance_err_message, npt_array_err_message
 
 # Load variables
 bp_model = 'v211w'  # Alternative bp model
@@ -39,13 +47,88 @@ def test_create_spectrum(input_file):
         # Create sampled basis functions
         sampled_basis_func = {band: SampledBasisFunctions.from_design_matrix(xp_sampling_grid, xp_design_matrices[band])
                               for band in BANDS}
-        return _create_spectrum(parsed_spectrum_file.iloc[0], truncation=False, design_matrix=sampled_basis_func,
-                                merge=xp_merge)
+        return create_calibrated_spectrum(parsed_spectrum_file.iloc[0], truncation=False,
+                                          design_matrix=sampled_basis_func, merge=xp_merge)
 
     spectrum = generate_single_spectrum(input_file)
     assert isinstance(spectrum, AbsoluteSampledSpectrum), is_instance_err_message(input_file, AbsoluteSampledSpectrum)
 
 
+@pytest.mark.parametrize('truncation', [False, True])
+@pytest.mark.parametrize('with_correlation', [False, True])
+@pytest.mark.parametrize('input_file', [mean_spectrum_avro_file, mean_spectrum_csv_file, with_missing_bp_csv_file])
+def test_create_spectra_batch(input_file, with_correlation, truncation):
+    xp_design_matrices = load_xpsampling_from_xml()
+    xp_sampling_grid, xp_merge = load_xpmerge_from_xml()
+    parser = InternalContinuousParser(MANDATORY_INPUT_COLS['calibrate'] + CORR_INPUT_COLUMNS + TRUNCATION_COLS)
+    parsed_input_data, _ = parser.parse_file(input_file)
+    sampled_basis_func = {band: SampledBasisFunctions.from_design_matrix(xp_sampling_grid, xp_design_matrices[band])
+                          for band in BANDS}
+    spectra = pd.Series([create_calibrated_spectrum(row, truncation, sampled_basis_func, xp_merge,
+                                                    with_correlation=with_correlation)
+                         for row in parsed_input_data.to_dict('records')])
+    expected_df, expected_positions = format_sampled_output(spectra, with_correlation=with_correlation)
+    spectra, positions = _create_spectra_batch(parsed_input_data, sampled_basis_func, xp_merge,
+                                               truncation=truncation, with_correlation=with_correlation)
+    assert isinstance(spectra, SpectraBatch)
+    assert spectra.flux.shape == spectra.flux_error.shape == (len(parsed_input_data), len(positions))
+    spectra_df = spectra.to_pandas()
+    npt.assert_array_equal(positions, expected_positions)
+    assert spectra_df.attrs['data_type'] == expected_df.attrs['data_type']
+    pdt.assert_index_equal(spectra_df.columns, expected_df.columns)
+    npt.assert_array_equal(spectra_df['source_id'], expected_df['source_id'])
+    for column in spectra_df.columns.drop('source_id'):
+        npt.assert_allclose(np.stack(spectra_df[column]), np.stack(expected_df[column]), rtol=1e-10, atol=0)
+
+
+@pytest.mark.parametrize('input_file', [mean_spectrum_csv_file, with_missing_bp_csv_file])
+def test_merge_correlation_batch(input_file):
+    xp_design_matrices = load_xpsampling_from_xml()
+    xp_sampling_grid, xp_merge = load_xpmerge_from_xml()
+    parser = InternalContinuousParser(MANDATORY_INPUT_COLS['calibrate'] + CORR_INPUT_COLUMNS)
+    parsed_input_data, _ = parser.parse_file(input_file)
+    sampled_basis_func = {band: SampledBasisFunctions.from_design_matrix(xp_sampling_grid, xp_design_matrices[band])
+                          for band in BANDS}
+    split_spectra = AbsoluteSampledSpectrum.generate_spectra_batch(parsed_input_data, sampled_basis_func,
+                                                                   with_correlation=True)
+    expected = CalibrationAbsoluteSampledSpectrum.merge_correlation_batch(split_spectra, sampled_basis_func, xp_merge,
+                                                                          xp_sampling_grid)
+    # One source per block
+    correlation = CalibrationAbsoluteSampledSpectrum.merge_correlation_batch(split_spectra, sampled_basis_func,
+                                                                             xp_merge, xp_sampling_grid,
+                                                                             max_block_bytes=1)
+    npt.assert_array_equal(correlation, expected)
+    correlation = CalibrationAbsoluteSampledSpectrum.merge_correlation_batch(split_spectra, sampled_basis_func,
+                                                                             xp_merge, xp_sampling_grid,
+                                                                             dtype=np.float32)
+    assert correlation.dtype == np.float32
+    npt.assert_allclose(correlation, expected, rtol=1e-5, atol=1e-6)
+
+
+def test_merge_correlation_batch_memory():
+    xp_design_matrices = load_xpsampling_from_xml()
+    xp_sampling_grid, xp_merge = load_xpmerge_from_xml()
+    parser = InternalContinuousParser(MANDATORY_INPUT_COLS['calibrate'] + CORR_INPUT_COLUMNS)
+    parsed_input_data, _ = parser.parse_file(with_missing_bp_csv_file)
+    parsed_input_data = pd.concat([parsed_input_data] * 4, ignore_index=True)
+    sampled_basis_func = {band: SampledBasisFunctions.from_design_matrix(xp_sampling_grid, xp_design_matrices[band])
+                          for band in BANDS}
+    split_spectra = AbsoluteSampledSpectrum.generate_spectra_batch(parsed_input_data, sampled_basis_func,
+                                                                   with_correlation=True)
+    matrix_bytes = len(xp_sampling_grid) ** 2 * 8
+    # Four sources per block, the memory used by the temporaries should stay within the limit
+    max_block_bytes = MERGED_CORRELATION_TEMPORARIES * matrix_bytes * 4
+    tracemalloc.start()
+    try:
+        correlation = CalibrationAbsoluteSampledSpectrum.merge_correlation_batch(
+            split_spectra, sampled_basis_func, xp_merge, xp_sampling_grid, max_block_bytes=max_block_bytes)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    # Allow for the indices of the lower triangle, which are shared by all blocks
+    assert peak - correlation.nbytes <= max_block_bytes + 2 * matrix_bytes
+
+
 @pytest.mark.parametrize('input_file', cal_input_files)
 def test_calibrate_both_bands_default_calibration_model(input_file, request):
     # Default sampling and default calibration sampling
@@ -82,3 +165,27 @@ def test_custom_sampling_v211w_model(input_file, sampling, sampling_sol, solutio
 def test_sampling_wrong_array(array):
     with pytest.raises(ValueError):
         calibrate(mean_spectrum_avro_file, sampling=array, save_file=False)
+
+
+@pytest.mark.parametrize('input_file', [mean_spectrum_avro_file, mean_spectrum_csv_file, mean_spectrum_fits_file,
+                                        with_missing_bp_csv_file])
+@pytest.mark.parametrize('with_correlation', [False, True])
+def test_calibrate_iter(input_file, with_correlation):
+    spectra_df, positions = calibrate(input_file, with_correlation=with_correlation, save_file=False)
+    chunks = list(calibrate_iter(input_file, with_correlation=with_correlation, chunk_size=1))
+    assert len(chunks) == len(spectra_df)
+    for _, chunk_positions in chunks:
+        npt.assert_array_equal(chunk_positions, positions)
+    pdt.assert_frame_equal(pd.concat([chunk for chunk, _ in chunks]), spectra_df, rtol=1e-12)
+
+
+def test_calibrate_iter_batch():
+    batches = [batch for batch, _ in calibrate_iter(with_missing_bp_csv_file, output_type='batch', chunk_size=2)]
+    assert [len(batch) for batch in batches] == [2, 1]
+    assert all(isinstance(batch, SpectraBatch) for batch in batches)
+
+
+@pytest.mark.parametrize('chunk_size', [0, 2.5])
+def test_calibrate_iter_chunk_size_error(chunk_size):
+    with pytest.raises(ValueError):
+        calibrate_iter(mean_spectrum_csv_file, chunk_size=chunk_size)
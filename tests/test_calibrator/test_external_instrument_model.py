@@ -4,9 +4,10 @@ from os.path import join
 import numpy as np
 import pytest
 from numpy import ndarray
+from scipy import interpolate
 
 from gaiaxpy.calibrator.calibrator import __create_merge
-from gaiaxpy.calibrator.external_instrument_model import ExternalInstrumentModel
+from gaiaxpy.calibrator.external_instrument_model import ExternalInstrumentModel, load_external_instrument_model
 from gaiaxpy.config.paths import config_path, config_ini_file
 from gaiaxpy.core.config import load_xpmerge_from_xml, load_xpsampling_from_xml
 from gaiaxpy.core.satellite import BANDS
@@ -70,3 +71,21 @@ def test_band_merge(band, sampling_grid_xp_merge, xp_merge_from_instrument_model
     _, xp_merge = sampling_grid_xp_merge
     assert np.allclose(xp_merge_from_instrument_model[band], xp_merge[band], rtol=rtol, atol=atol), assert_band_err(
         band)
+
+
+@pytest.mark.parametrize('band', BANDS)
+def test_vectorised_evaluation(band, instrument_model):
+    model = instrument_model[band]
+    wavelength = np.linspace(330, 1050, 25)
+    response_tck = interpolate.splrep(model.response['wavelength'], model.response['response'], s=0)
+    dispersion_tck = interpolate.splrep(model.dispersion['wavelength'], model.dispersion['pseudo-wavelength'], s=0)
+    assert np.array_equal(model.get_response(wavelength), interpolate.splev(wavelength, response_tck))
+    assert np.array_equal(model.wl_to_pwl(wavelength), interpolate.splev(wavelength, dispersion_tck))
+    assert np.array_equal(model.get_response(wavelength), [model.get_response(wl) for wl in wavelength])
+
+
+def test_load_external_instrument_model():
+    files = [get_file_for_xp(BANDS.bp, key) for key in ['dispersion', 'response', 'bases']]
+    model = load_external_instrument_model(*files)
+    assert isinstance(model, ExternalInstrumentModel)
+    assert load_external_instrument_model(*files) is model
@@ -3,7 +3,6 @@ import pytest
 from pandas import testing as pdt
 
 from gaiaxpy import calibrate
-from gaiaxpy.calibrator.calibrator import _create_spectrum
 from gaiaxpy.core.config import load_xpmerge_from_xml, load_xpsampling_from_xml
 from gaiaxpy.core.satellite import BANDS
 from gaiaxpy.file_parser.parse_internal_continuous import InternalContinuousParser
@@ -12,6 +11,7 @@ from gaiaxpy.spectrum.sampled_basis_functions import SampledBasisFunctions
 from tests.files.paths import (mean_spectrum_fits_file, mean_spectrum_csv_file, mean_spectrum_xml_file,
                                mean_spectrum_xml_plain_file, mean_spectrum_avro_file, mean_spectrum_ecsv_file)
 from tests.test_calibrator.calibrator_solutions import sol_default_sampling_array, truncation_default_solution_df
+from tests.utils.utils import create_calibrated_spectrum
 
 parser = InternalContinuousParser()
 
@@ -31,7 +31,7 @@ def test_create_spectrum(file):
     sampled_basis_func = {band: SampledBasisFunctions.from_design_matrix(xp_sampling_grid, xp_design_matrices[band])
                           for band in BANDS}
     first_row = parsed_spectrum_file.iloc[0]
-    spectrum = _create_spectrum(first_row, truncation=True, design_matrix=sampled_basis_func, merge=xp_merge)
+    spectrum = create_calibrated_spectrum(first_row, truncation=True, design_matrix=sampled_basis_func, merge=xp_merge)
     assert isinstance(spectrum, AbsoluteSampledSpectrum)
 
 
@@ -1,12 +1,14 @@
 import math
 
 import numpy as np
+import numpy.testing as npt
 import pandas as pd
 import pandas.testing as pdt
 import pytest
 
 from gaiaxpy import generate, PhotometricSystem
-from gaiaxpy.colour_equation.xp_filter_system_colour_equation import apply_colour_equation
+from gaiaxpy.colour_equation.xp_filter_system_colour_equation import (_get_correction, _load_colour_equation,
+                                                                      apply_colour_equation)
 from gaiaxpy.core.generic_functions import cast_output
 from gaiaxpy.file_parser.cast import _cast
 from tests.files.paths import colour_eq_csv_file
@@ -97,3 +99,17 @@ def test_gaiaxpy_vs_pmn_photometry():
     output_photometry = __arrange_output(output_photometry, label)
     johnson_solution_df = __prepare_solution()
     pdt.assert_frame_equal(output_photometry, johnson_solution_df, check_like=True)
+
+
+@pytest.mark.parametrize('label', ['JkcStd', 'SdssStd'])
+def test_correction_extrapolation(label):
+    system_details = _load_colour_equation(label)
+    assert _load_colour_equation(label) is system_details  # Configuration is only parsed once
+    polyfunc = np.poly1d(system_details['coefficients'])
+    low, high = system_details['colour_range']
+    colour = np.array([low - 1., low, (low + high) / 2., high, high + 0.5, np.nan])
+    correction = _get_correction(system_details, colour)
+    npt.assert_allclose(correction[1:4], polyfunc(colour[1:4]), rtol=1e-15)
+    npt.assert_allclose(correction[0], polyfunc(low) - polyfunc.deriv()(low), rtol=1e-15)
+    npt.assert_allclose(correction[4], polyfunc(high) + 0.5 * polyfunc.deriv()(high), rtol=1e-15)
+    assert np.isnan(correction[5])
@@ -7,7 +7,7 @@ import pandas.testing as pdt
 import pytest
 
 from gaiaxpy import convert
-from gaiaxpy.converter.converter import _create_spectrum, get_design_matrices
+from gaiaxpy.converter.converter import get_design_matrices
 from gaiaxpy.core.satellite import BANDS
 from gaiaxpy.file_parser.parse_internal_continuous import InternalContinuousParser
 from gaiaxpy.file_parser.parse_internal_sampled import InternalSampledParser
@@ -19,7 +19,8 @@ from tests.files.paths import (con_ref_sampled_csv_path, con_ref_sampled_truncat
                                mean_spectrum_csv_file, mean_spectrum_ecsv_file, mean_spectrum_fits_file,
                                mean_spectrum_xml_file, mean_spectrum_xml_plain_file)
 from tests.test_converter.converter_paths import optimised_bases_df, converter_csv_solution_0_60_481_df
-from tests.utils.utils import get_spectrum_with_source_id_and_xp, npt_array_err_message, is_instance_err_message
+from tests.utils.utils import (create_converted_spectrum, get_spectrum_with_source_id_and_xp, npt_array_err_message,
+                               is_instance_err_message)
 
 con_input_files = [mean_spectrum_avro_file, mean_spectrum_csv_file, mean_spectrum_ecsv_file, mean_spectrum_fits_file,
                    mean_spectrum_xml_file, mean_spectrum_xml_plain_file]
@@ -77,7 +78,7 @@ def test_create_spectrum(file, sampling):
     design_matrices = get_design_matrices(sampling, optimised_bases_df)
     for row in islice(parsed_input_dict, 1):  # Just the first row
         for band in BANDS:
-            spectrum[band] = _create_spectrum(row, truncation, design_matrices, band)
+            spectrum[band] = create_converted_spectrum(row, truncation, design_matrices, band)
     assert spectrum[BANDS.bp].get_source_id() == spectrum[BANDS.rp].get_source_id()
     for band in BANDS:
         assert isinstance(spectrum[band], instance), is_instance_err_message(file, instance, band)
@@ -110,6 +111,28 @@ def test_truncation(file, ref_sampled_truncated, sampling):
         npt.assert_almost_equal(ref['error'], spectrum['flux_error'], decimal=TOL, err_msg=npt_array_err_message(file))
 
 
+@pytest.mark.parametrize('file', con_input_files)
+@pytest.mark.parametrize('truncation', [False, True])
+def test_batch_output(file, sampling, truncation):
+    converted_df, _ = convert(file, sampling=sampling, truncation=truncation, save_file=False)
+    spectra, positions = convert(file, sampling=sampling, truncation=truncation, save_file=False,
+                                 output_type='batch')
+    npt.assert_array_equal(positions, sampling)
+    assert spectra.flux.shape == spectra.flux_error.shape == (len(converted_df), len(sampling))
+    # The batch contains all the BP spectra first and then all the RP spectra
+    n_sources = len(converted_df) // len(BANDS)
+    assert list(spectra.xp) == ['BP'] * n_sources + ['RP'] * n_sources
+    for row, (source_id, xp) in enumerate(zip(spectra.source_id, spectra.xp)):
+        spectrum = get_spectrum_with_source_id_and_xp(source_id, xp, converted_df)
+        npt.assert_allclose(spectra.flux[row], spectrum['flux'], rtol=1e-12)
+        npt.assert_allclose(spectra.flux_error[row], spectrum['flux_error'], rtol=1e-12)
+
+
+def test_output_type_error(sampling):
+    with pytest.raises(ValueError):
+        convert(mean_spectrum_csv_file, sampling=sampling, save_file=False, output_type='series')
+
+
 @pytest.mark.parametrize('file', con_input_files)
 @pytest.mark.parametrize('_sampling', [np.linspace(-15, 60, 600), np.linspace(-10, 71, 600),
                                        np.linspace(-11, 71, 600), None])
@@ -0,0 +1,33 @@
+import numpy as np
+import numpy.testing as npt
+import pytest
+
+from gaiaxpy import convert
+from gaiaxpy.config.paths import hermite_bases_file
+from gaiaxpy.converter.config import parse_config
+from gaiaxpy.converter.converter import _create_spectra_batch, get_design_matrices
+from gaiaxpy.core.satellite import BANDS
+from gaiaxpy.input_reader.input_reader import InputReader
+from tests.files.paths import mean_spectrum_csv_file, with_missing_bp_csv_file
+from tests.utils.utils import create_converted_spectrum
+
+
+@pytest.mark.parametrize('file', [mean_spectrum_csv_file, with_missing_bp_csv_file])
+@pytest.mark.parametrize('truncation', [False, True])
+def test_batch_matches_single_spectra(file, truncation):
+    sampling = np.linspace(0, 60, 300)
+    parsed_input_data, _ = InputReader(file, convert, truncation, disable_info=True).read()
+    design_matrices = get_design_matrices(sampling, parse_config(hermite_bases_file))
+    spectra, positions = _create_spectra_batch(parsed_input_data, truncation, design_matrices)
+    npt.assert_array_equal(positions, sampling)
+    n_sources = len(parsed_input_data)
+    # All the BP spectra are followed by all the RP spectra
+    for band_index, band in enumerate(BANDS):
+        for source_index, (_, row) in enumerate(parsed_input_data.iterrows()):
+            batch_row = band_index * n_sources + source_index
+            if not isinstance(row[f'{band}_coefficients'], np.ndarray):
+                assert np.isnan(spectra.flux[batch_row]).all()
+                continue
+            spectrum = create_converted_spectrum(row, truncation, design_matrices, band)
+            npt.assert_allclose(spectra.flux[batch_row], spectrum.flux, rtol=1e-12)
+            npt.assert_allclose(spectra.flux_error[batch_row], spectrum.error, rtol=1e-12)
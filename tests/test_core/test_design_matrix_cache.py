@@ -0,0 +1,114 @@
+from os import listdir
+
+import numpy as np
+import numpy.testing as npt
+import pytest
+from pandas import testing as pdt
+
+from gaiaxpy import calibrate
+from gaiaxpy.core import design_matrix_cache
+from gaiaxpy.core.design_matrix_cache import (DEFAULT_CACHE_MAX_BYTES, clear_cache, get_cache_key,
+                                              get_cache_max_bytes, load_cached_arrays, save_cached_arrays)
+from tests.files.paths import mean_spectrum_csv_file
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv('GAIAXPY_CACHE_DIR', str(tmp_path))
+    monkeypatch.delenv('GAIAXPY_CACHE_MAX_BYTES', raising=False)
+    yield tmp_path
+
+
+def test_cache_key(tmp_path):
+    config_file = tmp_path / 'config.csv'
+    config_file.write_text('a,b\n1,2\n')
+    sampling = np.linspace(400, 900, 50)
+    key = get_cache_key(sampling, ['calibrator', 'v375wi'], [config_file])
+    assert key == get_cache_key(sampling.copy(), ['calibrator', 'v375wi'], [config_file])
+    assert key != get_cache_key(sampling[:-1], ['calibrator', 'v375wi'], [config_file])
+    assert key != get_cache_key(sampling, ['calibrator', 'v211w'], [config_file])
+    config_file.write_text('a,b\n1,3\n')
+    assert key != get_cache_key(sampling, ['calibrator', 'v375wi'], [config_file])
+
+
+def test_save_and_load(cache_dir):
+    arrays = {'bp_design_matrix': np.random.rand(5, 10), 'bp_merge': np.random.rand(10)}
+    assert load_cached_arrays('key') is None
+    save_cached_arrays('key', arrays)
+    cached = load_cached_arrays('key')
+    assert cached.keys() == arrays.keys()
+    for name, array in arrays.items():
+        npt.assert_array_equal(cached[name], array)
+    clear_cache()
+    assert load_cached_arrays('key') is None
+
+
+def test_eviction(cache_dir, monkeypatch):
+    arrays = {'design_matrix': np.zeros((100, 100))}
+    monkeypatch.setenv('GAIAXPY_CACHE_MAX_BYTES', str(int(2.5 * arrays['design_matrix'].nbytes)))
+    for key in ['first', 'second']:
+        save_cached_arrays(key, arrays)
+    # Using the first entry makes the second one the least recently used
+    assert load_cached_arrays('first') is not None
+    save_cached_arrays('third', arrays)
+    assert sorted(listdir(cache_dir)) == ['first.npz', 'third.npz']
+
+
+def test_disabled(cache_dir, monkeypatch):
+    monkeypatch.setenv('GAIAXPY_CACHE_MAX_BYTES', '0')
+    save_cached_arrays('key', {'array': np.zeros(3)})
+    assert listdir(cache_dir) == []
+    assert load_cached_arrays('key') is None
+
+
+def test_disabled_by_default(tmp_path, monkeypatch):
+    monkeypatch.delenv('GAIAXPY_CACHE_DIR', raising=False)
+    monkeypatch.setenv('HOME', str(tmp_path))
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path))
+    save_cached_arrays('key', {'array': np.zeros(3)})
+    assert listdir(tmp_path) == []
+    assert load_cached_arrays('key') is None
+
+
+def test_invalid_max_bytes(cache_dir, monkeypatch):
+    monkeypatch.setenv('GAIAXPY_CACHE_MAX_BYTES', '256MB')
+    assert get_cache_max_bytes() == DEFAULT_CACHE_MAX_BYTES
+
+
+def test_failed_save(cache_dir, monkeypatch):
+    def savez(file, **arrays):
+        raise OSError('No space left on device')
+
+    monkeypatch.setattr(design_matrix_cache.np, 'savez', savez)
+    save_cached_arrays('key', {'array': np.zeros(3)})
+    assert listdir(cache_dir) == []
+
+
+@pytest.mark.parametrize('content', [b'', b'PK\x03\x04 truncated entry'])
+def test_corrupt_entry(cache_dir, content):
+    (cache_dir / 'key.npz').write_bytes(content)
+    assert load_cached_arrays('key') is None
+
+
+def test_calibrate_with_invalid_entries(cache_dir):
+    sampling = np.linspace(400, 900, 60)
+    spectra_df, _ = calibrate(mean_spectrum_csv_file, sampling=sampling, save_file=False)
+    entry_path = cache_dir / listdir(cache_dir)[0]
+    entry = dict(np.load(entry_path))
+    # An entry missing one of the arrays is rebuilt
+    np.savez(entry_path, **{name: array for name, array in entry.items() if name != 'rp_merge'})
+    pdt.assert_frame_equal(calibrate(mean_spectrum_csv_file, sampling=sampling, save_file=False)[0], spectra_df)
+    assert sorted(np.load(entry_path).files) == sorted(entry)
+    # A corrupt entry is rebuilt
+    entry_path.write_bytes(entry_path.read_bytes()[:100])
+    pdt.assert_frame_equal(calibrate(mean_spectrum_csv_file, sampling=sampling, save_file=False)[0], spectra_df)
+    assert sorted(np.load(entry_path).files) == sorted(entry)
+
+
+def test_calibrate_with_cache(cache_dir):
+    sampling = np.linspace(400, 900, 60)
+    spectra_df, positions = calibrate(mean_spectrum_csv_file, sampling=sampling, save_file=False)
+    assert len(listdir(cache_dir)) == 1
+    cached_spectra_df, cached_positions = calibrate(mean_spectrum_csv_file, sampling=sampling, save_file=False)
+    npt.assert_array_equal(cached_positions, positions)
+    pdt.assert_frame_equal(cached_spectra_df, spectra_df)
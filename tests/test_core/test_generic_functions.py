@@ -1,11 +1,14 @@
 import numpy as np
 import numpy.testing as npt
+import pandas as pd
 import pytest
 
 from gaiaxpy import generate, PhotometricSystem
 from gaiaxpy.core.generic_functions import (_get_system_label, _extract_systems_from_data, validate_pwl_sampling,
-                                            array_to_symmetric_matrix, correlation_to_covariance,
-                                            get_matrix_size_from_lower_triangle)
+                                            array_to_symmetric_matrix, arrays_to_symmetric_matrices,
+                                            correlation_to_covariance,
+                                            get_matrix_size_from_lower_triangle, correlation_from_covariance,
+                                            packed_correlation_from_covariance, str_column_to_arrays, str_to_array)
 from tests.files.paths import mean_spectrum_fits_file
 
 
@@ -91,6 +94,23 @@ def test_correlation_to_covariance():
     npt.assert_allclose(cov, cov.T, rtol=1e-8)  # Check that the matrix is symmetric
 
 
+@pytest.mark.parametrize('dtype', [None, np.float32])
+def test_packed_correlation_from_covariance(dtype):
+    factors = np.random.random((5, 7, 7))
+    covariance = factors @ np.swapaxes(factors, 1, 2)
+    covariance[0, 2, :] = covariance[0, :, 2] = 0  # Uncorrelated sample
+    expected = np.array([correlation_from_covariance(c)[np.tril_indices(7, k=-1)] for c in covariance])
+    packed = packed_correlation_from_covariance(covariance, dtype=dtype)
+    assert packed.dtype == (dtype or covariance.dtype)
+    npt.assert_allclose(packed, expected, rtol=1e-6 if dtype else 1e-12)
+
+
+@pytest.mark.filterwarnings('error::RuntimeWarning')
+def test_packed_correlation_from_covariance_zero_variance():
+    covariance = np.diag([1., 0., 4.])[np.newaxis]
+    npt.assert_array_equal(packed_correlation_from_covariance(covariance), np.zeros((1, 3)))
+
+
 def test_get_matrix_size():
     assert get_matrix_size_from_lower_triangle(np.ones(6)) == 4
     assert get_matrix_size_from_lower_triangle(np.ones(10)) == 5
@@ -116,3 +136,42 @@ def test_array_to_symmetric_matrix_mismatching(array):
 def test_array_to_symmetric_matrix_negative_size(array):
     with pytest.raises(ValueError):
         array_to_symmetric_matrix(array, -1)
+
+
+def test_arrays_to_symmetric_matrices():
+    # Arrays without and with the diagonal, a missing band and an empty array
+    arrays = pd.Series([np.array([4., 5., 6.]), np.array([7., 8., 9.]), np.nan, np.array([1., 2., 3., 4., 5., 6.]),
+                        np.array([])], index=[3, 5, 7, 11, 13])
+    sizes = pd.Series([3, 3., np.nan, 3, 3], index=arrays.index)
+    matrices = arrays_to_symmetric_matrices(arrays, sizes)
+    assert matrices.index.equals(arrays.index)
+    for matrix, array, size in zip(matrices, arrays, sizes):
+        expected = array_to_symmetric_matrix(array, size)
+        if isinstance(expected, float):
+            assert np.isnan(matrix)
+        else:
+            npt.assert_array_equal(matrix, expected)
+    with pytest.raises(ValueError):
+        arrays_to_symmetric_matrices(pd.Series([np.array([1., 2.])]), pd.Series([2.5]))
+
+
+def test_str_column_to_arrays():
+    column = pd.Series(['(1.5, -2e-3, nan)', np.nan, '(4,5,6)', '()', '(7,8)'], index=[2, 3, 5, 7, 11])
+    arrays = str_column_to_arrays(column)
+    assert arrays.index.equals(column.index)
+    for parsed, value in zip(arrays, column):
+        expected = str_to_array(value)
+        if isinstance(expected, float):
+            assert np.isnan(parsed)
+        else:
+            npt.assert_array_equal(parsed, expected)
+    # All the arrays share one contiguous buffer
+    same_length = str_column_to_arrays(pd.Series(['[1,2]', '[3,4]', np.nan]))
+    assert same_length[0].base is same_length[1].base
+    npt.assert_array_equal(same_length[0].base, [1., 2., 3., 4.])
+
+
+@pytest.mark.parametrize('value', ['(1,x)', '(1,,2)'])
+def test_str_column_to_arrays_invalid(value):
+    with pytest.raises(ValueError):
+        str_column_to_arrays(pd.Series(['(1,2)', value]))
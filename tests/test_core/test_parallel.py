@@ -0,0 +1,59 @@
+import pandas as pd
+import pytest
+
+from gaiaxpy.core.input_validator import validate_parallel_arguments
+from gaiaxpy.core.parallel import create_progress_bar, create_worker_pool, process_in_chunks, split_in_chunks
+
+
+def _scale(chunk, *, factor):
+    return chunk['value'] * factor
+
+
+@pytest.fixture
+def data():
+    yield pd.DataFrame({'value': range(10)})
+
+
+def test_split_in_chunks(data):
+    chunks = split_in_chunks(data, 4)
+    assert [len(chunk) for chunk in chunks] == [4, 4, 2]
+    assert len(split_in_chunks(data.iloc[:0], 4)) == 1
+
+
+@pytest.mark.parametrize('n_workers', [1, 3])
+@pytest.mark.parametrize('chunk_size', [None, 1, 3, 20])
+def test_process_in_chunks(data, n_workers, chunk_size):
+    results = process_in_chunks(_scale, data, {'factor': 2}, n_workers=n_workers, chunk_size=chunk_size)
+    assert list(pd.concat(results)) == [2 * value for value in range(10)]
+
+
+def _double_factor(shared_data):
+    return {'factor': 2 * shared_data['factor']}
+
+
+@pytest.mark.parametrize('n_workers', [1, 3])
+def test_process_in_chunks_initialise(data, n_workers):
+    results = process_in_chunks(_scale, data, {'factor': 1}, n_workers=n_workers, chunk_size=3,
+                                initialise=_double_factor)
+    assert list(pd.concat(results)) == [2 * value for value in range(10)]
+
+
+@pytest.mark.parametrize('n_workers', [1, 3])
+def test_process_in_chunks_progress(data, n_workers):
+    with create_progress_bar('calibrator', len(data)) as progress_bar:
+        process_in_chunks(_scale, data, {'factor': 2}, n_workers=n_workers, chunk_size=3, progress_bar=progress_bar)
+        assert progress_bar.n == len(data)
+
+
+def test_process_in_chunks_reusing_pool(data):
+    with create_worker_pool({'factor': 2}, 2) as executor:
+        for chunk_size in [1, 3]:
+            results = process_in_chunks(_scale, data, {'factor': 2}, n_workers=2, chunk_size=chunk_size,
+                                        executor=executor)
+            assert list(pd.concat(results)) == [2 * value for value in range(10)]
+
+
+@pytest.mark.parametrize('n_workers, chunk_size', [(0, None), (1.5, None), (True, None), (1, 0), (2, 2.0)])
+def test_invalid_parallel_arguments(n_workers, chunk_size):
+    with pytest.raises(ValueError):
+        validate_parallel_arguments(n_workers, chunk_size)
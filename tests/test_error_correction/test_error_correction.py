@@ -1,8 +1,11 @@
+import numpy as np
+import numpy.testing as npt
 import pandas as pd
 import pandas.testing as pdt
 import pytest
 
 from gaiaxpy import generate, apply_error_correction, PhotometricSystem
+from gaiaxpy.error_correction.error_correction import _get_correction_array, _load_correction_table
 from gaiaxpy.file_parser.cast import _cast
 from tests.files.paths import phot_with_nan_path, mean_spectrum_csv_file
 from tests.test_error_correction.error_correction_paths import corrected_error_solution_path, \
@@ -67,3 +70,17 @@ def test_error_correction_system_with_no_table():
     corrected_multiphotometry_solution_no_hst = corrected_solution.drop(columns=hst_columns)
     complete_solution = pd.concat([corrected_multiphotometry_solution_no_hst, halpha_photometry], axis=1)
     compare_all_columns(corrected_multiphotometry, complete_solution)
+
+
+def test_correction_array():
+    table = _load_correction_table('Jkc')
+    assert _load_correction_table('Jkc') is table  # Tables are only read once
+    factors = table['factors']
+    mag = np.array([np.nan, 2., 4., 4.2, 4.5, 4.75, 5., 20.5, 20.9, 21., 25.])
+    correction = _get_correction_array(pd.Series(mag), 'Jkc')
+    assert correction.shape == (len(mag), factors.shape[1])
+    for index, expected in [(0, factors[-1]), (1, factors[0]), (2, factors[0]), (3, factors[0]), (4, factors[0]),
+                            (6, factors[1]), (7, factors[-1]), (8, factors[-1]), (9, factors[-1]), (10, factors[-1])]:
+        npt.assert_array_equal(correction[index], expected)
+    # Halfway between the centre of the first bin and its upper edge
+    npt.assert_allclose(correction[5], (factors[0] + factors[1]) / 2, rtol=1e-14)
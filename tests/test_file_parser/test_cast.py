@@ -0,0 +1,26 @@
+import numpy as np
+import numpy.testing as npt
+import pandas as pd
+
+from gaiaxpy.file_parser.cast import _cast
+
+
+def test_cast_masked_values():
+    df = pd.DataFrame({'source_id': [1, 2, 3],
+                       'bp_n_parameters': pd.Series([55, np.ma.masked, 55], dtype=object),
+                       'bp_coefficients': pd.Series([np.ma.array([1., 2.], mask=[False, True]), np.ma.array([]),
+                                                     np.nan], dtype=object),
+                       'rp_coefficients': [np.arange(3.), np.arange(3.), np.arange(3.)],
+                       'rp_coefficient_errors': pd.Series([np.nan] * 3, dtype=object),
+                       'bp_standard_deviation': [1., np.nan, 2.]})
+    rp_coefficients = df['rp_coefficients'].copy()
+    df = _cast(df)
+    assert df['source_id'].dtype == 'Int64'
+    assert df['bp_n_parameters'].dtype == 'Int16' and df['bp_n_parameters'].isna().tolist() == [False, True, False]
+    assert not isinstance(df['bp_coefficients'][0], np.ma.MaskedArray)
+    npt.assert_array_equal(df['bp_coefficients'][0], [1., 2.])
+    assert df['bp_coefficients'][1].size == 0 and np.isnan(df['bp_coefficients'][2])
+    # Columns without masked values are not modified
+    assert all(array is expected for array, expected in zip(df['rp_coefficients'], rp_coefficients))
+    assert df['rp_coefficient_errors'].dtype == float
+    assert df['bp_standard_deviation'].dtype == 'Float64'
@@ -1,4 +1,6 @@
+import pandas as pd
 import pytest
+from pandas import testing as pdt
 
 from gaiaxpy.file_parser.parse_generic import _get_file_extension, GenericParser, InvalidExtensionError
 from tests.files.paths import mini_csv_file, mini_fits_file, mini_xml_file
@@ -30,3 +32,14 @@ def test_get_parser_error(parser):
 @pytest.mark.parametrize('extension,function', [['csv', '_parse_csv'], ['fits', '_parse_fits'], ['xml', '_parse_xml']])
 def test_get_parser_extensions(parser, extension, function):
     assert parser.get_parser(extension) == getattr(parser, function)
+
+
+def test_parse_csv_in_chunks_multiline_values(parser, tmp_path):
+    csv_file = tmp_path / 'multiline.csv'
+    csv_file.write_text('# Comment\nsource_id,note\n1,"first\nline"\n\n'
+                        '2,"with ""quotes""\n\nand a blank line"\n3,plain\n')
+    parsed_file, _ = parser.parse_file(csv_file, disable_info=True)
+    chunks = [chunk for chunk, _ in parser.parse_file_in_chunks(csv_file, 1, disable_info=True)]
+    assert [len(chunk) for chunk in chunks] == [1, 1, 1]
+    assert parsed_file['note'][1] == 'with "quotes"\n\nand a blank line'
+    pdt.assert_frame_equal(pd.concat(chunks, ignore_index=True), parsed_file)
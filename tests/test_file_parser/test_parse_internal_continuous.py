@@ -1,6 +1,7 @@
 import numpy.testing as npt
 import pandas as pd
 import pytest
+from fastavro import parse_schema, reader, writer
 from numpy import ndarray, dtype
 
 from gaiaxpy.core.satellite import BANDS
@@ -143,3 +144,35 @@ def test_parse_equality():
             npt.assert_almost_equal(csv_data[key], fits_data[key], decimal=decimal)  # Precision varies across formats
             npt.assert_almost_equal(fits_data[key], plain_xml_data[key], decimal=decimal)
             npt.assert_almost_equal(plain_xml_data[key], xml_data[key], decimal=decimal)
+
+
+@pytest.mark.parametrize('file', [mean_spectrum_avro_file, mean_spectrum_csv_file, mean_spectrum_ecsv_file,
+                                  mean_spectrum_fits_file, mean_spectrum_xml_file])
+def test_parse_file_in_chunks(file):
+    parsed_file, extension = parser.parse_file(file)
+    chunks = list(parser.parse_file_in_chunks(file, 1))
+    assert [len(chunk) for chunk, _ in chunks] == [1] * len(parsed_file)
+    assert all(chunk_extension == extension for _, chunk_extension in chunks)
+    parsed_chunks = pd.concat([chunk for chunk, _ in chunks], ignore_index=True)
+    assert list(parsed_chunks.columns) == list(parsed_file.columns)
+    for column in parsed_file.columns:
+        for value, chunk_value in zip(parsed_file[column], parsed_chunks[column]):
+            npt.assert_array_equal(chunk_value, value)
+
+
+def test_parse_avro_missing_band(tmp_path):
+    with open(mean_spectrum_avro_file, 'rb') as avro_file:
+        avro_reader = reader(avro_file)
+        schema, records = avro_reader.writer_schema, list(avro_reader)
+    records[1]['bpSpec'] = None
+    avro_path = tmp_path / 'missing_bp.avro'
+    with open(avro_path, 'wb') as avro_file:
+        writer(avro_file, parse_schema(schema), records)
+    parsed_file, _ = InternalContinuousParser().parse_file(avro_path)
+    parsed_with_bp, _ = InternalContinuousParser().parse_file(mean_spectrum_avro_file)
+    assert pd.isna(parsed_file['bp_n_parameters'][1]) and pd.isna(parsed_file['bp_covariance_matrix'][1])
+    assert isinstance(parsed_file['bp_coefficients'][1], float)
+    for column in parsed_file.columns:
+        npt.assert_array_equal(parsed_file[column][0], parsed_with_bp[column][0])
+        if not column.startswith(BANDS.bp):
+            npt.assert_array_equal(parsed_file[column][1], parsed_with_bp[column][1])
@@ -1,15 +1,22 @@
+import multiprocessing
 import re
 import sys
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from io import StringIO
 
+import numpy as np
 import pandas as pd
 import pandas.testing as pdt
 import pytest
 
 from gaiaxpy import generate, remove_additional_systems, load_additional_systems
+from gaiaxpy.core import parallel
 from gaiaxpy.file_parser.cast import _cast
-from tests.files.paths import missing_bp_csv_file, mean_spectrum_fits_file, gen_missing_band_sol_path
+from gaiaxpy.generator.photometric_system import AutoName
+from tests.files.paths import (missing_bp_csv_file, mean_spectrum_fits_file, gen_missing_band_sol_path,
+                               with_missing_bp_csv_file)
 from tests.test_generator.generator_paths import additional_filters_dir
 
 _rtol, _atol = 1e-23, 1e-23
@@ -42,6 +49,37 @@ def test_duplicate_columns(systems_list):
     assert 0 == len([item for item, count in Counter(generated_photometry.columns).items() if count > 1])
 
 
+@pytest.mark.parametrize('n_workers', [1, 2])
+def test_chunks(systems_list, n_workers):
+    # The input needs more than one source so that several chunks are processed by the workers
+    photometry = generate(with_missing_bp_csv_file, photometric_system=systems_list, save_file=False,
+                          error_correction=True)
+    chunked_photometry = generate(with_missing_bp_csv_file, photometric_system=systems_list, save_file=False,
+                                  error_correction=True, n_workers=n_workers, chunk_size=1)
+    pdt.assert_frame_equal(chunked_photometry, photometry)
+
+
+def test_chunks_spawn(systems_list, monkeypatch):
+    # Worker processes started with spawn must not depend on pickling the PhotometricSystem members
+    def reduce_ex(self, protocol):
+        raise TypeError(f'{self} cannot be pickled.')
+
+    monkeypatch.setattr(AutoName, '__reduce_ex__', reduce_ex)
+    monkeypatch.setattr(parallel, 'ProcessPoolExecutor',
+                        partial(ProcessPoolExecutor, mp_context=multiprocessing.get_context('spawn')))
+    test_chunks(systems_list, 2)
+
+
+def test_single_precision(systems_list):
+    photometry = generate(missing_bp_csv_file, photometric_system=systems_list, save_file=False,
+                          error_correction=True)
+    single_photometry = generate(missing_bp_csv_file, photometric_system=systems_list, save_file=False,
+                                 error_correction=True, dtype=np.float32)
+    float_columns = [column for column in photometry.columns if column != 'source_id']
+    assert (single_photometry[float_columns].dtypes == np.float32).all()
+    pdt.assert_frame_equal(single_photometry, photometry.astype(dict.fromkeys(float_columns, np.float32)))
+
+
 def test_single_phot_object(__ps):
     photometry = generate(mean_spectrum_fits_file, photometric_system=__ps.JKC, save_file=False)
     assert isinstance(photometry, pd.DataFrame)
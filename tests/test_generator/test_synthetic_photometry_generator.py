@@ -1,14 +1,19 @@
+import numpy.testing as npt
+import pytest
+
 from gaiaxpy.core.config import load_xpmerge_from_xml, load_xpsampling_from_xml
 from gaiaxpy.core.satellite import BANDS
 from gaiaxpy.file_parser.parse_internal_continuous import InternalContinuousParser
+from gaiaxpy.generator.multi_synthetic_photometry_generator import MultiSyntheticPhotometryGenerator
 from gaiaxpy.generator.photometric_system import PhotometricSystem
 from gaiaxpy.generator.synthetic_photometry_generator import _generate_synthetic_photometry
-from gaiaxpy.input_reader.required_columns import MANDATORY_INPUT_COLS, CORR_INPUT_COLUMNS
+from gaiaxpy.input_reader.required_columns import MANDATORY_INPUT_COLS, CORR_INPUT_COLUMNS, TRUNCATION_COLS
 from gaiaxpy.spectrum.sampled_basis_functions import SampledBasisFunctions
 from gaiaxpy.spectrum.single_synthetic_photometry import SingleSyntheticPhotometry
 
 from tests.files.paths import (mean_spectrum_avro_file, mean_spectrum_csv_file, mean_spectrum_xml_file,
-                               mean_spectrum_xml_plain_file, mean_spectrum_fits_file, mean_spectrum_ecsv_file)
+                               mean_spectrum_xml_plain_file, mean_spectrum_fits_file, mean_spectrum_ecsv_file,
+                               with_missing_bp_csv_file)
 
 
 def test_generate_synthetic_photometry():
@@ -42,3 +47,45 @@ def test_generate_synthetic_photometry():
         synthetic_photometry = _generate_synthetic_photometry(df.iloc[0], sampled_basis_func, xp_merge,
                                                               False, phot_system_johnson)
         assert isinstance(synthetic_photometry, SingleSyntheticPhotometry)
+
+
+@pytest.mark.parametrize('input_file', [mean_spectrum_avro_file, with_missing_bp_csv_file])
+@pytest.mark.parametrize('phot_system', [PhotometricSystem.JKC, PhotometricSystem.SDSS_Std])
+@pytest.mark.parametrize('truncation', [False, True])
+def test_generate_synthetic_photometry_batch(input_file, phot_system, truncation):
+    continuous_parser = InternalContinuousParser(MANDATORY_INPUT_COLS['generate'] + CORR_INPUT_COLUMNS +
+                                                 TRUNCATION_COLS)
+    parsed_data, _ = continuous_parser.parse_file(input_file)
+    label = phot_system.get_system_label()
+    xp_sampling = load_xpsampling_from_xml(system=label)
+    xp_sampling_grid, xp_merge = load_xpmerge_from_xml(system=label)
+    sampled_basis_func = {band: SampledBasisFunctions.from_design_matrix(xp_sampling_grid, xp_sampling[band])
+                          for band in BANDS}
+    generator = MultiSyntheticPhotometryGenerator([phot_system], bp_model='v375wi', rp_model='v142r')
+    photometry_df = generator._generate_from_kernels(parsed_data, truncation, *generator._load_kernels())
+    assert len(photometry_df) == len(parsed_data)
+    for index, (_, row) in enumerate(parsed_data.iterrows()):
+        single_photometry = _generate_synthetic_photometry(row, sampled_basis_func, xp_merge, truncation, phot_system)
+        for name, field in [('mag', single_photometry.mag), ('flux', single_photometry.flux),
+                            ('flux_error', single_photometry.error)]:
+            columns = [f'{label}_{name}_{band}' for band in phot_system.get_bands()]
+            npt.assert_allclose(photometry_df[columns].to_numpy()[index], field, rtol=1e-12)
+
+
+@pytest.mark.parametrize('truncation', [False, True])
+def test_multi_system_single_pass(truncation):
+    continuous_parser = InternalContinuousParser(MANDATORY_INPUT_COLS['generate'] + CORR_INPUT_COLUMNS +
+                                                 TRUNCATION_COLS)
+    parsed_data, _ = continuous_parser.parse_file(with_missing_bp_csv_file)
+    phot_systems = [PhotometricSystem.JKC, PhotometricSystem.SDSS_Std, PhotometricSystem.Gaia_DR3_Vega]
+    generator = MultiSyntheticPhotometryGenerator(phot_systems, bp_model='v375wi', rp_model='v142r')
+    photometry_df = generator._generate_from_kernels(parsed_data, truncation, *generator._load_kernels())
+    expected_columns = ['source_id']
+    for phot_system in phot_systems:
+        # Each system must get the same photometry as when it is generated on its own
+        single_generator = MultiSyntheticPhotometryGenerator([phot_system], bp_model='v375wi', rp_model='v142r')
+        single_df = single_generator._generate_from_kernels(parsed_data, truncation, *single_generator._load_kernels())
+        columns = list(single_df.columns[1:])
+        expected_columns += columns
+        npt.assert_allclose(photometry_df[columns].to_numpy(), single_df[columns].to_numpy(), rtol=1e-12)
+    assert list(photometry_df.columns) == expected_columns
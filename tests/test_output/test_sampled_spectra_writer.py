@@ -0,0 +1,129 @@
+import filecmp
+from os.path import exists, join
+
+import numpy as np
+import numpy.testing as npt
+import pandas as pd
+import pandas.testing as pdt
+import pytest
+from astropy.io import fits
+from astropy.table import Table
+from fastavro import reader
+
+from gaiaxpy import convert
+from gaiaxpy.converter import converter
+from gaiaxpy.file_parser.parse_generic import InvalidExtensionError
+from gaiaxpy.output.sampled_spectra_writer import SampledSpectraWriter
+from tests.files.paths import mean_spectrum_csv_file, with_missing_bp_csv_file
+
+
+def _convert_to_files(tmp_path, input_file, output_format, with_correlation):
+    # The spectra are computed one source at a time in both cases so that the output is bit-identical
+    convert(input_file, with_correlation=with_correlation, output_path=tmp_path, output_file='full',
+            output_format=output_format, chunk_size=1)
+    spectra, positions = convert(input_file, with_correlation=with_correlation, output_path=tmp_path,
+                                 output_file='streamed', output_format=output_format, chunk_size=1, streaming=True)
+    assert spectra is None
+    return join(tmp_path, f'full.{output_format}'), join(tmp_path, f'streamed.{output_format}')
+
+
+@pytest.mark.parametrize('input_file', [mean_spectrum_csv_file, with_missing_bp_csv_file])
+@pytest.mark.parametrize('output_format', ['csv', 'ecsv', 'xml'])
+@pytest.mark.parametrize('with_correlation', [False, True])
+def test_streaming_text_formats(tmp_path, input_file, output_format, with_correlation):
+    full_file, streamed_file = _convert_to_files(tmp_path, input_file, output_format, with_correlation)
+    assert filecmp.cmp(full_file, streamed_file, shallow=False)
+    if output_format == 'csv':
+        assert filecmp.cmp(join(tmp_path, 'full_sampling.csv'), join(tmp_path, 'streamed_sampling.csv'),
+                           shallow=False)
+
+
+@pytest.mark.parametrize('input_file', [mean_spectrum_csv_file, with_missing_bp_csv_file])
+@pytest.mark.parametrize('with_correlation', [False, True])
+def test_streaming_avro(tmp_path, input_file, with_correlation):
+    full_file, streamed_file = _convert_to_files(tmp_path, input_file, 'avro', with_correlation)
+    with open(full_file, 'rb') as full, open(streamed_file, 'rb') as streamed:
+        full_records, streamed_records = list(reader(full)), list(reader(streamed))
+    # Missing bands have NaN standard deviations, which are compared as equal by assert_frame_equal
+    pdt.assert_frame_equal(pd.DataFrame(streamed_records), pd.DataFrame(full_records))
+    # Missing bands are stored as null arrays
+    assert any(record['flux'] is None for record in streamed_records) == (input_file == with_missing_bp_csv_file)
+    with open(join(tmp_path, 'full_sampling.avro'), 'rb') as full, \
+            open(join(tmp_path, 'streamed_sampling.avro'), 'rb') as streamed:
+        assert list(reader(full)) == list(reader(streamed))
+
+
+@pytest.mark.parametrize('input_file', [mean_spectrum_csv_file, with_missing_bp_csv_file])
+@pytest.mark.parametrize('with_correlation', [False, True])
+def test_streaming_fits(tmp_path, input_file, with_correlation):
+    full_file, streamed_file = _convert_to_files(tmp_path, input_file, 'fits', with_correlation)
+    with fits.open(streamed_file) as hdu_list:
+        hdu_list.verify('exception')
+    full_table, streamed_table = Table.read(full_file), Table.read(streamed_file)
+    assert streamed_table.colnames == full_table.colnames
+    assert streamed_table.meta == full_table.meta
+    assert len(streamed_table) == len(full_table)
+    for column in full_table.colnames:
+        assert streamed_table[column].unit == full_table[column].unit
+        for full_value, streamed_value in zip(full_table[column], streamed_table[column]):
+            npt.assert_array_equal(np.asarray(streamed_value), np.asarray(full_value))
+
+
+def test_streaming_reuses_worker_pool(tmp_path, monkeypatch):
+    pools = list()
+
+    def create_worker_pool(shared_data, n_workers):
+        pools.append(converter_create_worker_pool(shared_data, n_workers))
+        return pools[-1]
+
+    converter_create_worker_pool = converter.create_worker_pool
+    monkeypatch.setattr(converter, 'create_worker_pool', create_worker_pool)
+    with open(with_missing_bp_csv_file) as f:
+        header, *rows = f.readlines()
+    input_file = tmp_path / 'input.csv'
+    input_file.write_text(''.join([header] + rows * 3))
+    # Each chunk read is split into chunks of one source for the workers, as in the full conversion
+    convert(input_file, output_path=tmp_path, output_file='full', output_format='csv', chunk_size=1)
+    convert(input_file, output_path=tmp_path, output_file='streamed', output_format='csv', chunk_size=2, n_workers=2,
+            streaming=True)
+    assert len(pools) == 1
+    assert filecmp.cmp(join(tmp_path, 'full.csv'), join(tmp_path, 'streamed.csv'), shallow=False)
+
+
+def test_fits_descriptors(tmp_path):
+    spectra, positions = convert(mean_spectrum_csv_file, with_correlation=True, save_file=False)
+    with SampledSpectraWriter(tmp_path, 'output', 'fits', positions) as spectra_writer:
+        spectra_writer.write(spectra)
+        layout = spectra_writer._fits_layout
+        variable_length = list(layout['max_lengths'])
+        assert variable_length
+        # The descriptors of large outputs point beyond the 2 GiB addressable by 32-bit offsets
+        rows = np.zeros(1, dtype=layout['row_dtype'])
+        for column in variable_length:
+            rows[column][0] = 343, 2 ** 31 + 8
+            npt.assert_array_equal(rows[column][0], [343, 2 ** 31 + 8])
+    with fits.open(join(tmp_path, 'output.fits')) as hdu_list:
+        header = hdu_list[1].header
+        tforms = {header[f'TTYPE{index}']: header[f'TFORM{index}'] for index in range(1, header['TFIELDS'] + 1)}
+    assert all(tforms[column].startswith(('QD(', 'QE(')) for column in variable_length)
+
+
+@pytest.mark.parametrize('output_format', ['fits', 'xml'])
+def test_writer_error(tmp_path, output_format):
+    spectra, positions = convert(mean_spectrum_csv_file, save_file=False)
+    with pytest.raises(RuntimeError):
+        with SampledSpectraWriter(tmp_path, 'output', output_format, positions) as spectra_writer:
+            spectra_writer.write(spectra)
+            raise RuntimeError('Conversion failed.')
+    # Incomplete files must not look like a valid output
+    assert not exists(join(tmp_path, f'output.{output_format}'))
+
+
+def test_streaming_requires_save_file():
+    with pytest.raises(ValueError):
+        convert(mean_spectrum_csv_file, save_file=False, streaming=True)
+
+
+def test_writer_invalid_format(tmp_path):
+    with pytest.raises(InvalidExtensionError):
+        SampledSpectraWriter(tmp_path, 'output', 'txt', np.arange(3))
@@ -0,0 +1,144 @@
+import numpy as np
+import numpy.testing as npt
+import pandas.testing as pdt
+import pytest
+from astropy.table import Table
+
+from gaiaxpy import calibrate, convert
+from gaiaxpy.output.spectra_batch import SpectraBatch
+from gaiaxpy.spectrum.xp_sampled_spectrum import XpSampledSpectrum
+from tests.files.paths import mean_spectrum_avro_file, mean_spectrum_csv_file, with_missing_bp_csv_file
+
+input_files = [mean_spectrum_avro_file, mean_spectrum_csv_file, with_missing_bp_csv_file]
+
+
+@pytest.mark.parametrize('input_file', input_files)
+@pytest.mark.parametrize('with_correlation', [False, True])
+def test_calibrate_batch(input_file, with_correlation):
+    expected_df, expected_positions = calibrate(input_file, save_file=False, with_correlation=with_correlation)
+    spectra, positions = calibrate(input_file, save_file=False, with_correlation=with_correlation,
+                                   output_type='batch')
+    assert isinstance(spectra, SpectraBatch)
+    assert len(spectra) == len(expected_df)
+    assert spectra.flux.shape == (len(expected_df), len(expected_positions))
+    npt.assert_array_equal(positions, expected_positions)
+    pdt.assert_frame_equal(spectra.to_pandas(), expected_df)
+
+
+@pytest.mark.parametrize('input_file', input_files)
+@pytest.mark.parametrize('with_correlation', [False, True])
+def test_convert_batch(input_file, with_correlation):
+    sampling = np.linspace(0, 60, 481)
+    expected_df, _ = convert(input_file, sampling=sampling, save_file=False, with_correlation=with_correlation)
+    spectra, _ = convert(input_file, sampling=sampling, save_file=False, with_correlation=with_correlation,
+                         output_type='batch')
+    assert spectra.flux.shape == (len(expected_df), len(sampling))
+    # Missing bands are filled with NaN in the batch and with None in the DataFrame
+    assert np.isnan(spectra.flux).all(axis=1).sum() == expected_df['flux'].isna().sum()
+    pdt.assert_frame_equal(spectra.to_pandas(), expected_df)
+
+
+@pytest.mark.parametrize('input_file', input_files)
+@pytest.mark.parametrize('function', [calibrate, convert])
+def test_correlation_factor(input_file, function):
+    expected_df, _ = function(input_file, save_file=False, with_correlation=True)
+    spectra, _ = function(input_file, save_file=False, with_correlation='factor', output_type='batch')
+    assert spectra.correlation is None
+    spectra_df = spectra.to_pandas()
+    pdt.assert_index_equal(spectra_df.columns, expected_df.columns)
+    lower_triangle = np.tril_indices(len(spectra.positions), k=-1)
+    for expected, correlation in zip(expected_df['correlation'], spectra_df['correlation']):
+        if expected is None:
+            assert correlation is None
+        else:
+            npt.assert_allclose(correlation, expected, rtol=1e-7, atol=1e-10)
+    for index in range(len(spectra)):
+        if not np.isnan(spectra.flux[index]).all():
+            npt.assert_allclose(spectra.get_correlation(index)[lower_triangle], spectra.get_packed_correlation()[index],
+                                rtol=1e-12)
+
+
+def test_correlation_factor_not_available():
+    spectra, _ = calibrate(mean_spectrum_csv_file, save_file=False, with_correlation=True, output_type='batch')
+    with pytest.raises(ValueError):
+        spectra.get_covariance(0)
+
+
+def test_source_id_cast_on_output():
+    flux = np.zeros((2, 3))
+    spectra = SpectraBatch(np.array(['5853498713190525696', '5762406957886626816']), flux, flux, np.arange(3),
+                           XpSampledSpectrum)
+    # The identifiers are kept as given and only cast when the output is built
+    assert spectra.source_id.dtype.kind == 'U'
+    npt.assert_array_equal(spectra.to_pandas()['source_id'], [5853498713190525696, 5762406957886626816])
+    assert spectra.to_pandas()['source_id'].dtype == np.int64
+    spectra = SpectraBatch(np.array(['source_a', 'source_b']), flux, flux, np.arange(3), XpSampledSpectrum)
+    with pytest.raises(ValueError):
+        spectra.to_pandas()
+
+
+@pytest.mark.parametrize('function', [calibrate, convert])
+@pytest.mark.parametrize('with_correlation', [False, True, 'factor'])
+def test_chunks(function, with_correlation):
+    expected, _ = function(with_missing_bp_csv_file, save_file=False, with_correlation=with_correlation,
+                           output_type='batch')
+    spectra, _ = function(with_missing_bp_csv_file, save_file=False, with_correlation=with_correlation,
+                          output_type='batch', n_workers=2, chunk_size=1)
+    assert list(spectra.source_id) == list(expected.source_id)
+    npt.assert_allclose(spectra.flux, expected.flux, rtol=1e-12)
+    pdt.assert_frame_equal(spectra.to_pandas(), expected.to_pandas())
+
+
+def test_invalid_with_correlation():
+    with pytest.raises(ValueError):
+        convert(mean_spectrum_csv_file, save_file=False, with_correlation='dense')
+
+
+def test_invalid_output_type():
+    with pytest.raises(ValueError):
+        calibrate(mean_spectrum_csv_file, save_file=False, output_type='arrays')
+
+
+@pytest.mark.parametrize('function', [calibrate, convert])
+@pytest.mark.parametrize('with_correlation', [False, True, 'factor'])
+def test_single_precision(function, with_correlation):
+    expected, _ = function(with_missing_bp_csv_file, save_file=False, with_correlation=with_correlation,
+                           output_type='batch')
+    spectra, _ = function(with_missing_bp_csv_file, save_file=False, with_correlation=with_correlation,
+                          output_type='batch', dtype=np.float32)
+    assert spectra.flux.dtype == spectra.flux_error.dtype == np.float32
+    npt.assert_allclose(spectra.flux, expected.flux, rtol=1e-5, atol=1e-5 * np.nanmax(np.abs(expected.flux)))
+    correlation = spectra.get_packed_correlation(dtype=np.float32)
+    if with_correlation:
+        assert correlation.dtype == np.float32
+        npt.assert_allclose(correlation, expected.get_packed_correlation(), atol=1e-5)
+    spectra_df = spectra.to_pandas()
+    assert all(flux.dtype == np.float32 for flux in spectra_df['flux'] if flux is not None)
+
+
+@pytest.mark.parametrize('function', [calibrate, convert])
+def test_single_precision_output_rounding(function):
+    expected, _ = function(with_missing_bp_csv_file, save_file=False, with_correlation=True, output_type='batch')
+    spectra, _ = function(with_missing_bp_csv_file, save_file=False, with_correlation=True, output_type='batch',
+                          dtype=np.float32, compute_dtype=np.float64)
+    # Computing in double precision only rounds the output
+    npt.assert_array_equal(spectra.flux, expected.flux.astype(np.float32))
+    npt.assert_array_equal(spectra.flux_error, expected.flux_error.astype(np.float32))
+    npt.assert_array_equal(spectra.correlation, expected.correlation.astype(np.float32))
+
+
+@pytest.mark.parametrize('output_format', ['ecsv', 'fits', 'xml'])
+def test_single_precision_file(tmp_path, output_format):
+    spectra_df, _ = calibrate(mean_spectrum_csv_file, output_path=tmp_path, output_file='output',
+                              output_format=output_format, dtype=np.float32)
+    read_arguments = {'use_names_over_ids': True} if output_format == 'xml' else dict()
+    table = Table.read(tmp_path / f'output.{output_format}', **read_arguments)
+    for column in ['flux', 'flux_error']:
+        assert table[column].dtype.newbyteorder('=') == np.float32
+        npt.assert_array_equal(table[column], np.stack(spectra_df[column]))
+
+
+@pytest.mark.parametrize('dtype', [np.float16, int, 'double precision'])
+def test_invalid_dtype(dtype):
+    with pytest.raises(ValueError):
+        convert(mean_spectrum_csv_file, save_file=False, dtype=dtype)
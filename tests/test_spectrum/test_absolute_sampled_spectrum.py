@@ -1,11 +1,17 @@
 from configparser import ConfigParser
 
+import numpy as np
+import numpy.testing as npt
+import pytest
+
 from gaiaxpy.config.paths import config_ini_file
 from gaiaxpy.core.config import load_xpmerge_from_xml, load_xpsampling_from_xml
+from gaiaxpy.core.generic_functions import correlation_from_covariance
 from gaiaxpy.core.satellite import BANDS
 from gaiaxpy.file_parser.parse_internal_continuous import InternalContinuousParser
 from gaiaxpy.spectrum.absolute_sampled_spectrum import AbsoluteSampledSpectrum
 from gaiaxpy.spectrum.sampled_basis_functions import SampledBasisFunctions
+from gaiaxpy.spectrum.sampled_spectrum import SampledSpectrum, MAX_BLOCK_BYTES
 from gaiaxpy.spectrum.utils import _correlation_to_covariance_dr3int5
 from gaiaxpy.spectrum.xp_continuous_spectrum import XpContinuousSpectrum
 from tests.files.paths import mean_spectrum_csv_file
@@ -41,3 +47,32 @@ def test_init_truncation():
             spectrum = AbsoluteSampledSpectrum(source_id, cont_dict, sampled_basis_func, xp_merge,
                                                truncation=truncation)
             assert isinstance(spectrum, AbsoluteSampledSpectrum)
+
+
+@pytest.mark.parametrize('max_block_bytes', [1, 3 * 55 * 343 * 8, MAX_BLOCK_BYTES])
+def test_sample_error_batch(max_block_bytes):
+    rng = np.random.default_rng(42)
+    design_matrix = load_xpsampling_from_xml()[BANDS.bp]
+    factors = rng.normal(size=(7, 55, 55))
+    covariance = factors @ np.swapaxes(factors, 1, 2)
+    stdev = rng.uniform(0.5, 1.5, size=7)
+    expected = np.array([SampledSpectrum._sample_error(c, design_matrix, s) for c, s in zip(covariance, stdev)])
+    error = SampledSpectrum._sample_error_batch(covariance, design_matrix, stdev, max_block_bytes=max_block_bytes)
+    npt.assert_allclose(error, expected, rtol=1e-12)
+
+
+@pytest.mark.parametrize('max_block_bytes', [1, 3 * 343 * 343 * 8, MAX_BLOCK_BYTES])
+def test_sample_correlation_batch(max_block_bytes):
+    rng = np.random.default_rng(42)
+    design_matrix = load_xpsampling_from_xml()[BANDS.bp]
+    factors = rng.normal(size=(7, 55, 55))
+    covariance = factors @ np.swapaxes(factors, 1, 2)
+    lower_triangle = np.tril_indices(design_matrix.shape[1], k=-1)
+    expected = np.array([correlation_from_covariance(SampledSpectrum._sample_covariance(c, design_matrix))[
+                             lower_triangle] for c in covariance])
+    correlation = SampledSpectrum._sample_correlation_batch(covariance, design_matrix, max_block_bytes=max_block_bytes)
+    npt.assert_allclose(correlation, expected, rtol=1e-10)
+    correlation = SampledSpectrum._sample_correlation_batch(covariance, design_matrix, dtype=np.float32,
+                                                            max_block_bytes=max_block_bytes)
+    assert correlation.dtype == np.float32
+    npt.assert_allclose(correlation, expected, rtol=1e-5, atol=1e-6)
@@ -0,0 +1,37 @@
+import math
+
+import numpy as np
+import numpy.testing as npt
+from scipy.interpolate import BSpline
+from scipy.special import eval_hermite
+
+from gaiaxpy.config.paths import spline_bases_file
+from gaiaxpy.converter.converter import get_design_matrices
+from gaiaxpy.converter.config import get_bands_config, parse_config
+from gaiaxpy.spectrum.sampled_basis_functions import _hermite_functions
+
+
+def test_hermite_functions():
+    x = np.linspace(-8, 8, 101)
+    hermite_functions = _hermite_functions(40, x)
+    assert hermite_functions.shape == (40, len(x))
+    for n in [0, 1, 2, 15, 39]:
+        expected = eval_hermite(n, x) * np.exp(-x ** 2 / 2.) / np.sqrt(2. ** n * math.factorial(n) * np.sqrt(np.pi))
+        npt.assert_allclose(hermite_functions[n], expected, rtol=1e-8, atol=1e-12)
+
+
+def test_hermite_functions_no_orders():
+    assert _hermite_functions(0, np.arange(3.)).shape == (0, 3)
+
+
+def test_spline_design_matrix():
+    sampling = np.linspace(300, 1100, 50)
+    bases_config = parse_config(spline_bases_file)
+    design_matrices = get_design_matrices(sampling, bases_config)
+    bands_config = get_bands_config(bases_config)
+    for band, band_config in zip(['bp', 'rp'], [bands_config.bpConfig, bands_config.rpConfig]):
+        knots, order = np.array(band_config.knots), int(band_config.order)
+        n_bases = len(knots) - order
+        bases = np.array([BSpline(knots, np.identity(n_bases)[basis_id], order - 1)(sampling)
+                          for basis_id in range(n_bases)])
+        npt.assert_allclose(design_matrices[band].get_design_matrix(), bases, rtol=1e-12)
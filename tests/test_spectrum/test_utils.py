@@ -1,8 +1,12 @@
 import numpy as np
+import numpy.testing as npt
+import pandas as pd
 
 from gaiaxpy.core.satellite import BANDS
 from gaiaxpy.file_parser.parse_internal_continuous import InternalContinuousParser
-from gaiaxpy.spectrum.utils import _correlation_to_covariance_dr3int5
+from gaiaxpy.generator.photometric_system import PhotometricSystem
+from gaiaxpy.spectrum.utils import (_apply_flux_offsets, _correlation_to_covariance_dr3int5, _factorise_covariance,
+                                    _flux_to_mag, get_covariance_column, get_covariance_matrix)
 from tests.files.paths import mean_spectrum_avro_file, mean_spectrum_csv_file
 
 
@@ -20,3 +24,57 @@ def test_correlation_to_covariance():
         covariance_matrix = parsed_covariance[f'{band}_coefficient_covariances'][0]
         assert np.allclose(reconstructed_covariance, covariance_matrix, rtol=1e-6, atol=1e-3), \
             'The reconstructed covariance is different from the expected matrix.'
+
+
+def test_covariance_column():
+    rng = np.random.default_rng(0)
+    correlations = [np.eye(4) + 0.1, np.eye(4) - 0.1, np.nan, np.eye(4), np.eye(4)]
+    correlations[3][0, 1] = np.nan  # Non-finite values are converted one at a time
+    errors = [rng.random(4), rng.random(4), np.nan, rng.random(4), rng.random(4).astype(np.float32)]
+    df = pd.DataFrame({'bp_coefficient_correlations': correlations, 'bp_coefficient_errors': errors,
+                       'bp_standard_deviation': [1.5, 0.5, np.nan, 1.0, 2.0]}, index=[4, 3, 2, 1, 0])
+    covariances = get_covariance_column(df, 'bp')
+    assert covariances.index.equals(df.index)
+    for (_, row), covariance in zip(df.iterrows(), covariances):
+        npt.assert_array_equal(covariance, get_covariance_matrix(row, 'bp'))
+    # A band missing in all the sources
+    assert get_covariance_column(df.iloc[2:3], 'bp').dtype == float
+
+
+def test_factorise_covariance():
+    rng = np.random.default_rng(0)
+    factors = rng.normal(size=(3, 6, 6))
+    covariances = factors @ np.swapaxes(factors, 1, 2)
+    covariances[1, 4:, :] = covariances[1, :, 4:] = 0  # Truncated
+    covariances[2] = -np.eye(6)  # Not positive definite
+    covariances[2, 0, 0] = 1
+    factors = _factorise_covariance(covariances)
+    rebuilt = factors @ np.swapaxes(factors, 1, 2)
+    npt.assert_allclose(rebuilt[:2], covariances[:2], atol=1e-12)
+    # Negative eigenvalues are clipped
+    npt.assert_allclose(rebuilt[2], np.diag([1, 0, 0, 0, 0, 0]), atol=1e-12)
+
+
+def test_flux_to_mag():
+    flux = np.array([[1e-16, 0., -1e-17], [np.nan, 2e-16, 1.]])
+    zero_points = np.array([25., 24., 23.])
+    mag = _flux_to_mag(flux, zero_points)
+    assert mag.shape == flux.shape
+    npt.assert_array_equal(np.isnan(mag), [[False, True, True], [True, False, False]])
+    npt.assert_allclose(mag[0, 0], -2.5 * np.log10(1e-16) + 25.)
+    npt.assert_array_equal(mag[1, 2], 23.)
+
+
+def test_apply_flux_offsets():
+    rng = np.random.default_rng(0)
+    standardised_system, regular_system = PhotometricSystem.JKC_Std.value, PhotometricSystem.JKC.value
+    n_bands = len(standardised_system.get_bands())
+    flux, error = rng.normal(size=(4, 2 * n_bands)), rng.uniform(size=(4, 2 * n_bands))
+    offsets = np.concatenate([standardised_system.get_offsets(), np.zeros(n_bands)])
+    standardised = np.arange(2 * n_bands) < n_bands
+    corrected_flux, corrected_error = _apply_flux_offsets(flux, error, offsets, standardised)
+    npt.assert_array_equal(corrected_flux[:, :n_bands], standardised_system._correct_flux(flux[:, :n_bands]))
+    npt.assert_array_equal(corrected_error[:, :n_bands],
+                           standardised_system._correct_error(flux[:, :n_bands], error[:, :n_bands]))
+    npt.assert_array_equal(corrected_flux[:, n_bands:], regular_system._correct_flux(flux[:, n_bands:]))
+    npt.assert_array_equal(corrected_error[:, n_bands:], error[:, n_bands:])
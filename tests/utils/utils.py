@@ -6,6 +6,11 @@ import numpy as np
 import pandas as pd
 
 from gaiaxpy.core.generic_functions import str_to_array, array_to_symmetric_matrix
+from gaiaxpy.core.satellite import BANDS
+from gaiaxpy.spectrum.calibration_absolute_sampled_spectrum import CalibrationAbsoluteSampledSpectrum
+from gaiaxpy.spectrum.utils import get_covariance_matrix
+from gaiaxpy.spectrum.xp_continuous_spectrum import XpContinuousSpectrum
+from gaiaxpy.spectrum.xp_sampled_spectrum import XpSampledSpectrum
 
 missing_bp_source_id = 5405570973190252288
 
@@ -149,3 +154,49 @@ def parse_dfs_for_test(from_file_df, read_input, additional_columns, expected_co
     expected_df = df[expected_columns + [c for c in additional_columns if c not in expected_columns]]
     filtered_read_input = read_input.drop(columns=['bp_covariance_matrix', 'rp_covariance_matrix'])
     return expected_df, filtered_read_input
+
+
+def create_calibrated_spectrum(row, truncation, design_matrix, merge, with_correlation=False):
+    """
+    Create a single sampled absolute spectrum from one row of the input, one source at a time. Used as a reference for
+        the batch computation of calibrate.
+
+    Args:
+        row (DataFrame): Single row in a DataFrame containing the entry for one source in the mean spectra file.
+        truncation (bool): Toggle truncation of the set of bases.
+        design_matrix (dict): Basis functions sampled on the pseudo-wavelength grid, one per band.
+        merge (dict): Dictionary containing an array of weights per BP and one for RP.
+        with_correlation (bool): Whether correlation information should be generated.
+
+    Returns:
+        CalibrationAbsoluteSampledSpectrum: The absolute sampled spectrum with calibration behaviour.
+    """
+    source_id = row['source_id']
+    continuous_dict = {band: XpContinuousSpectrum(source_id, band, row[f'{band}_coefficients'],
+                                                  get_covariance_matrix(row, band), row[f'{band}_standard_deviation'])
+                       for band in BANDS}
+    recommended_truncation = {band: row[f'{band}_n_relevant_bases'] for band in BANDS} if truncation else dict()
+    return CalibrationAbsoluteSampledSpectrum(source_id, continuous_dict, design_matrix, merge,
+                                              truncation=recommended_truncation, with_correlation=with_correlation)
+
+
+def create_converted_spectrum(row, truncation, design_matrices, band, with_correlation=False):
+    """
+    Create a single sampled spectrum of one band from one row of the input, one source at a time. Used as a reference
+        for the batch computation of convert.
+
+    Args:
+        row (pd.Series): Single row in a DataFrame containing the entry for one source in the mean spectra file.
+        truncation (bool): Toggle truncation of the set of bases.
+        design_matrices (dict): Basis functions sampled on the pseudo-wavelength grid, one per band.
+        band (str): bp/rp band.
+        with_correlation (bool): Whether correlation information should be generated.
+
+    Returns:
+        XpSampledSpectrum: The sampled spectrum.
+    """
+    recommended_truncation = row[f'{band}_n_relevant_bases'] if truncation else -1
+    continuous_spectrum = XpContinuousSpectrum(row['source_id'], band, row[f'{band}_coefficients'],
+                                               row[f'{band}_covariance_matrix'], row[f'{band}_standard_deviation'])
+    return XpSampledSpectrum.from_continuous(continuous_spectrum, design_matrices.get(band),
+                                             truncation=recommended_truncation, with_correlation=with_correlation)